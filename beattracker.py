@@ -0,0 +1,280 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from array import array
+from micropython import const
+
+from audiobusio import PDMIn
+from board import MICROPHONE_CLOCK, MICROPHONE_DATA
+
+from ticks import ticks_add, ticks_diff
+from loudness import Loudness, isqrt
+
+# Frames of loudness the running average is taken over, a power of 2
+_AVERAGE_SHIFT = const(5)
+_AVERAGE = const(1 << _AVERAGE_SHIFT)
+# Frames of onsets kept for the autocorrelation, a power of 2 longer than
+# the slowest beat
+_HISTORY = const(64)
+_HISTORY_MASK = const(_HISTORY - 1)
+# Each frame the autocorrelation loses 1 / 2**_DECAY of itself, so it
+# follows the last few seconds of music
+_DECAY = const(7)
+# Strongest onset, kept to 7 bits so the autocorrelation stays a small int
+_ONSET_MAX = const(127)
+# Onset strong enough to pull the beat into line with it
+_ONSET_THRESHOLD = const(32)
+# Autocorrelation below which there is too little sound to find a beat in
+_MIN_CORRELATION = const(1 << 14)
+
+class BeatTracker:
+    """ Finds the beat of the music with the microphone and calls back on
+    every beat, so that animations can move in time with it.
+
+    Every frame a short recording's loudness is compared with its running
+    average over the last frames; a jump above it is an onset. The tempo is
+    the lag at which the onsets of the last few seconds line up best with
+    themselves, an autocorrelation that is kept up to date a frame at a time
+    rather than worked out afresh. The beats are then counted off at that
+    tempo, nudged into line by the onsets that fall near them.
+
+    Everything is integers in arrays made by begin(), so read() doesn't
+    allocate. Like the VU meter it holds up the main loop while it records.
+    """
+
+    def __init__(self, beat_callback, min_bpm=60, max_bpm=180,
+                 latency_budget=4, frame_period=20, noise_floor=100):
+        """
+        Args:
+            beat_callback (def): Called with the ticks and the milliseconds
+            between beats on every beat, and with 0 for the milliseconds
+            once the beat is lost
+            min_bpm (int): Slowest tempo looked for, in beats per minute
+            max_bpm (int): Fastest tempo looked for, in beats per minute
+            latency_budget (int): Milliseconds of sound recorded each frame
+            frame_period (int): Milliseconds between recordings
+            noise_floor (int): Loudness below which sound doesn't count as
+            an onset, like the VU meter's input floor
+        """
+
+        self.beat_callback = beat_callback
+        self.sample_rate = const(16000)
+        self.num_samples = self.sample_rate * latency_budget // 1000
+        self.frame_period = frame_period
+        self.noise_floor = noise_floor
+        # Beat periods looked for, in frames. The autocorrelation is kept for
+        # one more lag either side to find the peak between lags.
+        self.min_lag = max(60000 // (max_bpm * frame_period), 2)
+        self.max_lag = min(60000 // (min_bpm * frame_period), _HISTORY - 2)
+
+        # Works out the loudness the same way as the VU meter
+        self.loudness = Loudness(self.num_samples, 2)
+
+        self.listening = False
+        self.period = 0
+
+    def begin(self):
+        """ Start listening """
+        print("beat tracker: begin")
+        self.samples = array('H', [0] * self.num_samples)
+        self.mic \
+            = PDMIn(MICROPHONE_CLOCK,
+                    MICROPHONE_DATA,
+                    sample_rate=self.sample_rate, bit_depth=16)
+        self.loudness.reset()
+        self.level = 0
+        # Loudness of the last frames, and their sum
+        self.levels = array('H', [0] * _AVERAGE)
+        self.level_sum = 0
+        # Onset strength of the last frames, the newest at head
+        self.onsets = bytearray(_HISTORY)
+        self.head = 0
+        self.last_onset = 0
+        # Autocorrelation of the onsets for each lag from min_lag - 1 to
+        # max_lag + 1
+        self.correlation = array('l', [0] * (self.max_lag - self.min_lag + 3))
+        self.frames = 0
+        self.next_read = -1
+        # Milliseconds between beats, 0 until a beat is found, and the ticks
+        # the next one is due
+        self.period = 0
+        self.next_beat = 0
+        self.listening = True
+
+    def end(self):
+        """ Stop listening and let go of the microphone """
+        if not self.listening:
+            return
+        print("beat tracker: end")
+        self.listening = False
+        self.period = 0
+        self.samples = None
+        self.levels = None
+        self.onsets = None
+        self.correlation = None
+        self.mic.deinit()
+        self.mic = None
+
+    @property
+    def bpm(self):
+        """ Tempo in beats per minute, 0 if no beat has been found """
+        return 60000 // self.period if self.period else 0
+
+    def phase(self, now):
+        """ How far through the current beat now is, out of 256 """
+        if not self.period:
+            return 0
+        left = max(ticks_diff(self.next_beat, now), 0)
+        return max(255 - left * 256 // self.period, 0)
+
+    def read(self, now):
+        """ Record and take in a frame of sound if one is due, calling back if
+        a beat falls on it. Must be called in the main processing loop, more
+        often than every frame_period milliseconds.
+
+        Args:
+            now (int): Ticks from ticks.ticks_ms()
+        """
+
+        if self.next_read >= 0 and ticks_diff(now, self.next_read) < 0:
+            return
+        # Keep to a steady rate, since the lags count frames
+        if self.next_read < 0 \
+           or ticks_diff(now, self.next_read) >= self.frame_period:
+            self.next_read = ticks_add(now, self.frame_period)
+        else:
+            self.next_read = ticks_add(self.next_read, self.frame_period)
+
+        self.mic.record(self.samples, len(self.samples))
+        onset = self._onset(self._level())
+        period = self._tempo(onset)
+
+        if period:
+            if not self.period:
+                # Found: the first beat is now
+                self.period = period
+                self.next_beat = now
+            else:
+                self.period += (period - self.period) >> 2
+                if onset >= _ONSET_THRESHOLD \
+                   and self.last_onset < _ONSET_THRESHOLD:
+                    self._align(now)
+            if ticks_diff(now, self.next_beat) >= 0:
+                self.next_beat = ticks_add(self.next_beat, self.period)
+                if ticks_diff(now, self.next_beat) >= 0:
+                    self.next_beat = ticks_add(now, self.period)
+                self.beat_callback(now, self.period)
+        elif self.period:
+            # Lost
+            self.period = 0
+            self.beat_callback(now, 0)
+        self.last_onset = onset
+
+    def _level(self):
+        """ Loudness of the recording, the root of its mean square """
+        # Last frame's level is a good first guess
+        self.level = isqrt(self.loudness.mean_square(self.samples),
+                           self.level)
+        return self.level
+
+    def _onset(self, level):
+        """ How far the level jumps above the running average, relative to
+        the average, from 0 to _ONSET_MAX
+        """
+
+        levels = self.levels
+        i = self.frames & (_AVERAGE - 1)
+        self.level_sum += level - levels[i]
+        levels[i] = level
+        self.frames += 1
+        average = self.level_sum >> _AVERAGE_SHIFT
+        # Nothing stands out until there is an average to stand out from
+        if level <= average or self.frames < _AVERAGE:
+            return 0
+        return min(((level - average) << 6) // (average + self.noise_floor),
+                   _ONSET_MAX)
+
+    def _tempo(self, onset):
+        """ Take in the frame's onset and return the milliseconds between
+        beats, or 0 if there's no clear beat
+        """
+
+        self.head = head = (self.head + 1) & _HISTORY_MASK
+        onsets = self.onsets
+        onsets[head] = onset
+
+        # Bring the autocorrelation up to date for the new onset, and find
+        # the lag it peaks at
+        correlation = self.correlation
+        last = len(correlation) - 1
+        lag = self.min_lag - 1
+        total = 0
+        best = 0
+        best_index = 0
+        for i in range(len(correlation)):
+            c = correlation[i]
+            c += onset * onsets[(head - lag) & _HISTORY_MASK] - (c >> _DECAY)
+            correlation[i] = c
+            total += c
+            if c > best and 0 < i < last:
+                best = c
+                best_index = i
+            lag += 1
+
+        # A beat stands out well above the average lag, more so to be found
+        # than to be kept
+        if best < _MIN_CORRELATION:
+            return 0
+        margin = total >> 1 if not self.period else total >> 2
+        if best * len(correlation) <= total + margin:
+            return 0
+
+        # A beat twice as fast lines up at this lag too; the faster one is
+        # the beat if it stands out nearly as much
+        half = (self.min_lag - 1 + best_index) // 2 - (self.min_lag - 1)
+        if half >= 1:
+            if half + 1 < last and correlation[half + 1] > correlation[half]:
+                half += 1
+            if correlation[half] * 2 > best:
+                best = correlation[half]
+                best_index = half
+
+        # Fit a parabola through the peak and its neighbours to place the
+        # beat between lags, in 256ths of a frame
+        left = correlation[best_index - 1]
+        right = correlation[best_index + 1]
+        curvature = 2 * best - left - right
+        offset = 0
+        if curvature > 0:
+            offset = max(min(((right - left) << 7) // curvature, 128), -128)
+        lag = ((self.min_lag - 1 + best_index) << 8) + offset
+        return (lag * self.frame_period) >> 8
+
+    def _align(self, now):
+        """ Nudge the beats halfway towards an onset near one """
+        error = ticks_diff(now, self.next_beat)
+        # Late for the beat just gone rather than early for the next
+        if error < -(self.period >> 1):
+            error += self.period
+        if -(self.period >> 2) < error < self.period >> 2:
+            self.next_beat = ticks_add(self.next_beat, error >> 1)
@@ -0,0 +1,9 @@
+# Rave-Tie boot file, run once when the CPX starts up, before code.py.
+#
+# Turns on the second USB serial port, usb_cdc.data, which the Stream
+# animation reads frames from. The REPL stays on the first one. Changes here
+# only take effect after a hard reset.
+
+import usb_cdc
+
+usb_cdc.enable(console=True, data=True)
@@ -20,45 +20,156 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from digitalio import DigitalInOut, Direction, Pull
+from ticks import ticks_diff
+
+try:
+    # Scans the pin in the background and queues up the events, so presses
+    # are caught however long the main loop takes to come around.
+    from keypad import Event, Keys
+except ImportError:
+    Keys = None
+    from digitalio import DigitalInOut, Direction, Pull
 
 class Button:
     """ Represents a button. Designed to fire events based on the various
-    state of the button press
+    state of the button press: a short press, a long press that fires once the
+    button has been held down long enough, and a double press.
+
+    The pin is scanned in the background by keypad when the firmware has it,
+    which only sees the pin every 20 milliseconds and so ignores contacts
+    bouncing in between. Otherwise it is polled each time read() is called,
+    and a change only counts once the pin has read the same for as long.
     """
 
-    def __init__(self, pin, release_event_callback):
+    def __init__(self, pin, release_event_callback,
+                 long_press_callback=None, double_press_callback=None,
+                 long_press_duration=1000, double_press_interval=300,
+                 debounce_time=20):
         """
         Args
             pin (Board.Pin): The board pin to listen for press activity.
             release_event_callback (def): Callback function to be called upon
             the release of a button press.
+            long_press_callback (def): Callback function to be called once the
+            button has been held down for long_press_duration. The release
+            that follows doesn't fire release_event_callback.
+            double_press_callback (def): Callback function to be called upon
+            the release of a second press that started within
+            double_press_interval of the first press's release. When given,
+            release_event_callback is held back until that interval has
+            passed without a second press.
+            long_press_duration (int): Milliseconds the button must be held
+            down for a long press.
+            double_press_interval (int): Milliseconds to wait for the second
+            press of a double press.
+            debounce_time (int): Milliseconds the pin must read the same
+            before a press or release counts, when it is polled.
         """
         
         self.release_event_callback = release_event_callback
-        self.button = DigitalInOut(pin)
-        self.button.direction = Direction.INPUT
-        self.button.pull = Pull.DOWN
+        self.long_press_callback = long_press_callback
+        self.double_press_callback = double_press_callback
+        self.long_press_duration = long_press_duration
+        self.double_press_interval = double_press_interval
+        self.debounce_time = debounce_time
+
+        if Keys:
+            self.keys = Keys((pin,), value_when_pressed=True, pull=True)
+            self.event = Event()
+            self.button = None
+        else:
+            self.keys = None
+            self.button = DigitalInOut(pin)
+            self.button.direction = Direction.INPUT
+            self.button.pull = Pull.DOWN
         self.button_pressed_down = False
+        # What the polled pin read last, and since when
+        self.level = False
+        self.level_time = 0
+
+        # Time the button was pressed down, time of a short press's release
+        # waiting to see if it becomes a double press, and whether the current
+        # press has already fired as a long press.
+        self.pressed_time = 0
+        self.pending_release_time = -1
+        self.long_press_fired = False
 
     def deinit(self):
-        self.button.deinit()
-        self.button = None
+        if self.keys:
+            self.keys.deinit()
+            self.keys = None
+        else:
+            self.button.deinit()
+            self.button = None
 
-    def read(self):
+    def read(self, now):
         """
         Reads the pin to determine if the button was pressed. Must be called in
         the main processing loop.
+
+        Args:
+            now (int): Ticks from ticks.ticks_ms()
         """
 
-        # Record that the button is being pressed down.
-        if self.button.value:
-            self.button_pressed_down = True
-            return
+        if self.keys:
+            while self.keys.events.get_into(self.event):
+                if self.event.pressed:
+                    self._pressed(now)
+                else:
+                    self._released(now)
+        else:
+            level = self.button.value
+            if level != self.level:
+                self.level = level
+                self.level_time = now
+            # Counted from when the pin settled, not from when that was seen
+            if level != self.button_pressed_down \
+               and ticks_diff(now, self.level_time) >= self.debounce_time:
+                if level:
+                    self._pressed(self.level_time)
+                else:
+                    self._released(self.level_time)
+
+        # Record that the button has been held down long enough.
+        if self.button_pressed_down and not self.long_press_fired \
+           and self.long_press_callback \
+           and ticks_diff(now, self.pressed_time) >= self.long_press_duration:
+            self.long_press_fired = True
+            self.long_press_callback()
 
+        # No second press came along, so it was a single press after all.
+        if not self.button_pressed_down and self.pending_release_time >= 0 \
+           and ticks_diff(now, self.pending_release_time) \
+           > self.double_press_interval:
+            self.pending_release_time = -1
+            self._fire(self.release_event_callback)
+
+    def _pressed(self, now):
+        # Too late to be the second press of a double press
+        if self.pending_release_time >= 0 \
+           and ticks_diff(now, self.pending_release_time) \
+           > self.double_press_interval:
+            self.pending_release_time = -1
+            self._fire(self.release_event_callback)
+
+        self.button_pressed_down = True
+        self.pressed_time = now
+        self.long_press_fired = False
+
+    def _released(self, now):
         # For a button which was pressed but is no longer being pressed, invoke
-        # the release callback.
-        if self.button_pressed_down:
-            self.button_pressed_down = False
-            if self.release_event_callback:
-                self.release_event_callback()
+        # the appropriate callback.
+        self.button_pressed_down = False
+        if self.long_press_fired:
+            return
+        if not self.double_press_callback:
+            self._fire(self.release_event_callback)
+        elif self.pending_release_time >= 0:
+            self.pending_release_time = -1
+            self.double_press_callback()
+        else:
+            self.pending_release_time = now
+
+    def _fire(self, callback):
+        if callback:
+            callback()
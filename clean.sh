@@ -1,6 +1,7 @@
 #!/bin/bash
 rm -fr songs/__pycache__
 rm -f songs/*.bin
+rm -f shows/*.bin
 rm -f songs/*~
 rm -f *.mpy
 rm -f *~
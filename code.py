@@ -21,56 +21,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-import gc
-
-from neopixel import NeoPixel
-from board import D4, A3
-
-from button import Button
-
-import pixelsoff
-import vumeter
-import stairs
-import twinkle
-
-print("gc: " + str(gc.isenabled()))
-
-active_led_animation = 0
-def next_led_animation(jump_to_animation = -1):
-    global led_animations, active_led_animation
-
-    # End the old animation
-    led_animations[active_led_animation].end()
-
-    # Determine the next animation
-    if jump_to_animation == -1:
-        active_led_animation = (active_led_animation + 1) % len(led_animations)
-    else:
-        active_led_animation = jump_to_animation
-    print("active led animation ", led_animations[active_led_animation])
-
-    # Begin the new animation
-    led_animations[active_led_animation].begin()
-
-def button_a_pressed():
-    next_led_animation()
-
-#Arguments are data port, number of LEDs, brightness, auto-write
-pixels = NeoPixel(A3, 6, brightness=0.5, auto_write=False)
-
-led_animations = [
-    pixelsoff.PixelsOff(pixels),
-    vumeter.VuMeter(pixels, 100, 400),
-    stairs.Stairs(pixels),
-    twinkle.Twinkle(pixels)
-]
-
-buttonA = Button(D4, button_a_pressed);
-
-pixels.fill(0)
-pixels.show()
-
-while True:
-    buttonA.read()
-    led_animations[active_led_animation].update()
-    gc.collect()
+# Record every input into a trace on the USB data port, for host/replay.py
+# to play back. Has to come before anything else imports the modules it
+# records. The stream animation can't use the data port at the same time.
+TRACE = False
+if TRACE:
+    import tracing
+    tracing.install()
+
+# Everything else is in ravetie.py, which compile.sh compiles along with the
+# animations, so the board doesn't compile it at every boot
+import ravetie
+ravetie.main()
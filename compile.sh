@@ -2,8 +2,12 @@
 compiler=./mpy-cross-7.3-macos.bin
 
 for f in *.py; do
-    if [[ $f != code.py ]]; then
+    if [[ $f != code.py && $f != boot.py ]]; then
 	echo "compiling: $f"
 	$compiler $f
     fi
 done
+
+# Bake the light shows played back by playback.Playback
+echo "baking: shows/twinkle.bin"
+python3 host/bake.py twinkle.Twinkle shows/twinkle.bin --seconds 60
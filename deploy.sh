@@ -7,3 +7,10 @@ cp *.mpy $dest
 
 echo "Deploying: code.py"
 cp code.py $dest
+
+echo "Deploying: boot.py"
+cp boot.py $dest
+
+echo "Deploying: shows"
+mkdir -p ${dest}shows
+cp shows/*.bin ${dest}shows/
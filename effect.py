@@ -0,0 +1,326 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from array import array
+from random import randint
+from micropython import const
+from board import A1, A2, A4, A5, A6, A7
+
+from ticks import ticks_add, ticks_diff
+from palette import PALETTES, NAMES, scale
+from particles import Particles
+from effects import EFFECTS
+
+# Effect programs are bytes:
+#
+#   motion (1 byte), one of the motions below
+#   parameter count, then that many bytes the motion uses as described below
+#   palette count, then each palette: color count, then r, g, b per color,
+#       or a color count of 0, then the number of a palette in palette.NAMES
+#   timing count, then each timing: 4 numbers of 2 bytes, little endian,
+#       which the motion uses as described below
+#   tap count, then each tap: pad (index into PADS), action
+#
+# Tapping cycles the palettes or the timings, so effects with more than one
+# of either get the same kind of controls Stairs and Twinkle have. While the
+# beat tracker hears a beat, the motions keep time with it instead of the
+# timing, as described below.
+
+# Every pixel in the palette's first color. Timing: none.
+SOLID = const(0)
+# Comets bouncing up and down the strip, each in the next palette color.
+# Parameters: number of comets, trail length, brightness of each trail pixel
+# out of 256 relative to the one before, 1 to draw the trail either side of
+# the head. Timing: milliseconds per step, milliseconds to rest when turning
+# round at either end. On the beat: the length of the strip every beat.
+COMETS = const(1)
+# Random pixels lit in random palette colors for a while. Timing: least and
+# most milliseconds a pixel stays lit, least and most milliseconds until the
+# next pixel is lit. On the beat: a pixel lit on every beat too.
+SPARKLE = const(2)
+# Every so many pixels lit, moving along a pixel at a time, in the palette's
+# colors in turn. Timing: milliseconds per step, pixels between lit pixels.
+# On the beat: one lit pixel's place to the next every beat.
+CHASE = const(3)
+# The whole strip fading up and down, a palette color per breath. Timing:
+# milliseconds per breath, steps per breath. On the beat: brightest on
+# every beat.
+BREATHE = const(4)
+
+# Tap actions
+NEXT_PALETTE = const(1)
+NEXT_TIMING = const(2)
+
+# Pads the tap bindings refer to, by index
+PADS = (A1, A2, A4, A5, A6, A7)
+
+class Effect:
+    """ Runs an animation described by a few bytes of data rather than by
+    its own class. The programs are in the effects module, by name; adding an
+    effect only takes adding its program there.
+    """
+
+    def __init__(self, pixels, name):
+        """
+        Args:
+            pixels (FrameBuffer): Frame buffer to draw into
+            name (str): Name of the effect's program in effects.EFFECTS
+        """
+
+        self.pixels = pixels
+        self.num_pixels = len(pixels)
+        self.name = name
+
+    def begin(self):
+        print("effect: begin " + self.name)
+        program = EFFECTS[self.name]
+        self.program = program
+        self.motion = program[0]
+        # Where the motion's parameters start
+        self.parameters = 2
+        i = 2 + program[1]
+
+        # Each palette's colors, packed. A named palette is the shared one,
+        # so it costs nothing here.
+        count = program[i]
+        self.palettes = [None] * count
+        i += 1
+        for palette in range(count):
+            size = program[i]
+            if size == 0:
+                self.palettes[palette] = PALETTES[NAMES[program[i + 1]]]
+                i += 2
+            else:
+                self.palettes[palette] = tuple(
+                    (program[c] << 16) | (program[c + 1] << 8)
+                    | program[c + 2]
+                    for c in range(i + 1, i + 1 + 3 * size, 3))
+                i += 1 + 3 * size
+
+        count = program[i]
+        self.timings = array('H', [0] * (4 * count))
+        i += 1
+        for t in range(4 * count):
+            self.timings[t] = program[i] | (program[i + 1] << 8)
+            i += 2
+
+        # key: pinId, value: action
+        self.tap_effects = {}
+        for tap in range(program[i]):
+            pad = program[i + 1 + 2 * tap]
+            self.tap_effects[id(PADS[pad])] = program[i + 2 + 2 * tap]
+
+        self.active_palette = 0
+        self.active_timing = 0
+        self.step = 0
+        # Milliseconds between beats while following the music, otherwise 0
+        self.beat_period = 0
+        # Comets
+        self.particles = None
+        if self.motion == COMETS:
+            self.particles = Particles(
+                self.num_pixels, self._parameter(0) or 1, self._parameter(1),
+                self._parameter(2), self._parameter(3))
+            self.particles.set_speed(self._timing(0), self._timing(1))
+            # Made once, so drawing doesn't make a bound method every frame
+            self.color_of = self._color
+            self.last_update = -1
+        # Sparkle: ticks each pixel goes off at, and whether it is lit
+        self.off_times = array('l', [0] * self.num_pixels)
+        self.lit = bytearray(self.num_pixels)
+        self.next_sparkle = -1
+        self.pixels.fill(0)
+
+    def tapped(self, pin):
+        """
+        Depending on the pin tapped, invoke the associated action
+        """
+
+        action = self.tap_effects.get(id(pin))
+        if action == NEXT_PALETTE:
+            self.active_palette \
+                = (self.active_palette + 1) % len(self.palettes)
+        elif action == NEXT_TIMING:
+            self.active_timing \
+                = (self.active_timing + 1) % (len(self.timings) // 4)
+            self._timing_changed()
+
+    def beat(self, now, period):
+        """ Keep time with the music. Called on every beat with the
+        milliseconds between beats, and with 0 once the beat is lost, which
+        goes back to the timing.
+        """
+
+        changed = period != self.beat_period
+        self.beat_period = period
+        motion = self.motion
+        if motion == COMETS:
+            if changed:
+                self._timing_changed()
+        elif motion == SPARKLE:
+            if period:
+                self.next_sparkle = now
+        elif motion == BREATHE:
+            if period:
+                # Brightest at the middle of the breath
+                steps = self._timing(1) or 1
+                self.step = self.step - self.step % steps + steps // 2
+
+    def settings(self):
+        """ Active palette and timing packed in a byte, to be saved """
+        return (self.active_palette << 4) | self.active_timing
+
+    def restore(self, settings):
+        """ Go back to the palette and timing from settings() """
+        self.active_palette = (settings >> 4) % len(self.palettes)
+        self.active_timing = (settings & 0xf) % (len(self.timings) // 4)
+        self._timing_changed()
+
+    def update(self, now):
+        motion = self.motion
+        if motion == COMETS:
+            return self._comets(now)
+        if motion == SPARKLE:
+            return self._sparkle(now)
+        if motion == CHASE:
+            return self._chase()
+        if motion == BREATHE:
+            return self._breathe()
+        self.pixels.fill(self._color(0))
+        return 1000
+
+    def end(self):
+        print("effect: end")
+        self.program = None
+        self.palettes = None
+        self.timings = None
+        self.tap_effects = None
+        self.off_times = None
+        self.lit = None
+        self.particles = None
+        self.color_of = None
+
+    def _parameter(self, index):
+        """ The motion's parameter, 0 if the program leaves it out """
+        if index >= self.program[1]:
+            return 0
+        return self.program[self.parameters + index]
+
+    def _timing_changed(self):
+        if self.particles is None:
+            return
+        if self.beat_period:
+            self.particles.set_speed(
+                self.beat_period // max(self.num_pixels - 1, 1), 0)
+        else:
+            self.particles.set_speed(self._timing(0), self._timing(1))
+
+    def _color(self, index):
+        """ Color of the active palette, wrapping round """
+        palette = self.palettes[self.active_palette]
+        return palette[index % len(palette)]
+
+    def _timing(self, index):
+        return self.timings[4 * self.active_timing + index]
+
+    def _comets(self, now):
+        # Comets that haven't moved for a long while just carry on from
+        # where they were
+        elapsed = 0
+        if self.last_update >= 0:
+            elapsed = min(ticks_diff(now, self.last_update), 1000)
+        self.last_update = now
+        wait = self.particles.move(elapsed)
+        self.particles.render(self.pixels, self.color_of)
+        return wait
+
+    def _sparkle(self, now):
+        pixels = self.pixels
+        off_times = self.off_times
+        lit = self.lit
+        wait = self._timing(3)
+
+        # Turn off the pixels whose time is up
+        for i in range(self.num_pixels):
+            if lit[i]:
+                left = ticks_diff(off_times[i], now)
+                if left <= 0:
+                    lit[i] = 0
+                    pixels[i] = 0
+                elif left < wait:
+                    wait = left
+
+        # Light another, starting from a random pixel and taking the first
+        # one that is off
+        if self.next_sparkle < 0 or ticks_diff(now, self.next_sparkle) >= 0:
+            start = randint(0, self.num_pixels - 1)
+            for i in range(self.num_pixels):
+                pixel = (start + i) % self.num_pixels
+                if not lit[pixel]:
+                    duration = randint(self._timing(0), self._timing(1))
+                    lit[pixel] = 1
+                    off_times[pixel] = ticks_add(now, duration)
+                    pixels[pixel] = self._color(
+                        randint(0, len(self.palettes[self.active_palette])
+                                - 1))
+                    if duration < wait:
+                        wait = duration
+                    break
+            gap = randint(self._timing(2), self._timing(3))
+            self.next_sparkle = ticks_add(now, gap)
+            if gap < wait:
+                wait = gap
+        else:
+            left = ticks_diff(self.next_sparkle, now)
+            if left < wait:
+                wait = left
+        return wait
+
+    def _chase(self):
+        pixels = self.pixels
+        spacing = self._timing(1) or 1
+        for i in range(self.num_pixels):
+            position = i + self.step
+            if position % spacing == 0:
+                pixels[i] = self._color(position // spacing)
+            else:
+                pixels[i] = 0
+        # Move along, back round before the count gets big
+        self.step = (self.step - 1) \
+            % (spacing * len(self.palettes[self.active_palette]))
+        if self.beat_period:
+            return self.beat_period // spacing
+        return self._timing(0)
+
+    def _breathe(self):
+        steps = self._timing(1) or 1
+        half = steps // 2 or 1
+        # Up for half of the breath, then back down
+        step = self.step % steps
+        level = step if step < half else steps - step
+        level = min(level * 255 // half, 255)
+        self.pixels.fill(scale(self._color(self.step // steps), level))
+        self.step = (self.step + 1) \
+            % (steps * len(self.palettes[self.active_palette]))
+        if self.beat_period:
+            return self.beat_period // steps
+        return self._timing(0) // steps
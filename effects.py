@@ -0,0 +1,112 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+# Programs for effect.Effect, by name. See effect.py for the format. Each
+# program is a single bytes constant so it stays as small in RAM as it looks.
+#
+# Timings are 4 numbers of 2 bytes each, little endian; unused ones are 0.
+# A palette of 0 colors is a named one from palette.py: 0 red, 1 purple,
+# 2 green, 3 blue, 4 gold, 5 rave, 6 warm, 7 cool.
+# Taps: pad 0 is A1, pad 4 is A6; action 1 is next palette, 2 next timing.
+
+# 3 LEDs climbing up and down the stairs: a comet with a pixel of trail at a
+# tenth either side. Tapping A1 varies the colors, tapping A6 the speeds.
+STAIRS = (
+    b"\x01"                                 # comets
+    b"\x04\x01\x01\x1a\x01"                 # 1 comet, trail 1 at 26/256,
+                                            # both ways
+    b"\x05"                                 # 5 palettes
+    b"\x00\x00"                             # red
+    b"\x00\x01"                             # purple
+    b"\x00\x02"                             # green
+    b"\x00\x03"                             # blue
+    b"\x00\x04"                             # gold
+    b"\x03"                                 # 3 timings: step, turn
+    b"\x01\x00\x0a\x00\x00\x00\x00\x00"     # 1, 10
+    b"\x96\x00\xf4\x01\x00\x00\x00\x00"     # 150, 500
+    b"\x2c\x01\xe8\x03\x00\x00\x00\x00"     # 300, 1000
+    b"\x02\x00\x01\x04\x02")                # A1 colors, A6 speeds
+
+# Pixels sparkling for a moment in a random color. Tapping A1 varies the
+# colors, tapping A6 the speeds.
+SPARKLE = (
+    b"\x02"                                 # sparkle
+    b"\x00"                                 # no parameters
+    b"\x03"                                 # 3 palettes
+    b"\x00\x06"                             # warm
+    b"\x00\x07"                             # cool
+    b"\x06\xff\x00\x00\xff\x80\x00\xff\xff\x00"     # rainbow
+    b"\x00\xff\x00\x00\x00\xff\x80\x00\xff"
+    b"\x02"                                 # 2 timings: lit, until next
+    b"\xc8\x00\xe8\x03\x32\x00\x2c\x01"     # 200-1000, 50-300
+    b"\xf4\x01\xc4\x09\xc8\x00\x20\x03"     # 500-2500, 200-800
+    b"\x02\x00\x01\x04\x02")                # A1 colors, A6 speeds
+
+# Every third pixel lit, running along the strip. Tapping A1 varies the
+# colors, tapping A6 the speed and spacing.
+CHASE = (
+    b"\x03"                                 # chase
+    b"\x00"                                 # no parameters
+    b"\x02"                                 # 2 palettes
+    b"\x03\xff\x00\x00\x00\xff\x00\x00\x00\xff"     # red, green, blue
+    b"\x01\xff\xff\xff"                     # white
+    b"\x02"                                 # 2 timings: step, spacing
+    b"\x64\x00\x03\x00\x00\x00\x00\x00"     # 100, 3
+    b"\x28\x00\x02\x00\x00\x00\x00\x00"     # 40, 2
+    b"\x02\x00\x01\x04\x02")                # A1 colors, A6 speeds
+
+# The whole strip slowly breathing in and out. Tapping A1 varies the colors,
+# tapping A6 the speed.
+BREATHE = (
+    b"\x04"                                 # breathe
+    b"\x00"                                 # no parameters
+    b"\x02"                                 # 2 palettes
+    b"\x03\x00\x00\xff\x80\x00\x80\x00\x80\x80"     # blue, purple, teal
+    b"\x01\xff\x40\x00"                     # orange
+    b"\x02"                                 # 2 timings: breath, steps
+    b"\xa0\x0f\x32\x00\x00\x00\x00\x00"     # 4000, 50
+    b"\xdc\x05\x1e\x00\x00\x00\x00\x00"     # 1500, 30
+    b"\x02\x00\x01\x04\x02")                # A1 colors, A6 speeds
+
+# Several comets with long trails passing through each other. Tapping A1
+# varies the colors, tapping A6 the speeds.
+COMETS = (
+    b"\x01"                                 # comets
+    b"\x04\x04\x04\x8c\x00"                 # 4 comets, trail 4 at 140/256
+    b"\x02"                                 # 2 palettes
+    b"\x00\x05"                             # rave: red, purple,
+                                            # green, blue, gold
+    b"\x03\xff\x20\x00\xff\x80\x00\xff\xe0\x40"     # fire
+    b"\x03"                                 # 3 timings: step, turn
+    b"\x28\x00\x00\x00\x00\x00\x00\x00"     # 40, 0
+    b"\x0f\x00\x00\x00\x00\x00\x00\x00"     # 15, 0
+    b"\x50\x00\xc8\x00\x00\x00\x00\x00"     # 80, 200
+    b"\x02\x00\x01\x04\x02")                # A1 colors, A6 speeds
+
+EFFECTS = {
+    "stairs": STAIRS,
+    "comets": COMETS,
+    "sparkle": SPARKLE,
+    "chase": CHASE,
+    "breathe": BREATHE,
+}
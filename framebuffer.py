@@ -0,0 +1,200 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+class Canvas:
+    """ Colors drawn by an animation that don't go out to the pixels by
+    themselves, such as a layer for the Layers animation to put together.
+    Animations draw into it just as they draw into a FrameBuffer. dirty is
+    set whenever a color changes, so whoever reads the colors can tell when
+    there is nothing new.
+    """
+
+    def __init__(self, num_pixels):
+        """
+        Args:
+            num_pixels (int): Length of the strip
+        """
+
+        self.num_pixels = num_pixels
+        # Colors as the animations drew them, 3 bytes per pixel
+        self.buf = bytearray(num_pixels * 3)
+        # Made once so copying a whole frame doesn't allocate a slice
+        self.all_bytes = slice(0, num_pixels * 3)
+        self.dirty = False
+
+    def __len__(self):
+        return self.num_pixels
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.num_pixels
+        offset = index * 3
+        return (self.buf[offset], self.buf[offset + 1], self.buf[offset + 2])
+
+    def __setitem__(self, index, color):
+        self._store(index, color)
+
+    def _store(self, index, color):
+        """ Store the color of the pixel at index. Returns the offset of its
+        bytes in buf if the color changed, otherwise -1.
+        """
+
+        if index < 0:
+            index += self.num_pixels
+        if isinstance(color, int):
+            r = (color >> 16) & 0xff
+            g = (color >> 8) & 0xff
+            b = color & 0xff
+        else:
+            r, g, b = color
+
+        # Only a different color makes the frame dirty
+        buf = self.buf
+        offset = index * 3
+        if buf[offset] != r or buf[offset + 1] != g or buf[offset + 2] != b:
+            buf[offset] = r
+            buf[offset + 1] = g
+            buf[offset + 2] = b
+            self.dirty = True
+            return offset
+        return -1
+
+    def blit(self, colors):
+        """ Replace the whole frame with colors, r, g, b bytes for every
+        pixel, such as a frame received in one piece. Copies it in one go
+        rather than a pixel at a time.
+        """
+
+        self.buf[self.all_bytes] = colors
+        self.dirty = True
+
+    def fill(self, color):
+        for i in range(self.num_pixels):
+            self[i] = color
+
+class FrameBuffer(Canvas):
+    """ Sits between the animations and the NeoPixels. Animations set pixels
+    as often as they like; the main loop calls show() once per frame, and the
+    pixels are only pushed out when something actually changed. Each push is
+    a blocking transfer to the strip, so skipping the redundant ones leaves
+    more of the frame for the animation.
+
+    Brightness and gamma correction are applied here through a 256 entry
+    table, worked out only when the brightness changes. The NeoPixels are
+    left at full brightness so the driver doesn't scale every channel again
+    on each push, and a whole frame goes out with one slice assignment.
+    """
+
+    def __init__(self, pixels, brightness=1.0, gamma=1.0):
+        """
+        Args:
+            pixels (NeoPixel): NeoPixel object, created with auto_write=False
+            and brightness=1.0
+            brightness (float): Between 0.0 and 1.0
+            gamma (float): Gamma correction exponent. 1.0 leaves the colors
+            as they are; around 2.2 makes the fades look even to the eye.
+        """
+
+        super().__init__(len(pixels))
+        self.pixels = pixels
+        # The colors corrected for gamma and brightness
+        self.out = bytearray(self.num_pixels * 3)
+        # Made once so pushing a frame doesn't allocate a slice
+        self.all_pixels = slice(0, self.num_pixels)
+        # The corrected colors pushed last, and whether they are still what
+        # is on the strip
+        self.shown = bytearray(self.num_pixels * 3)
+        self.current = False
+        self.gamma = gamma
+        self.levels = bytearray(256)
+        self.brightness = brightness
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, brightness):
+        self._brightness = min(max(brightness, 0.0), 1.0)
+        self._build_levels()
+        # Correct what has already been drawn
+        self._correct()
+
+    def _correct(self):
+        """ Work out every corrected color from the drawn ones """
+        buf = self.buf
+        out = self.out
+        levels = self.levels
+        for i in range(len(buf)):
+            out[i] = levels[buf[i]]
+        self.dirty = True
+
+    def _build_levels(self):
+        """ Output level for each 0-255 input level """
+        top = 255 * self._brightness
+        for i in range(256):
+            level = int(top * (i / 255) ** self.gamma + 0.5)
+            # Keep dim colors from disappearing altogether
+            if level == 0 and i > 0 and top > 0:
+                level = 1
+            self.levels[i] = level
+
+    def __setitem__(self, index, color):
+        # Only a changed color needs correcting
+        offset = self._store(index, color)
+        if offset >= 0:
+            buf = self.buf
+            levels = self.levels
+            out = self.out
+            out[offset] = levels[buf[offset]]
+            out[offset + 1] = levels[buf[offset + 1]]
+            out[offset + 2] = levels[buf[offset + 2]]
+
+    def blit(self, colors):
+        self.buf[self.all_bytes] = colors
+        self._correct()
+
+    def show(self):
+        """ Push the pixels out to the strip if they changed since the last
+        push. Returns True if they were pushed.
+        """
+
+        if not self.dirty:
+            return False
+        self.dirty = False
+        # A pixel may have changed and changed back during the frame, such
+        # as when an animation clears the strip before drawing it again
+        out = self.out
+        if self.current and out == self.shown:
+            return False
+        self.shown[self.all_bytes] = out
+        self.current = True
+        self.pixels[self.all_pixels] = out
+        self.pixels.show()
+        return True
+
+    def invalidate(self):
+        """ Push the pixels at the next show() even if they are the same as
+        the last push, such as once something else has been on the strip
+        """
+        self.dirty = True
+        self.current = False
@@ -0,0 +1,45 @@
+""" Host stand-in for CircuitPython's alarm module. Sleeping moves the virtual
+clock forward to the next scripted press that sets off one of the alarms.
+Deep sleep raises DeepSleep, which stands in for code.py restarting; the
+caller catches it, sets wake_alarm and starts over.
+"""
+
+import sim
+from alarm import pin
+
+# Kept across deep sleep
+sleep_memory = bytearray(256)
+
+# Alarm that woke the board from deep sleep, if any
+wake_alarm = None
+
+class DeepSleep(Exception):
+    """ Raised instead of restarting code.py after deep sleep """
+
+    def __init__(self, alarm):
+        super().__init__("woken by " + repr(alarm))
+        self.alarm = alarm
+
+def _sleep_until(alarms):
+    woken = None
+    when = None
+    for alarm in alarms:
+        at = sim.next_value(alarm.pin, alarm.value, sim.clock.ns)
+        if at is not None and (when is None or at < when):
+            woken, when = alarm, at
+    if woken is None:
+        raise RuntimeError("no alarm would ever go off")
+    sim.clock.ns = max(sim.clock.ns, when)
+    return woken
+
+def light_sleep_until_alarms(*alarms):
+    for alarm in alarms:
+        sim.claim(alarm.pin)
+    try:
+        return _sleep_until(alarms)
+    finally:
+        for alarm in alarms:
+            sim.release(alarm.pin)
+
+def exit_and_deep_sleep_until_alarms(*alarms):
+    raise DeepSleep(_sleep_until(alarms))
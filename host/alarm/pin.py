@@ -0,0 +1,12 @@
+""" Host stand-in for CircuitPython's alarm.pin module """
+
+class PinAlarm:
+
+    def __init__(self, pin, value, edge=False, pull=False):
+        self.pin = pin
+        self.value = value
+        self.edge = edge
+        self.pull = pull
+
+    def __repr__(self):
+        return "<PinAlarm {!r} value={}>".format(self.pin, self.value)
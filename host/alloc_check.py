@@ -0,0 +1,264 @@
+""" Checks that the main loop doesn't allocate: every animation's update(),
+the input reads and the frame buffer's show() must stay within an allocation
+budget per frame, zero by default.
+
+CPython allocates for things MicroPython doesn't, like every int over 256, so
+the heap can't be measured directly. Instead the bytecode of the repository's
+modules is traced while the loop runs and every instruction that allocates
+on MicroPython is counted: building a list, tuple, dict, set, slice or
+string, making a function or closure, starting a generator, calling an
+allocating builtin like list(), bytes() or enumerate(), and the methods
+that grow or copy a container. The host stand-ins aren't traced. Joining
+strings with + or % looks the same as arithmetic in the bytecode, so it isn't
+caught.
+
+Each animation is run like in bench.py, with the pads tapped every few
+seconds so that the tap handling is checked too, and with the profiler on so
+that it is checked as well.
+
+Usage:
+    python3 host/alloc_check.py [--seconds 10] [--budget 0] [--only stairs]
+"""
+
+import argparse
+import contextlib
+import dis
+import inspect
+import os
+import random
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+from neopixel import NeoPixel
+from button import Button
+from tap import Tap
+from framebuffer import FrameBuffer
+from scheduler import Scheduler
+from beattracker import BeatTracker
+from profiler import Profiler, SHOW, GC
+
+import bake
+import bench
+import twinkle
+
+# Instructions that always allocate
+ALLOCATING_OPCODES = {
+    "BUILD_TUPLE", "BUILD_LIST", "BUILD_MAP", "BUILD_SET",
+    "BUILD_CONST_KEY_MAP", "BUILD_STRING", "BUILD_SLICE", "FORMAT_VALUE",
+    "MAKE_FUNCTION", "CALL_FUNCTION_EX", "LIST_TO_TUPLE",
+}
+
+# Builtins and functions that return a new object when called
+ALLOCATING_CALLS = {
+    "list", "tuple", "dict", "set", "frozenset", "bytes", "bytearray", "str",
+    "repr", "format", "filter", "map", "zip", "enumerate", "reversed",
+    "sorted", "iter", "memoryview", "slice", "array", "print", "divmod",
+}
+
+# Methods that grow or copy the container they are called on
+ALLOCATING_METHODS = {
+    "append", "extend", "insert", "items", "keys", "values", "copy",
+    "format", "join", "split", "encode", "decode", "to_bytes",
+}
+
+def allocation_sites(code):
+    """ Offsets of the instructions in code that allocate, mapped to what
+    they do
+    """
+
+    sites = {}
+    generator = code.co_flags & (inspect.CO_GENERATOR | inspect.CO_COROUTINE)
+    for instruction in dis.get_instructions(code):
+        name = instruction.opname
+        if name == "RESUME" and instruction.arg == 0 and generator:
+            # The generator is made before it can be traced, so it is
+            # counted when it first runs instead
+            sites[instruction.offset] = "generator"
+        elif name in ALLOCATING_OPCODES:
+            if name == "BUILD_TUPLE" and instruction.arg == 0:
+                continue
+            sites[instruction.offset] = name
+        elif name == "LOAD_GLOBAL" and instruction.arg & 1 \
+                and instruction.argval in ALLOCATING_CALLS:
+            # Only counted when loaded to be called
+            sites[instruction.offset] = instruction.argval + "()"
+        elif name == "LOAD_METHOD" \
+                and instruction.argval in ALLOCATING_METHODS:
+            sites[instruction.offset] = "." + instruction.argval + "()"
+    return sites
+
+class AllocationTracer:
+    """ Counts the allocating instructions run in the repository's modules
+    while it is started
+    """
+
+    def __init__(self):
+        self.sites = {} # key: code object, value: allocation_sites()
+        self.counts = Counter() # key: (file, line, what), value: count
+        self.total = 0
+
+    def traced(self, code):
+        filename = code.co_filename
+        return filename.startswith(sim.REPO_DIR + os.sep) \
+            and not filename.startswith(sim.HOST_DIR + os.sep)
+
+    def start(self):
+        sys.settrace(self._call)
+
+    def stop(self):
+        sys.settrace(None)
+
+    def _call(self, frame, event, arg):
+        code = frame.f_code
+        if not self.traced(code):
+            return None
+        if code not in self.sites:
+            self.sites[code] = allocation_sites(code)
+        frame.f_trace_opcodes = True
+        frame.f_trace_lines = False
+        self._opcode(frame, "opcode", None)
+        return self._opcode
+
+    def _opcode(self, frame, event, arg):
+        if event == "opcode":
+            what = self.sites[frame.f_code].get(frame.f_lasti)
+            if what:
+                self.total += 1
+                self.counts[(os.path.relpath(frame.f_code.co_filename,
+                                             sim.REPO_DIR),
+                             frame.f_lineno, what)] += 1
+        return self._opcode
+
+class Result:
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.allocations = 0
+        self.max_allocations = 0
+        self.sites = Counter()
+
+def check(name, factory, args):
+    sim.reset()
+    sim.set_audio_source(bench.audio_source(args.audio))
+    bench.script_taps(args.seconds)
+    random.seed(0)
+
+    pixels = NeoPixel(board.A3, args.pixels, auto_write=False)
+    pixels.frames = None
+    frame = FrameBuffer(pixels, brightness=0.5, gamma=2.2)
+    button_a = Button(board.D4, None)
+    button_b = Button(board.D5, None)
+    animation = factory(frame)
+    pads = Tap([board.A1, board.A2, board.A4, board.A5, board.A6, board.A7],
+               animation.tapped)
+    animation.begin()
+
+    # Listening for the beat like ravetie.py does
+    def beat_found(now, period):
+        animation.beat(now, period)
+        scheduler.wake(now)
+
+    beat_tracker = BeatTracker(beat_found)
+    if hasattr(animation, "beat"):
+        beat_tracker.begin()
+
+    def read_inputs(now):
+        button_a.read(now)
+        button_b.read(now)
+        pads.read()
+        if beat_tracker.listening:
+            beat_tracker.read(now)
+
+    scheduler = Scheduler(bench.INPUT_PERIOD, read_inputs)
+    scheduler.set_animation(animation)
+    profiler = Profiler(1)
+    profiler.enable()
+    scheduler.profiler = profiler
+
+    result = Result(name)
+    tracer = AllocationTracer()
+    end_ns = sim.clock.ns + args.seconds * 1000000000
+    while sim.clock.ns < end_ns:
+        before = tracer.total
+        tracer.start()
+        if scheduler.run_due():
+            frame.show()
+            profiler.mark(SHOW)
+            profiler.mark(GC)
+            profiler.end(0)
+        tracer.stop()
+        grown = tracer.total - before
+        result.max_allocations = max(result.max_allocations, grown)
+        scheduler.sleep()
+    result.frames = scheduler.frames
+    result.allocations = tracer.total
+    result.sites = tracer.counts
+
+    animation.end()
+    beat_tracker.end()
+    pads.deinit()
+    button_b.deinit()
+    button_a.deinit()
+    pixels.deinit()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--seconds", type=int, default=10,
+                        help="virtual seconds to run each animation for")
+    parser.add_argument("--pixels", type=int, default=6,
+                        help="number of pixels on the strip")
+    parser.add_argument("--audio", default="noise",
+                        help="silence, tone, noise, clicks or the path to a "
+                        "WAV file")
+    parser.add_argument("--budget", type=int, default=0,
+                        help="most allocations allowed in one frame")
+    parser.add_argument("--only", action="append",
+                        help="only check the named animation")
+    args = parser.parse_args()
+
+    results = []
+    with open(os.devnull, "w") as devnull:
+        if not args.only or "playback" in args.only:
+            with contextlib.redirect_stdout(devnull):
+                sim.reset()
+                random.seed(0)
+                bake.bake(twinkle.Twinkle, bench.SHOW_PATH, args.pixels,
+                          args.seconds)
+        for name, factory in bench.ANIMATIONS:
+            if args.only and name not in args.only:
+                continue
+            with contextlib.redirect_stdout(devnull):
+                results.append(check(name, factory, args))
+
+    header = "{:<10} {:>8} {:>12} {:>16}".format(
+        "animation", "frames", "allocations", "most in a frame")
+    print(header)
+    print("-" * len(header))
+    failed = False
+    for r in results:
+        print("{:<10} {:>8} {:>12} {:>16}".format(
+            r.name, r.frames, r.allocations, r.max_allocations))
+        if r.max_allocations > args.budget:
+            failed = True
+    for r in results:
+        if r.max_allocations > args.budget:
+            print()
+            print(r.name + ":")
+            for (filename, line, what), count in r.sites.most_common():
+                print("    {}:{} {} x{}".format(filename, line, what, count))
+
+    print("budget {} allocations per frame".format(args.budget))
+    if failed:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
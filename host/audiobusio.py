@@ -0,0 +1,42 @@
+""" Host stand-in for CircuitPython's audiobusio module. The microphone plays
+back whatever source was handed to sim.set_audio_source(), and recording
+takes as long on the virtual clock as it does on the board.
+"""
+
+import sim
+
+class PDMIn:
+
+    def __init__(self, clock_pin, data_pin, *, sample_rate=16000,
+                 bit_depth=8, mono=True, oversample=64, startup_delay=0.11):
+        sim.claim(clock_pin)
+        try:
+            sim.claim(data_pin)
+        except ValueError:
+            sim.release(clock_pin)
+            raise
+        self.clock_pin = clock_pin
+        self.data_pin = data_pin
+        self.sample_rate = sample_rate
+        self.bit_depth = bit_depth
+        sim.clock.advance(startup_delay)
+
+    def deinit(self):
+        if self.clock_pin is not None:
+            sim.release(self.clock_pin)
+            sim.release(self.data_pin)
+            self.clock_pin = None
+            self.data_pin = None
+
+    def record(self, destination, destination_length):
+        if self.clock_pin is None:
+            raise ValueError("Object has been deinitialized")
+        start = sim.clock.ns
+        sim.audio_source().read(
+            destination, destination_length, self.sample_rate)
+        if self.bit_depth == 8:
+            for i in range(destination_length):
+                destination[i] >>= 8
+        sim.clock.ns += destination_length * 1000000000 // self.sample_rate
+        sim.audio_captured(start, sim.clock.ns)
+        return destination_length
@@ -0,0 +1,173 @@
+""" Bakes an animation into a light show file for playback.Playback.
+
+The animation is run on the virtual clock for as long as asked, and every
+frame it draws is recorded along with how long it stays up. Runs of the same
+frame are merged, and each frame only stores the pixels that changed unless
+storing all of them is smaller. The show loops, so bake a whole number of the
+animation's cycles if it has them.
+
+Arguments the animation takes after the frame buffer follow its class after
+a colon, separated by commas, like effect.Effect:comets for an effect's
+program or vumeter.VuMeter:100,400.
+
+Usage:
+    python3 host/bake.py twinkle.Twinkle shows/twinkle.bin [--seconds 60]
+        [--pixels 6] [--tap A1:5000]
+    python3 host/bake.py effect.Effect:stairs shows/stairs.bin
+"""
+
+import argparse
+import ast
+import importlib
+import os
+import random
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+from neopixel import NeoPixel
+from framebuffer import FrameBuffer
+from ticks import ticks_ms
+from playback import MAGIC, KEYFRAME
+
+# Longest a single frame record can stay up
+MAX_DELAY = 0xffff
+
+def animation_class(name):
+    """ Look up an animation class by "module.Class" """
+    module_name, _, class_name = name.rpartition(".")
+    if not module_name:
+        raise ValueError("expected module.Class, got " + name)
+    return getattr(importlib.import_module(module_name), class_name)
+
+def animation_factory(name):
+    """ Function that creates an animation, given the frame buffer, from
+    "module.Class" or "module.Class:arg,arg". Arguments that read as Python
+    literals, like numbers, are passed as those and the rest as strings.
+    """
+
+    class_name, _, args = name.partition(":")
+    cls = animation_class(class_name)
+    values = []
+    for arg in args.split(",") if args else ():
+        try:
+            values.append(ast.literal_eval(arg))
+        except (ValueError, SyntaxError):
+            values.append(arg)
+    return lambda pixels: cls(pixels, *values)
+
+def record(factory, num_pixels, seconds, taps=()):
+    """ Run the animation and return its frames as a list of
+    (delay ms, bytes of r, g, b for every pixel).
+
+    Args:
+        factory (def): Called with the frame buffer to create the animation
+        num_pixels (int): Length of the strip
+        seconds (int): Virtual seconds to run the animation for
+        taps (list): (pin, ms) pairs; the pin is tapped at that time
+    """
+
+    pixels = NeoPixel(board.A3, num_pixels, auto_write=False)
+    pixels.frames = None
+    frame = FrameBuffer(pixels)
+    animation = factory(frame)
+    animation.begin()
+
+    taps = sorted(taps, key=lambda tap: tap[1])
+    start_ns = sim.clock.ns
+    end_ms = seconds * 1000
+    elapsed_ms = 0
+    frames = []
+    while elapsed_ms < end_ms:
+        while taps and taps[0][1] <= elapsed_ms:
+            animation.tapped(taps.pop(0)[0])
+        # Never record past the end so the show loops on time
+        delay = min(animation.update(ticks_ms()), end_ms - elapsed_ms)
+        frames.append((delay, bytes(frame.buf)))
+        sim.clock.ns = start_ns + (elapsed_ms + delay) * 1000000
+        elapsed_ms += delay
+
+    animation.end()
+    pixels.deinit()
+    return frames
+
+def encode(frames, num_pixels):
+    """ Light show file contents for the frames """
+
+    out = bytearray(MAGIC)
+    out += struct.pack("<H", num_pixels)
+    shown = None
+    for delay, colors in merge(frames):
+        changed = [] if shown is None else [
+            i for i in range(num_pixels)
+            if colors[i * 3:i * 3 + 3] != shown[i * 3:i * 3 + 3]]
+        if shown is None or len(changed) * 5 >= num_pixels * 3:
+            out += struct.pack("<HH", delay, KEYFRAME)
+            out += colors
+        else:
+            out += struct.pack("<HH", delay, len(changed))
+            for i in changed:
+                out += struct.pack("<H", i)
+                out += colors[i * 3:i * 3 + 3]
+        shown = colors
+    return bytes(out)
+
+def merge(frames):
+    """ Merge runs of the same frame and split delays too long to store """
+
+    merged = []
+    for delay, colors in frames:
+        if merged and merged[-1][1] == colors:
+            merged[-1][0] += delay
+        else:
+            merged.append([delay, colors])
+    for delay, colors in merged:
+        while delay > MAX_DELAY:
+            yield MAX_DELAY, colors
+            delay -= MAX_DELAY
+        yield delay, colors
+
+def bake(factory, path, num_pixels, seconds, taps=()):
+    """ Record the animation and write it to the light show file at path.
+    Returns the number of bytes written.
+    """
+
+    data = encode(record(factory, num_pixels, seconds, taps), num_pixels)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+def parse_tap(value):
+    pin, _, ms = value.partition(":")
+    return getattr(board, pin), int(ms)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("animation",
+                        help="animation class and any arguments, like "
+                        "twinkle.Twinkle or effect.Effect:stairs")
+    parser.add_argument("path", help="light show file to write")
+    parser.add_argument("--seconds", type=int, default=60,
+                        help="virtual seconds of the animation to bake")
+    parser.add_argument("--pixels", type=int, default=6,
+                        help="number of pixels on the strip")
+    parser.add_argument("--tap", type=parse_tap, action="append", default=[],
+                        help="tap a pad at a time in ms, like A1:5000")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the animation's random choices")
+    args = parser.parse_args()
+
+    factory = animation_factory(args.animation)
+    random.seed(args.seed)
+    size = bake(factory, args.path, args.pixels, args.seconds, args.tap)
+    print("{}: {} bytes, {} seconds".format(args.path, size, args.seconds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+""" Checks the beat tracker against click tracks on the simulated microphone.
+
+At each tempo the tracker must find the beat within a few seconds, get the
+tempo to within 2 beats per minute and keep its beats within a frame of the
+clicks. It must not find a beat in silence, noise or a steady tone, must let
+go of the beat when the music stops and must not allocate while it listens.
+
+The tracker is read every 10 milliseconds, like the main loop in ravetie.py
+reads the inputs.
+
+Usage:
+    python3 host/beat_check.py [--seconds 20]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+from beattracker import BeatTracker
+from ticks import ticks_ms
+
+import alloc_check
+from checks import Check, quietly
+
+TEMPOS = (70, 90, 120, 128, 140, 174)
+
+# Same as ravetie.py
+INPUT_PERIOD = 10
+
+class BeatCheck(Check):
+
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+
+    def listen(self, source, seconds, tracer=None):
+        """ Run a tracker on the source for seconds of virtual time. Returns
+        the tracker and the seconds and period of every beat it called back.
+        """
+
+        sim.reset()
+        sim.set_audio_source(source)
+        beats = []
+
+        def beat_found(now, period):
+            beats.append((sim.clock.ns / 1000000000, period))
+
+        tracker = BeatTracker(beat_found)
+        with quietly():
+            tracker.begin()
+        while sim.clock.ns < seconds * 1000000000:
+            if tracer:
+                tracer.start()
+            tracker.read(ticks_ms())
+            if tracer:
+                tracer.stop()
+            sim.clock.advance_ms(INPUT_PERIOD)
+        return tracker, beats
+
+    def tempo(self, bpm):
+        tracker, beats = self.listen(sim.Clicks(bpm), self.seconds)
+        found = [at for at, period in beats if period]
+        period = 60 / bpm
+        # Milliseconds each of the second half's beats is off its click
+        errors = [abs(at - round(at / period) * period) * 1000
+                  for at in found if at >= self.seconds / 2]
+        self.expect("{} bpm found within 5 s".format(bpm),
+                    bool(found) and found[0] < 5)
+        self.expect("{} bpm tempo".format(bpm), abs(tracker.bpm - bpm) <= 2)
+        self.expect("{} bpm on the beat".format(bpm),
+                    bool(errors) and max(errors) <= 30)
+
+    def no_beat(self, name, source):
+        tracker, beats = self.listen(source, self.seconds)
+        self.expect("no beat in " + name, not beats)
+
+    def lost(self):
+        # Clicks for half the time, then silence
+        clicks = sim.Clicks(120)
+        silence = sim.Silence()
+
+        class Stopping:
+            def read(self, buf, n, sample_rate):
+                source = clicks if sim.clock.ns < 10000000000 else silence
+                source.read(buf, n, sample_rate)
+
+        tracker, beats = self.listen(Stopping(), 20)
+        lost = [at for at, period in beats if not period]
+        self.expect("beat lost when the music stops",
+                    len(lost) == 1 and lost[0] < 15 and tracker.period == 0)
+
+    def allocations(self):
+        tracer = alloc_check.AllocationTracer()
+        self.listen(sim.Clicks(120), 10, tracer)
+        self.expect_no_allocations("listening doesn't allocate", tracer)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--seconds", type=int, default=20,
+                        help="virtual seconds to listen to each tempo for")
+    args = parser.parse_args()
+
+    check = BeatCheck(args.seconds)
+    for bpm in TEMPOS:
+        check.tempo(bpm)
+    check.no_beat("silence", sim.Silence())
+    check.no_beat("noise", sim.Noise())
+    check.no_beat("a tone", sim.Tone(440))
+    check.lost()
+    check.allocations()
+    check.finish()
+
+if __name__ == "__main__":
+    main()
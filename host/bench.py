@@ -0,0 +1,269 @@
+""" Frame rate benchmark for every animation, run on the host against the
+stand-in hardware modules.
+
+Each animation is driven by the same scheduler as the main loop in ravetie.py.
+The virtual clock moves forward when the scheduler sleeps and by whatever the
+simulated hardware costs (microphone recording, NeoPixel transfers, touch
+calibration). Reports:
+
+    updates/s   update() calls per second of host CPU time
+    fps (sim)   update() calls per second of virtual board time
+    shows/s     show() calls per second of virtual board time
+    shows/frame show() calls per update()
+    wakes/s     main loop iterations per second of virtual board time; the
+                board sleeps the rest of the time
+    allocs/frame allocating instructions per update() and show(), counted
+                on MicroPython's terms by host/alloc_check.py's tracer
+    allocs max  most allocating instructions in one frame
+    input late  most milliseconds an input read came after it was due, such
+                as while the microphone was recording
+    mic ms      milliseconds the main loop is held up by each microphone
+                recording
+    mic->px ms  average milliseconds from the start of a recording until the
+                pixels showing it have gone out to the strip
+
+CPython's object model is not MicroPython's, so treat the numbers as relative:
+compare them between revisions rather than against the board.
+
+Usage:
+    python3 host/bench.py [--seconds 10] [--audio tone] [--only stairs]
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+from neopixel import NeoPixel
+from button import Button
+from tap import Tap
+from framebuffer import FrameBuffer
+from scheduler import Scheduler
+from beattracker import BeatTracker
+from ticks import ticks_ms, ticks_diff
+
+import pixelsoff
+import vumeter
+import spectrum
+import effect
+import twinkle
+import playback
+import layers
+import bake
+
+# Same as ravetie.py
+INPUT_PERIOD = 10
+
+ANIMATIONS = [
+    ("pixelsoff", lambda pixels: pixelsoff.PixelsOff(pixels)),
+    ("vumeter", lambda pixels: vumeter.VuMeter(pixels, 100, 400)),
+    ("spectrum", lambda pixels: spectrum.Spectrum(pixels, 100, 400)),
+    ("stairs", lambda pixels: effect.Effect(pixels, "stairs")),
+    ("comets", lambda pixels: effect.Effect(pixels, "comets")),
+    ("sparkle", lambda pixels: effect.Effect(pixels, "sparkle")),
+    ("chase", lambda pixels: effect.Effect(pixels, "chase")),
+    ("breathe", lambda pixels: effect.Effect(pixels, "breathe")),
+    ("twinkle", lambda pixels: twinkle.Twinkle(pixels)),
+    ("layers", lambda pixels: layers.Layers(pixels, (
+        ("twinkle", "Twinkle", (), "add"),
+        ("vumeter", "VuMeter", (100, 400), "alpha", 192)))),
+    ("playback", lambda pixels: playback.Playback(pixels, SHOW_PATH)),
+]
+
+# Twinkle, baked by main() before playback is run
+SHOW_PATH = os.path.join(tempfile.gettempdir(), "rave-tie-bench.bin")
+
+def audio_source(name):
+    if name == "silence":
+        return sim.Silence()
+    if name == "tone":
+        return sim.Tone(440)
+    if name == "noise":
+        return sim.Noise()
+    if name == "clicks":
+        return sim.Clicks()
+    return sim.WavSource(name)
+
+def script_taps(seconds):
+    """ Tap A1 every 2 seconds and A6 every 5 seconds so the tap handling
+    code is part of the measurement.
+    """
+    for at_ms in range(1000, seconds * 1000, 2000):
+        sim.press(board.A1, at_ms, 100)
+    for at_ms in range(2500, seconds * 1000, 5000):
+        sim.press(board.A6, at_ms, 100)
+
+class Result:
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.shows = 0
+        self.wakes = 0
+        self.host_seconds = 0.0
+        self.sim_seconds = 0.0
+        self.allocations = 0.0
+        self.allocations_max = 0
+        self.input_late_ms = 0
+        self.mic_ms = []
+        self.mic_latency_ms = []
+
+def bench(name, factory, args):
+    sim.reset()
+    sim.set_audio_source(audio_source(args.audio))
+    script_taps(args.seconds)
+    random.seed(0)
+
+    pixels = NeoPixel(board.A3, args.pixels, auto_write=False)
+    pixels.frames = None
+    frame = FrameBuffer(pixels, brightness=0.5, gamma=2.2)
+    button_a = Button(board.D4, None)
+    button_b = Button(board.D5, None)
+    animation = factory(frame)
+    pads = Tap([board.A1, board.A2, board.A4, board.A5, board.A6, board.A7],
+               animation.tapped)
+    animation.begin()
+
+    # Listening for the beat like ravetie.py does
+    def beat_found(now, period):
+        animation.beat(now, period)
+        scheduler.wake(now)
+
+    beat_tracker = BeatTracker(beat_found)
+    if hasattr(animation, "beat"):
+        beat_tracker.begin()
+
+    result = Result(name)
+
+    def read_inputs(now):
+        # Not advanced to the next read until this one is done
+        late = ticks_diff(now, scheduler.next_input)
+        result.input_late_ms = max(result.input_late_ms, late)
+        button_a.read(now)
+        button_b.read(now)
+        pads.read()
+        if beat_tracker.listening:
+            beat_tracker.read(now)
+
+    scheduler = Scheduler(INPUT_PERIOD, read_inputs)
+    scheduler.set_animation(animation)
+
+    end_ns = args.seconds * 1000000000
+    start_ns = sim.clock.ns
+    shows = pixels.show_count
+    perf_counter = time.perf_counter
+    host = 0.0
+    while sim.clock.ns - start_ns < end_ns:
+        started = perf_counter()
+        if scheduler.run_due():
+            shown = frame.show()
+            host += perf_counter() - started
+            capture = sim.last_capture
+            if capture is not None:
+                sim.last_capture = None
+                result.mic_ms.append((capture[1] - capture[0]) / 1000000)
+                if shown:
+                    result.mic_latency_ms.append(
+                        (sim.clock.ns - capture[0]) / 1000000)
+        result.wakes += 1
+        scheduler.sleep()
+    result.frames = scheduler.frames
+    result.host_seconds = host
+    result.sim_seconds = (sim.clock.ns - start_ns) / 1000000000
+    result.shows = pixels.show_count - shows
+
+    # Allocations are counted on a separate pass since tracing slows down
+    # the interpreter. Only the iterations that update the animation count.
+    # CPython's own heap is nothing like MicroPython's, so what is counted is
+    # the instructions that allocate on the CPX, like alloc_check.py does.
+    # Imported here since alloc_check.py imports this module.
+    import alloc_check
+    tracer = alloc_check.AllocationTracer()
+    for i in range(args.alloc_frames):
+        scheduler.sleep()
+        while ticks_diff(ticks_ms(), scheduler.next_frame) < 0:
+            scheduler.run_due()
+            scheduler.sleep()
+        before = tracer.total
+        tracer.start()
+        scheduler.run_due()
+        frame.show()
+        tracer.stop()
+        result.allocations_max = max(result.allocations_max,
+                                     tracer.total - before)
+    if args.alloc_frames:
+        result.allocations = tracer.total / args.alloc_frames
+
+    animation.end()
+    beat_tracker.end()
+    pads.deinit()
+    button_b.deinit()
+    button_a.deinit()
+    pixels.deinit()
+    return result
+
+def average(values):
+    """ Formatted average, or - if there are none """
+    if not values:
+        return "-"
+    return "{:.1f}".format(sum(values) / len(values))
+
+def report(results):
+    header = ("{:<10} {:>10} {:>10} {:>8} {:>11} {:>8} {:>12} {:>10} {:>10} "
+              "{:>6} {:>10}").format(
+        "animation", "updates/s", "fps (sim)", "shows/s", "shows/frame",
+        "wakes/s", "allocs/frame", "allocs max", "input late", "mic ms",
+        "mic->px ms")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        host = r.host_seconds or 1e-9
+        print("{:<10} {:>10.0f} {:>10.1f} {:>8.1f} {:>11.2f} {:>8.1f} "
+              "{:>12.2f} {:>10} {:>10} {:>6} {:>10}".format(
+                  r.name, r.frames / host, r.frames / r.sim_seconds,
+                  r.shows / r.sim_seconds, r.shows / max(r.frames, 1),
+                  r.wakes / r.sim_seconds, r.allocations, r.allocations_max,
+                  r.input_late_ms, average(r.mic_ms),
+                  average(r.mic_latency_ms)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--seconds", type=int, default=10,
+                        help="virtual seconds to run each animation for")
+    parser.add_argument("--pixels", type=int, default=6,
+                        help="number of pixels on the strip")
+    parser.add_argument("--audio", default="noise",
+                        help="silence, tone, noise, clicks or the path to a "
+                        "WAV file")
+    parser.add_argument("--alloc-frames", type=int, default=200,
+                        help="frames to count allocations in")
+    parser.add_argument("--only", action="append",
+                        help="only run the named animation")
+    args = parser.parse_args()
+
+    results = []
+    with open(os.devnull, "w") as devnull:
+        if not args.only or "playback" in args.only:
+            with contextlib.redirect_stdout(devnull):
+                sim.reset()
+                random.seed(0)
+                bake.bake(twinkle.Twinkle, SHOW_PATH, args.pixels,
+                          args.seconds)
+        for name, factory in ANIMATIONS:
+            if args.only and name not in args.only:
+                continue
+            # Keep the animations' own console chatter out of the report
+            with contextlib.redirect_stdout(devnull):
+                results.append(bench(name, factory, args))
+    report(results)
+
+if __name__ == "__main__":
+    main()
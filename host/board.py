@@ -0,0 +1,32 @@
+""" Host stand-in for CircuitPython's board module (Circuit Playground
+Express pin names).
+"""
+
+class Pin:
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "board." + self.name
+
+A0 = Pin("A0")
+A1 = Pin("A1")
+A2 = Pin("A2")
+A3 = Pin("A3")
+A4 = Pin("A4")
+A5 = Pin("A5")
+A6 = Pin("A6")
+A7 = Pin("A7")
+D4 = Pin("D4")
+D5 = Pin("D5")
+D7 = Pin("D7")
+D8 = Pin("D8")
+D13 = Pin("D13")
+NEOPIXEL = Pin("NEOPIXEL")
+MICROPHONE_CLOCK = Pin("MICROPHONE_CLOCK")
+MICROPHONE_DATA = Pin("MICROPHONE_DATA")
+
+BUTTON_A = D4
+BUTTON_B = D5
+SLIDE_SWITCH = D7
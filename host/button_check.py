@@ -0,0 +1,129 @@
+""" Checks the buttons' gestures on the simulated board: a short press, a long
+press that fires while the button is still down, a double press, two presses
+too far apart to be one and a press with bouncing contacts, each with button.py
+reading the pin through keypad and, as on firmware without it, polling it with
+digitalio. Presses are also made across the ticks wrapping around, which
+happens 65 seconds after the simulated board starts.
+
+The buttons are read every 10 milliseconds, like the main loop in ravetie.py
+reads the inputs.
+
+Usage:
+    python3 host/button_check.py
+"""
+
+import importlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+from ticks import ticks_ms
+
+from checks import Check
+
+# Same as ravetie.py
+INPUT_PERIOD = 10
+
+# Same as button.py and keypad: a change counts once the pin has settled
+DEBOUNCE_TIME = 20
+
+# Virtual milliseconds after which the ticks wrap around
+WRAP_MS = 65536
+
+def button_module(keypad):
+    """ button.py imported afresh, with or without keypad to read through """
+    hidden = sys.modules.get("keypad")
+    if not keypad:
+        sys.modules["keypad"] = None
+    sys.modules.pop("button", None)
+    try:
+        return importlib.import_module("button")
+    finally:
+        if not keypad:
+            sys.modules["keypad"] = hidden
+
+class ButtonCheck(Check):
+
+    def gestures(self, button, presses, double=True, long=True, start_ms=0):
+        """ Press button A for each (at ms, for ms) after start_ms and read
+        it until a second after the last. Returns the gestures fired, in
+        order, each with the ms after start_ms it fired at.
+        """
+
+        sim.reset()
+        sim.clock.advance_ms(start_ms)
+        fired = []
+
+        def gesture(name):
+            return lambda: fired.append(
+                (name, sim.clock.ns // 1000000 - start_ms))
+
+        for at_ms, duration_ms in presses:
+            sim.press(board.D4, start_ms + at_ms, duration_ms)
+        button = button.Button(
+            board.D4, gesture("press"),
+            long_press_callback=gesture("long") if long else None,
+            double_press_callback=gesture("double") if double else None)
+        end_ms = presses[-1][0] + presses[-1][1] + 1000
+        while sim.clock.ns // 1000000 - start_ms < end_ms:
+            button.read(ticks_ms())
+            sim.clock.advance_ms(INPUT_PERIOD)
+        button.deinit()
+        return fired
+
+    def expect_gestures(self, name, fired, names, at=None):
+        """ Check the gestures fired were names, and, for at, that each
+        fired within the debounce time and an input period after its time in
+        at
+        """
+        ok = [gesture for gesture, _ in fired] == names
+        if ok and at is not None:
+            ok = all(want <= ms <= want + DEBOUNCE_TIME + INPUT_PERIOD
+                     for (_, ms), want in zip(fired, at))
+        self.expect(name, ok)
+
+    def run(self, button, kind, start_ms=0):
+        """ Check every gesture with the button module, named kind """
+        kind += " (wrap)" if start_ms else ""
+        fired = self.gestures(button, [(500, 100)], start_ms=start_ms)
+        # Held back until a second press can't come any more
+        self.expect_gestures(kind + " short press", fired, ["press"],
+                             [600 + 300])
+        fired = self.gestures(button, [(500, 100)], double=False,
+                              start_ms=start_ms)
+        self.expect_gestures(kind + " short, no double", fired, ["press"],
+                             [600])
+        fired = self.gestures(button, [(500, 1500)], start_ms=start_ms)
+        self.expect_gestures(kind + " long press", fired, ["long"], [1500])
+        fired = self.gestures(button, [(500, 1500)], long=False,
+                              start_ms=start_ms)
+        self.expect_gestures(kind + " long, no long", fired, ["press"])
+        fired = self.gestures(button, [(500, 100), (700, 100)],
+                              start_ms=start_ms)
+        self.expect_gestures(kind + " double press", fired, ["double"],
+                             [800])
+        fired = self.gestures(button, [(500, 100), (1100, 100)],
+                              start_ms=start_ms)
+        self.expect_gestures(kind + " presses too far apart", fired,
+                             ["press", "press"])
+        # Contacts bouncing for the first 30 ms of the press
+        fired = self.gestures(button, [(500, 5), (515, 10), (530, 70)],
+                              start_ms=start_ms)
+        self.expect_gestures(kind + " bouncing press", fired, ["press"],
+                             [600 + 300])
+
+def main():
+    check = ButtonCheck()
+    for keypad, kind in ((True, "keypad"), (False, "polled")):
+        button = button_module(keypad)
+        check.run(button, kind)
+        # The ticks wrap while the first press is down
+        check.run(button, kind, start_ms=WRAP_MS - 600)
+    check.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+""" What the host checks have in common: reporting each check as it is made,
+keeping the animations' console chatter out of the report and animations
+that do next to nothing, for checking what plays them.
+"""
+
+import contextlib
+import os
+import sys
+
+class Check:
+    """ Prints each check with ok or FAILED and remembers the ones that
+    failed. Each host check subclasses it with its own checks.
+    """
+
+    def __init__(self):
+        self.failures = []
+
+    def expect(self, name, ok):
+        print("{:<40} {}".format(name, "ok" if ok else "FAILED"))
+        if not ok:
+            self.failures.append(name)
+
+    def expect_no_allocations(self, name, tracer):
+        """ Check that an alloc_check.AllocationTracer counted nothing, and
+        list where anything it counted was allocated
+        """
+        self.expect(name, tracer.total == 0)
+        for (filename, line, what), count in tracer.counts.most_common():
+            print("    {}:{} {} x{}".format(filename, line, what, count))
+
+    def finish(self):
+        """ Print the outcome and exit with an error if any check failed """
+        if self.failures:
+            print("FAILED")
+            sys.exit(1)
+        print("OK")
+
+def quietly():
+    """ Context that keeps what animations print out of the report """
+    return contextlib.redirect_stdout(open(os.devnull, "w"))
+
+class Solid:
+    """ Fills the strip with one color every period milliseconds, counting
+    its updates, and changes to next_color when it is tapped
+    """
+
+    def __init__(self, pixels, color, period, next_color=None):
+        self.pixels = pixels
+        self.color = color
+        self.period = period
+        self.next_color = next_color
+        self.updates = 0
+        self.begun = False
+        self.ended = False
+
+    def begin(self):
+        self.begun = True
+        self.pixels.fill(0)
+
+    def tapped(self, pin):
+        if self.next_color is not None:
+            self.color = self.next_color
+
+    def update(self, now):
+        self.updates += 1
+        self.pixels.fill(self.color)
+        return self.period
+
+    def end(self):
+        self.begun = False
+        self.ended = True
+
+class Busy(Solid):
+    """ Can't begin, like an animation whose pins are in use """
+
+    def begin(self):
+        raise ValueError("pin in use")
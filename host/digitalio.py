@@ -0,0 +1,51 @@
+""" Host stand-in for CircuitPython's digitalio module. Inputs read high while
+the pin is scripted high with sim.press().
+"""
+
+import sim
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+class DriveMode:
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+class DigitalInOut:
+
+    def __init__(self, pin):
+        sim.claim(pin)
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self._value = False
+
+    def deinit(self):
+        if self.pin is not None:
+            sim.release(self.pin)
+            self.pin = None
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self.direction = Direction.OUTPUT
+        self._value = value
+
+    @property
+    def value(self):
+        if self.pin is None:
+            raise ValueError("Object has been deinitialized")
+        if self.direction == Direction.OUTPUT:
+            return self._value
+        return sim.pin_value(self.pin)
+
+    @value.setter
+    def value(self, value):
+        self._value = value
@@ -0,0 +1,163 @@
+""" Checks that the tie goes to sleep once the lights have been out for a
+while and wakes up on button A: code.py is booted on the simulated board,
+button A is pressed to Stairs and held to turn the lights out, and pressed
+again long after.
+
+Checks that the board light sleeps once the pixels have been off for the
+idle timeout, that the press on button A wakes it, and that it goes back to
+the animation that was playing, without the wake press also counting as a
+press. The same for deep sleep, which restarts code.py on wake and resumes
+from sleep memory. And that on firmware without the alarm module, like the
+CPX's, the board doesn't try to sleep and keeps the lights out instead.
+
+Usage:
+    python3 host/idle_check.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import alarm
+import board
+import microcontroller
+import idle
+
+from checks import Check, quietly
+
+# Three presses to Stairs, then held to turn the lights out
+SCRIPT = [(1000, 100), (2000, 100), (3000, 100), (5000, 1500)]
+STAIRS = 3
+# The hold turns the lights out once it is long enough to be a long press
+LIGHTS_OUT_MS = 6000
+
+# Long after the idle timeout: the press that wakes the board
+WAKE_MS = 90000
+
+class PowerOff(Exception):
+    """ Raised once the board has run for as long as asked """
+
+# Virtual ns at which the board is switched off. Sleeping is patched once,
+# since the scheduler keeps the sleep it imported across boots.
+power_off_ns = 0
+
+def sleep_until_off(seconds):
+    sim.clock.sleep(seconds)
+    if sim.clock.ns >= power_off_ns:
+        raise PowerOff()
+
+time.sleep = sleep_until_off
+
+# Virtual ms at which the board went to sleep, each time it did
+light_sleeps = []
+
+light_sleep = alarm.light_sleep_until_alarms
+
+def light_sleep_until_alarms(*alarms):
+    light_sleeps.append(sim.clock.ns // 1000000)
+    return light_sleep(*alarms)
+
+alarm.light_sleep_until_alarms = light_sleep_until_alarms
+
+Idle = idle.Idle
+
+class DeepIdle(Idle):
+    """ Idle as code.py makes it, but deep sleeping """
+
+    def __init__(self, wake_pin, deep=True):
+        super().__init__(wake_pin, deep)
+
+def script():
+    for at_ms, duration_ms in SCRIPT:
+        sim.press(board.D4, at_ms, duration_ms)
+    sim.press(board.D4, WAKE_MS, 100)
+
+def run(seconds):
+    """ Run code.py on the board as it is for seconds of virtual time.
+    Returns the globals of the program code.py runs.
+    """
+
+    global power_off_ns
+    power_off_ns = seconds * 1000000000
+    try:
+        with quietly():
+            sim.power_on()
+    except PowerOff:
+        pass
+    return sim.program()
+
+def boot(seconds):
+    """ Switch the board on with erased flash and button A scripted, and run
+    code.py for seconds of virtual time. Returns the program's globals.
+    """
+
+    sim.reset()
+    microcontroller.nvm[:] = b"\xff" * len(microcontroller.nvm)
+    alarm.wake_alarm = None
+    alarm.sleep_memory[0] = 0
+    light_sleeps.clear()
+    script()
+    return run(seconds)
+
+class IdleCheck(Check):
+
+    def light(self):
+        program = boot(WAKE_MS // 1000 + 5)
+        self.expect("light sleeps after the timeout",
+                    len(light_sleeps) == 1
+                    and 0 <= light_sleeps[0] - LIGHTS_OUT_MS - 60000 <= 100)
+        self.expect("wakes on button A and resumes",
+                    program["active_led_animation"] == STAIRS)
+
+    def deep(self):
+        idle.Idle = DeepIdle
+        try:
+            try:
+                boot(WAKE_MS // 1000 + 5)
+                woken = None
+            except alarm.DeepSleep as e:
+                woken = e.alarm
+            self.expect("deep sleeps after the timeout",
+                        woken is not None and not light_sleeps
+                        and alarm.sleep_memory[0] == STAIRS + 1)
+            self.expect("wakes on button A",
+                        woken is not None and woken.pin is board.D4
+                        and sim.clock.ns // 1000000 == WAKE_MS)
+
+            # code.py restarts with the wake press still down
+            now = sim.clock.ns
+            sim.reset()
+            sim.clock.ns = now
+            script()
+            alarm.wake_alarm = woken
+            program = run(WAKE_MS // 1000 + 5)
+            self.expect("restarts and resumes",
+                        program["active_led_animation"] == STAIRS)
+        finally:
+            idle.Idle = Idle
+
+    def without_alarm(self):
+        sys.modules["alarm"] = None
+        try:
+            program = boot(WAKE_MS // 1000 + 5)
+        finally:
+            sys.modules["alarm"] = alarm
+        self.expect("no alarm module, no sleep",
+                    program["idle"] is None and not light_sleeps)
+        # The wake press is an ordinary press to the next animation
+        self.expect("lights stay out until button A",
+                    program["active_led_animation"] == 1)
+
+def main():
+    check = IdleCheck()
+    check.light()
+    check.deep()
+    check.without_alarm()
+    check.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+""" Host stand-in for CircuitPython's keypad module. On the board the keys are
+scanned in the background; here the scans that would have happened since the
+last look at the event queue are caught up on the virtual clock whenever it is
+read, so a press shorter than the time between reads is still seen.
+"""
+
+import sim
+
+class Event:
+
+    def __init__(self, key_number=0, pressed=True):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = 0
+
+    @property
+    def released(self):
+        return not self.pressed
+
+    def __repr__(self):
+        return "<Event: key_number {} {}>".format(
+            self.key_number, "pressed" if self.pressed else "released")
+
+class EventQueue:
+
+    def __init__(self, keys, max_events):
+        self._keys = keys
+        self._max_events = max_events
+        self._events = []
+        self.overflowed = False
+
+    def _put(self, key_number, pressed, timestamp):
+        if len(self._events) == self._max_events:
+            self.overflowed = True
+            return
+        self._events.append((key_number, pressed, timestamp))
+
+    def get(self):
+        event = Event()
+        return event if self.get_into(event) else None
+
+    def get_into(self, event):
+        self._keys._scan()
+        if not self._events:
+            return False
+        event.key_number, event.pressed, event.timestamp = self._events.pop(0)
+        return True
+
+    def clear(self):
+        self._keys._scan()
+        self._events.clear()
+        self.overflowed = False
+
+    def __len__(self):
+        self._keys._scan()
+        return len(self._events)
+
+    def __bool__(self):
+        return len(self) > 0
+
+class Keys:
+
+    def __init__(self, pins, *, value_when_pressed, pull=True, interval=0.02,
+                 max_events=64):
+        for pin in pins:
+            sim.claim(pin)
+        self._pins = tuple(pins)
+        self._value_when_pressed = value_when_pressed
+        self._interval_ns = int(interval * 1000000000)
+        self._states = [False] * len(self._pins)
+        self._last_scan = sim.clock.ns
+        self.key_count = len(self._pins)
+        self.events = EventQueue(self, max_events)
+
+    def deinit(self):
+        for pin in self._pins:
+            sim.release(pin)
+        self._pins = ()
+
+    def reset(self):
+        self._states = [False] * len(self._pins)
+
+    def _scan(self):
+        # Every scan is a single sample of each pin, which is what debounces
+        # them: anything shorter than the interval between scans can be missed
+        # or seen, like on the board.
+        now = sim.clock.ns
+        scan_time = self._last_scan + self._interval_ns
+        while scan_time <= now:
+            i = 0
+            while i < len(self._pins):
+                pressed = sim.pin_value_at(self._pins[i], scan_time) \
+                    == self._value_when_pressed
+                if pressed != self._states[i]:
+                    self._states[i] = pressed
+                    self.events._put(i, pressed, scan_time // 1000000)
+                i += 1
+            self._last_scan = scan_time
+            scan_time += self._interval_ns
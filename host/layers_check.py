@@ -0,0 +1,188 @@
+""" Checks the layer compositor: each blend mode against its formula, that
+layers are updated at their own rates, that a frame starts from the lowest
+layer that changed and nothing is put together when none did, that a layer
+that can't begin leaves nothing begun, that the VU meter over Twinkle lights
+a strip longer than 255 pixels, and that compositing doesn't allocate.
+
+Usage:
+    python3 host/layers_check.py [--pixels 6]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+from neopixel import NeoPixel
+from framebuffer import FrameBuffer
+from scheduler import Scheduler
+from layers import Layers
+
+import alloc_check
+from checks import Check, quietly
+
+def solid(color, mode, *opacity, period=20, next_color=None):
+    return ("checks", "Solid",
+            (color, period, next_color), mode) + opacity
+
+def expected(mode, below, color, opacity=255):
+    """ A color of the layer over a color below, the slow way """
+    if mode == "add":
+        return min(below + color, 255)
+    if mode == "max":
+        return max(below, color)
+    if mode == "mask":
+        return below * (color + 1) // 256
+    return color * opacity // 255 + below * (255 - opacity) // 255
+
+class LayersCheck(Check):
+
+    def __init__(self, num_pixels):
+        super().__init__()
+        self.num_pixels = num_pixels
+
+    def play(self, layers, milliseconds, tracer=None, tap_at=None):
+        """ Play layers in a frame buffer for milliseconds of virtual time.
+        Returns the compositor, the frame buffer and the number of frames put
+        together.
+        """
+
+        sim.reset()
+        pixels = NeoPixel(board.A3, self.num_pixels, auto_write=False)
+        frame = FrameBuffer(pixels, gamma=1.0)
+        animation = Layers(frame, layers)
+        with quietly():
+            animation.begin()
+        scheduler = Scheduler(10, lambda now: None)
+        scheduler.set_animation(animation)
+        composited = 0
+        end_ns = sim.clock.ns + milliseconds * 1000000
+        while sim.clock.ns < end_ns:
+            if tap_at is not None and sim.clock.ns >= tap_at * 1000000:
+                animation.tapped(board.A1)
+                tap_at = None
+            if tracer:
+                tracer.start()
+            frame.dirty = False
+            if scheduler.run_due() and frame.dirty:
+                composited += 1
+            if tracer:
+                tracer.stop()
+            frame.show()
+            scheduler.sleep()
+        pixels.deinit()
+        return animation, frame, composited
+
+    def blends(self):
+        below = 0x40c0ff
+        for mode in ("add", "max", "alpha", "mask"):
+            for color in (0x000000, 0x80407f, 0xffffff):
+                layers = (solid(below, "add"), solid(color, mode, 160))
+                animation, frame, composited = self.play(layers, 50)
+                want = tuple(
+                    expected(mode, below >> shift & 0xff,
+                             color >> shift & 0xff, 160)
+                    if color or mode != "alpha" else below >> shift & 0xff
+                    for shift in (16, 8, 0))
+                self.expect("{} over {:06x} {:06x}".format(
+                    mode, below, color),
+                    all(frame[i] == want for i in range(len(frame))))
+
+    def rates(self):
+        layers = (solid(0x100000, "add", period=20),
+                  solid(0x001000, "add", period=90))
+        animation, frame, composited = self.play(layers, 900)
+        fast, slow = animation.animations
+        self.expect("layers keep their own rates",
+                    44 <= fast.updates <= 46 and 10 <= slow.updates <= 11)
+
+    def skipping(self):
+        # Neither layer changes after the first frame
+        layers = (solid(0x100000, "add"), solid(0x001000, "max"))
+        animation, frame, composited = self.play(layers, 500)
+        self.expect("nothing new, nothing put together", composited == 1)
+
+        # The top layer changes when tapped; the one below stays as it was
+        layers = (solid(0x100000, "add"),
+                  solid(0x000010, "add", next_color=0x000020))
+        animation, frame, composited = self.play(layers, 500, tap_at=200)
+        self.expect("a changed layer is put together",
+                    composited == 2 and frame[0] == (0x10, 0, 0x20))
+
+    def begin_fails(self):
+        sim.reset()
+        pixels = NeoPixel(board.A3, self.num_pixels, auto_write=False)
+        frame = FrameBuffer(pixels, gamma=1.0)
+        layers = (solid(0x100000, "add"),
+                  ("checks", "Busy", (0, 20), "add"))
+        animation = Layers(frame, layers)
+        try:
+            with quietly():
+                animation.begin()
+            raised = False
+        except ValueError:
+            raised = True
+        pixels.deinit()
+        self.expect("a failed begin leaves nothing begun",
+                    raised and not animation.animations[0].begun)
+
+    def long_strip(self, num_pixels=300):
+        """ Play the VU meter over Twinkle, like ravetie.py, on a strip
+        longer than a byte can count, loud enough to light all of it
+        """
+
+        sim.reset()
+        sim.set_audio_source(sim.Tone(440, amplitude=30000))
+        pixels = NeoPixel(board.A3, num_pixels, auto_write=False)
+        frame = FrameBuffer(pixels, gamma=1.0)
+        animation = Layers(frame, (
+            ("twinkle", "Twinkle", (), "add"),
+            ("vumeter", "VuMeter", (100, 400), "alpha", 192)))
+        with quietly():
+            animation.begin()
+        scheduler = Scheduler(10, lambda now: None)
+        scheduler.set_animation(animation)
+        meter = animation.animations[1].pixels
+        most_lit = 0
+        while sim.clock.ns < 1000000000:
+            if scheduler.run_due():
+                frame.show()
+                most_lit = max(most_lit, sum(
+                    meter[i] != (0, 0, 0) for i in range(num_pixels)))
+            scheduler.sleep()
+        with quietly():
+            animation.end()
+        pixels.deinit()
+        self.expect("VU meter lights {} pixels".format(num_pixels),
+                    most_lit == num_pixels)
+
+    def allocations(self):
+        tracer = alloc_check.AllocationTracer()
+        layers = (solid(0x100000, "add", period=20),
+                  solid(0x001000, "max", period=30),
+                  solid(0x000010, "alpha", 128, period=40),
+                  solid(0xffffff, "mask", period=50))
+        self.play(layers, 1000, tracer)
+        self.expect_no_allocations("compositing doesn't allocate", tracer)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--pixels", type=int, default=6,
+                        help="number of pixels on the strip")
+    args = parser.parse_args()
+
+    check = LayersCheck(args.pixels)
+    check.blends()
+    check.rates()
+    check.skipping()
+    check.begin_fails()
+    check.long_strip()
+    check.allocations()
+    check.finish()
+
+if __name__ == "__main__":
+    main()
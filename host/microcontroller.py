@@ -0,0 +1,18 @@
+""" Host stand-in for CircuitPython's microcontroller module. Only nvm is
+provided. It is kept for as long as the process runs, like the flash is
+across power cycles, and counts its writes so wear can be checked.
+"""
+
+class NVM(bytearray):
+    """ Non-volatile memory that counts how often it is written """
+
+    def __init__(self, size):
+        super().__init__(b"\xff" * size)
+        self.writes = 0
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self.writes += 1
+
+# Erased flash reads as 0xff
+nvm = NVM(256)
@@ -0,0 +1,123 @@
+""" Host stand-in for CircuitPython's neopixel module. Records every frame
+pushed by show() instead of bit-banging it out of a pin.
+"""
+
+import sim
+
+# Time the strip takes to latch a frame after the last bit
+_RESET_NS = 80000
+
+# 24 bits at 800KHz
+_PIXEL_NS = 30000
+
+GRB = "GRB"
+RGB = "RGB"
+
+class NeoPixel:
+
+    def __init__(self, pin, n, *, bpp=3, brightness=1.0, auto_write=True,
+                 pixel_order=None):
+        sim.claim(pin)
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.auto_write = auto_write
+        self.pixel_order = pixel_order
+        self._buf = bytearray(n * bpp)
+        self._shown = bytearray(n * bpp)
+
+        # Number of show() calls, and every frame shown. Set frames to None to
+        # stop recording.
+        self.show_count = 0
+        self.frames = []
+
+        self.brightness = brightness
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, brightness):
+        self._brightness = min(max(brightness, 0.0), 1.0)
+        self._scale = bytes(
+            int(v * self._brightness) for v in range(256))
+        if self.auto_write:
+            self.show()
+
+    def deinit(self):
+        sim.release(self.pin)
+
+    def __len__(self):
+        return self.n
+
+    def _set(self, index, value):
+        offset = index * self.bpp
+        if isinstance(value, int):
+            if self.bpp == 4:
+                self._buf[offset + 3] = (value >> 24) & 0xff
+            self._buf[offset] = (value >> 16) & 0xff
+            self._buf[offset + 1] = (value >> 8) & 0xff
+            self._buf[offset + 2] = value & 0xff
+        else:
+            if len(value) != self.bpp:
+                raise ValueError("Expected tuple of length " + str(self.bpp))
+            for i in range(self.bpp):
+                self._buf[offset + i] = value[i]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            indices = range(*index.indices(self.n))
+            if len(value) == len(indices) * self.bpp and indices.step == 1:
+                # Flattened components for a run of pixels
+                self._buf[indices.start * self.bpp:indices.stop * self.bpp] \
+                    = value
+            elif len(value) == len(indices) * self.bpp:
+                for i, pixel in enumerate(indices):
+                    offset = pixel * self.bpp
+                    self._buf[offset:offset + self.bpp] \
+                        = bytes(value[i * self.bpp:(i + 1) * self.bpp])
+            elif len(value) == len(indices):
+                for pixel, color in zip(indices, value):
+                    self._set(pixel, color)
+            else:
+                raise ValueError("Unmatched lengths")
+        else:
+            if index < 0:
+                index += self.n
+            if not 0 <= index < self.n:
+                raise IndexError("index out of range")
+            self._set(index, value)
+        if self.auto_write:
+            self.show()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.n))]
+        if index < 0:
+            index += self.n
+        if not 0 <= index < self.n:
+            raise IndexError("index out of range")
+        offset = index * self.bpp
+        return tuple(self._buf[offset:offset + self.bpp])
+
+    def fill(self, color):
+        for i in range(self.n):
+            self._set(i, color)
+        if self.auto_write:
+            self.show()
+
+    def show(self):
+        scale = self._scale
+        shown = self._shown
+        buf = self._buf
+        for i in range(len(buf)):
+            shown[i] = scale[buf[i]]
+        self.show_count += 1
+        if self.frames is not None:
+            self.frames.append(bytes(shown))
+        sim.clock.ns += _RESET_NS + self.n * _PIXEL_NS
+
+    def frame(self):
+        """ The most recently shown frame, with brightness applied """
+        return bytes(self._shown)
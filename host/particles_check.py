@@ -0,0 +1,194 @@
+""" Checks the particle engine's comets: that one moves at its speed, rests at
+each end and heads back, that comets at different speeds stay on the strip,
+that the wait move() returns is never past the next time a head reaches
+another pixel, and that the trails fade behind the head, ahead of it too when
+drawn both ways, stop at the ends of the strip and add up where comets
+overlap, and that moving and drawing comets on a long strip doesn't allocate.
+
+Usage:
+    python3 host/particles_check.py [--pixels 30]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+from framebuffer import Canvas
+from particles import Particles
+
+import alloc_check
+from checks import Check
+
+ONE = 1 << 16
+
+def heads(particles):
+    """ The pixel each comet's head shows on, the way render() puts it """
+    return [particles.position[i] >> 16 if particles.velocity[i] > 0
+            else (particles.position[i] + ONE - 1) >> 16
+            for i in range(particles.count)]
+
+class ParticlesCheck(Check):
+
+    def __init__(self, num_pixels):
+        super().__init__()
+        self.num_pixels = num_pixels
+
+    def motion(self, step=16, turn=100):
+        """ Move one comet a millisecond at a time through two round trips
+        and compare its position with where it should be
+        """
+
+        particles = Particles(self.num_pixels, 1)
+        particles.set_speed(step, turn)
+        speed = ONE // step
+        end = (self.num_pixels - 1) << 16
+        crossing = end // speed
+        round_trip = 2 * (crossing + turn)
+
+        def expected(t):
+            t %= round_trip
+            if t < crossing:
+                return t * speed
+            if t < crossing + turn:
+                return end
+            if t < 2 * crossing + turn:
+                return end - (t - crossing - turn) * speed
+            return 0
+
+        ok = True
+        for t in range(1, 2 * round_trip + 1):
+            particles.move(1)
+            ok &= particles.position[0] == expected(t)
+        self.expect("moves, rests at the ends, heads back", ok)
+
+    def on_strip(self, count=5, step=23, turn=50, milliseconds=20000):
+        """ Check comets at different speeds stay between the ends """
+        particles = Particles(self.num_pixels, count)
+        particles.set_speed(step, turn)
+        end = (self.num_pixels - 1) << 16
+        ok = True
+        for t in range(milliseconds):
+            particles.move(1)
+            ok &= all(0 <= particles.position[i] <= end
+                      for i in range(count))
+        self.expect("comets stay on the strip", ok)
+
+    def waits(self, count=5, step=23, turn=50, milliseconds=20000):
+        """ Move one set of comets a millisecond at a time and another by
+        the waits move() returns. No head may reach another pixel before the
+        wait is up, and both sets must be in the same place when it is.
+        """
+
+        steps = Particles(self.num_pixels, count)
+        steps.set_speed(step, turn)
+        waits = Particles(self.num_pixels, count)
+        waits.set_speed(step, turn)
+
+        early = late = False
+        wait = waits.move(0)
+        due = wait
+        last = heads(steps)
+        for t in range(1, milliseconds + 1):
+            steps.move(1)
+            now = heads(steps)
+            if t == due:
+                wait = waits.move(wait)
+                late |= list(waits.position) != list(steps.position)
+                due += wait
+            elif now != last:
+                early = True
+            last = now
+        self.expect("heads move only when waits are up", not early)
+        self.expect("moving by the waits moves the same", not late)
+
+    def trail(self, positions, velocities, trail=3, fade=128,
+              both_ways=False, color=0xff0000):
+        """ Render comets at positions in 65536ths of a pixel, heading the
+        way of velocities. Returns the red of every pixel.
+        """
+
+        particles = Particles(self.num_pixels, len(positions), trail, fade,
+                              both_ways)
+        for i, (position, velocity) in enumerate(zip(positions, velocities)):
+            particles.position[i] = position
+            particles.velocity[i] = velocity
+        pixels = Canvas(self.num_pixels)
+        particles.render(pixels, lambda index: color)
+        return [pixels[pixel][0] for pixel in range(self.num_pixels)]
+
+    def expect_reds(self, name, reds, lit):
+        """ Check the pixels in lit, by pixel, have those reds and the rest
+        are off
+        """
+        self.expect(name, reds == [lit.get(pixel, 0)
+                                   for pixel in range(self.num_pixels)])
+
+    def trails(self):
+        # Each trail pixel half as bright as the one before
+        levels = {0: 255, 1: 127, 2: 63, 3: 31}
+        reds = self.trail([5 * ONE], [1])
+        self.expect_reds("trail behind a comet going up", reds,
+                         {5 - k: red for k, red in levels.items()})
+        reds = self.trail([5 * ONE], [-1])
+        self.expect_reds("trail behind a comet going down", reds,
+                         {5 + k: red for k, red in levels.items()})
+        reds = self.trail([5 * ONE], [1], both_ways=True)
+        lit = {5 + k: red for k, red in levels.items()}
+        lit.update({5 - k: red for k, red in levels.items()})
+        self.expect_reds("trail both ways", reds, lit)
+
+        # A head between pixels is on the last one it reached
+        reds = self.trail([5 * ONE + ONE // 2], [1], trail=0)
+        self.expect_reds("head going up between pixels", reds, {5: 255})
+        reds = self.trail([5 * ONE + ONE // 2], [-1], trail=0)
+        self.expect_reds("head going down between pixels", reds, {6: 255})
+
+        last = self.num_pixels - 1
+        reds = self.trail([ONE, (last - 1) * ONE], [1, -1])
+        self.expect_reds("trails stop at the ends", reds,
+                         {1: 255, 0: 127, last - 1: 255, last: 127})
+        reds = self.trail([5 * ONE, 5 * ONE], [1, 1], trail=0,
+                          color=0x600000)
+        self.expect_reds("overlapping comets add up", reds, {5: 0xc0})
+        reds = self.trail([5 * ONE, 5 * ONE], [1, 1], trail=0)
+        self.expect_reds("overlaps stop at full brightness", reds, {5: 255})
+
+    def allocations(self, num_pixels=300, count=8):
+        """ Move and draw comets on a long strip, counting what allocates the
+        way alloc_check.py does
+        """
+
+        particles = Particles(num_pixels, count, trail=4, fade=128,
+                              both_ways=True)
+        particles.set_speed(5, 50)
+        pixels = Canvas(num_pixels)
+        tracer = alloc_check.AllocationTracer()
+        wait = 1
+        for i in range(200):
+            tracer.start()
+            wait = particles.move(wait)
+            particles.render(pixels, lambda index: 0xff8000)
+            tracer.stop()
+        self.expect_no_allocations(
+            "comets on {} pixels don't allocate".format(num_pixels), tracer)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pixels", type=int, default=30,
+                        help="Length of the strip")
+    args = parser.parse_args()
+
+    check = ParticlesCheck(args.pixels)
+    check.motion()
+    check.on_strip()
+    check.waits()
+    check.trails()
+    check.allocations()
+    check.finish()
+
+if __name__ == "__main__":
+    main()
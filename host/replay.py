@@ -0,0 +1,381 @@
+""" Plays a trace recorded by tracing.py back through code.py and the
+animations, unchanged, and saves or checks the frames they make.
+
+Every input code.py reads (clock ticks, buttons, touch pads, microphone
+samples, random numbers) comes from the trace rather than the stand-in
+hardware, so the replay makes the same frames the board did. Time doesn't
+pass while the loop sleeps; the replay runs as fast as the host can go and
+ends when the trace runs out.
+
+Each frame is what was on the strip after an update, with the ticks it was
+made at and the animation that made it. --frames saves them; --expect checks
+them against frames saved before and reports the first that differs, so a
+trace and its frames make a regression test for any change to the
+animations. The host CPU time each update took is reported per animation;
+like host/bench.py, compare it between revisions rather than with the board.
+
+Usage:
+    python3 host/replay.py TRACE [--frames OUT] [--expect FRAMES]
+"""
+
+import argparse
+import contextlib
+import os
+import struct
+import sys
+import time
+import types
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import tracing
+from tracing import MAGIC, VERSION, TICKS_DELTA, TICKS, TOUCH, PIN, \
+    KEY_NONE, KEY, AUDIO, RANDOM
+
+# Saved frames: b"RTFR", then each frame: ticks (4 bytes), animation
+# (1 byte), length (2 bytes), r, g, b per pixel
+FRAMES_MAGIC = b"RTFR"
+
+class EndOfTrace(Exception):
+    """ Raised by the inputs when the trace has nothing more to give """
+
+class TraceMismatch(Exception):
+    """ Raised when code reads an input the trace didn't record next, which
+    means it doesn't run the way it did when the trace was made
+    """
+
+class Replayer:
+    """ Hands out the inputs in a trace in the order they were recorded """
+
+    def __init__(self, data):
+        if data[:4] != MAGIC:
+            raise ValueError("not a trace")
+        if data[4] != VERSION:
+            raise ValueError("trace version {}, expected {}".format(
+                data[4], VERSION))
+        size = struct.unpack_from("<H", data, 5)[0]
+        self.nvm = data[7:7 + size]
+        self.data = data
+        self.pos = 7 + size
+        self.last_ticks = -1
+
+    def _take(self, size):
+        """ The next size bytes of the trace """
+        if self.pos + size > len(self.data):
+            raise EndOfTrace()
+        start = self.pos
+        self.pos += size
+        return self.data[start:start + size]
+
+    def _tag(self, expected):
+        tag = self._take(1)[0]
+        if tag & 0xfe not in expected:
+            raise TraceMismatch("{} at byte {}, trace has tag {:#04x}".format(
+                expected, self.pos - 1, tag))
+        return tag
+
+    def _number(self, number):
+        recorded = self._take(1)[0]
+        if recorded != number:
+            raise TraceMismatch("read input {}, trace has {}".format(
+                number, recorded))
+
+    def ticks(self):
+        tag = self._take(1)[0]
+        if tag == TICKS_DELTA:
+            self.last_ticks += self._take(1)[0]
+        elif tag == TICKS:
+            self.last_ticks = struct.unpack("<I", self._take(4))[0]
+        else:
+            raise TraceMismatch("read ticks at byte {}, trace has tag "
+                                "{:#04x}".format(self.pos - 1, tag))
+        return self.last_ticks
+
+    def flag(self, kind, number):
+        tag = self._tag((kind,))
+        self._number(number)
+        return bool(tag & 1)
+
+    def key(self, number, event):
+        tag = self._tag((KEY_NONE, KEY))
+        self._number(number)
+        if tag == KEY_NONE:
+            return False
+        event.key_number = self._take(1)[0]
+        event.pressed = bool(tag & 1)
+        event.timestamp = struct.unpack("<I", self._take(4))[0]
+        return True
+
+    def audio(self, destination, destination_length):
+        self._tag((AUDIO,))
+        count = struct.unpack("<H", self._take(2))[0]
+        if count > destination_length:
+            raise TraceMismatch("recorded {} samples, only room for {}".format(
+                count, destination_length))
+        samples = array('H', self._take(2 * count))
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        destination[0:count] = samples
+        return count
+
+    def random(self):
+        self._tag((RANDOM,))
+        return struct.unpack("<i", self._take(4))[0]
+
+def inputs_module(replayer):
+    """ Module standing in for every module tracing.py records, with the
+    same names it has, reading the inputs from the replayer
+    """
+
+    from keypad import Event
+    from digitalio import Direction, Pull
+
+    counts = {}
+
+    def number(kind):
+        counts[kind] = counts.get(kind, 0) + 1
+        return counts[kind] - 1
+
+    # Pins are claimed like on the board, since code.py relies on the
+    # error when an animation's pins are in use
+
+    class TouchIn:
+
+        def __init__(self, pin):
+            sim.claim(pin)
+            self.pin = pin
+            self.number = number(TOUCH)
+
+        def deinit(self):
+            sim.release(self.pin)
+
+        @property
+        def value(self):
+            return replayer.flag(TOUCH, self.number)
+
+    class PDMIn:
+
+        def __init__(self, clock_pin, data_pin, **kwargs):
+            sim.claim(clock_pin)
+            sim.claim(data_pin)
+            self.pins = (clock_pin, data_pin)
+
+        def deinit(self):
+            for pin in self.pins:
+                sim.release(pin)
+
+        def record(self, destination, destination_length):
+            return replayer.audio(destination, destination_length)
+
+    class EventQueue:
+
+        def __init__(self, number):
+            self.number = number
+
+        def get_into(self, event):
+            return replayer.key(self.number, event)
+
+        def clear(self):
+            pass
+
+    class Keys:
+
+        def __init__(self, pins, **kwargs):
+            for pin in pins:
+                sim.claim(pin)
+            self.pins = pins
+            self.events = EventQueue(number(KEY))
+
+        def deinit(self):
+            for pin in self.pins:
+                sim.release(pin)
+
+    class DigitalInOut:
+
+        def __init__(self, pin):
+            sim.claim(pin)
+            self.pin = pin
+            self.number = number(PIN)
+            self.direction = Direction.INPUT
+            self.pull = None
+
+        def deinit(self):
+            sim.release(self.pin)
+
+        def switch_to_input(self, pull=None):
+            self.pull = pull
+
+        @property
+        def value(self):
+            return replayer.flag(PIN, self.number)
+
+    def randint(a, b):
+        return replayer.random()
+
+    def choice(sequence):
+        return sequence[replayer.random()]
+
+    module = types.ModuleType("replay_inputs")
+    module.ticks_ms = replayer.ticks
+    module.TouchIn = TouchIn
+    module.PDMIn = PDMIn
+    module.Keys = Keys
+    module.Event = Event
+    module.DigitalInOut = DigitalInOut
+    module.Direction = Direction
+    module.Pull = Pull
+    module.randint = randint
+    module.choice = choice
+    return module
+
+class FrameLog:
+    """ What was on the strip after each update of code.py's main loop, and
+    the host CPU time the update took
+    """
+
+    def __init__(self, ticks):
+        """
+        Args:
+            ticks (def): Returns the ticks of the current frame
+        """
+
+        self.ticks = ticks
+        self.frames = []
+        self.costs = {}
+        self.started = 0.0
+
+    def install(self):
+        """ Wrap the scheduler and transition to log each frame """
+
+        from scheduler import Scheduler
+        from transition import Transition
+
+        log = self
+        run_due = Scheduler.run_due
+        show = Transition.show
+        perf_counter = time.perf_counter
+
+        def logged_run_due(scheduler):
+            started = perf_counter()
+            due = run_due(scheduler)
+            if due:
+                log.started = started
+            return due
+
+        def logged_show(transition):
+            shown = show(transition)
+            cost = perf_counter() - log.started
+            animation = sim.program()["active_led_animation"]
+            log.costs.setdefault(animation, []).append(cost)
+            log.frames.append(
+                (log.ticks(), animation, transition.pixels.frame()))
+            return shown
+
+        Scheduler.run_due = logged_run_due
+        Transition.show = logged_show
+
+    def run(self):
+        """ Run code.py until an input raises EndOfTrace """
+        try:
+            sim.power_on()
+        except EndOfTrace:
+            pass
+
+def save_frames(path, frames):
+    with open(path, "wb") as f:
+        f.write(FRAMES_MAGIC)
+        for ticks, animation, colors in frames:
+            f.write(struct.pack("<IBH", ticks, animation, len(colors)))
+            f.write(colors)
+
+def load_frames(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != FRAMES_MAGIC:
+        raise ValueError(path + " isn't a frames file")
+    frames = []
+    pos = 4
+    while pos < len(data):
+        ticks, animation, length = struct.unpack_from("<IBH", data, pos)
+        pos += 7
+        frames.append((ticks, animation, data[pos:pos + length]))
+        pos += length
+    return frames
+
+def compare(frames, expected):
+    """ Description of the first difference between two lists of frames, or
+    None if they are the same
+    """
+
+    for i, (frame, want) in enumerate(zip(frames, expected)):
+        if frame != want:
+            return "frame {}: got ticks {} animation {} {}, expected ticks " \
+                "{} animation {} {}".format(
+                    i, frame[0], frame[1], frame[2].hex(), want[0], want[1],
+                    want[2].hex())
+    if len(frames) != len(expected):
+        return "{} frames, expected {}".format(len(frames), len(expected))
+    return None
+
+def replay(path):
+    """ Replay the trace at path through code.py. Returns the FrameLog. """
+
+    with open(path, "rb") as f:
+        replayer = Replayer(f.read())
+
+    inputs = inputs_module(replayer)
+    for name in tracing.MODULES:
+        sys.modules[name] = inputs
+    # The trace has no record of sleeping
+    sys.modules["alarm"] = None
+    time.sleep = lambda seconds: None
+
+    import microcontroller
+    microcontroller.nvm[0:len(replayer.nvm)] = replayer.nvm
+
+    log = FrameLog(lambda: replayer.last_ticks)
+    log.install()
+    log.run()
+    return log
+
+def report(log, names):
+    print("{} frames".format(len(log.frames)))
+    header = "{:<28} {:>8} {:>10} {:>10}".format(
+        "animation", "frames", "avg us", "max us")
+    print(header)
+    print("-" * len(header))
+    for animation in sorted(log.costs):
+        costs = log.costs[animation]
+        print("{:<28} {:>8} {:>10.0f} {:>10.0f}".format(
+            names(animation), len(costs), sum(costs) / len(costs) * 1e6,
+            max(costs) * 1e6))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("trace", help="trace recorded by tracing.py")
+    parser.add_argument("--frames", help="save the frames to this file")
+    parser.add_argument("--expect",
+                        help="check the frames against ones saved before")
+    args = parser.parse_args()
+
+    # Keep code.py's console chatter out of the report
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            log = replay(args.trace)
+    report(log, sim.program()["led_animations"].name)
+
+    if args.frames:
+        save_frames(args.frames, log.frames)
+    if args.expect:
+        difference = compare(log.frames, load_frames(args.expect))
+        if difference:
+            print(difference)
+            print("FAILED")
+            sys.exit(1)
+        print("OK")
+
+if __name__ == "__main__":
+    main()
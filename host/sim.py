@@ -0,0 +1,314 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+""" Host side simulation of the Circuit Playground Express.
+
+The modules in this directory stand in for the CircuitPython modules the
+animations import (board, neopixel, touchio, digitalio, keypad, audiobusio,
+supervisor, alarm, microcontroller, usb_cdc, micropython). They all share
+the state kept here: a virtual clock, the pins that are in use, scripted pin
+input and the audio fed to the microphone.
+
+Call install() before importing any of the animation modules.
+"""
+
+import gc
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+import wave
+from array import array
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(HOST_DIR)
+
+class VirtualClock:
+    """ Clock that only moves when told to. Time is kept in integer
+    nanoseconds so it never loses precision.
+    """
+
+    def __init__(self):
+        self.ns = 0
+
+    def reset(self):
+        self.ns = 0
+
+    def advance(self, seconds):
+        self.ns += int(seconds * 1000000000)
+
+    def advance_ms(self, ms):
+        self.ns += ms * 1000000
+
+    def monotonic(self):
+        return self.ns / 1000000000
+
+    def monotonic_ns(self):
+        return self.ns
+
+    def sleep(self, seconds):
+        # Round up so that sleeping until a deadline always reaches it
+        if seconds > 0:
+            self.ns += math.ceil(seconds * 1000000000)
+
+clock = VirtualClock()
+
+# Pins currently claimed by a peripheral, like CircuitPython's "in use" check.
+_claimed = set()
+
+# key: pin name, value: list of (start_ns, end_ns) intervals the pin reads high
+_pin_script = {}
+
+# Object with a read(buf, n, sample_rate) method feeding the microphone
+_audio_source = None
+
+# Start and end, in nanoseconds, of the last microphone recording
+last_capture = None
+
+# Roughly the heap CircuitPython has on the CPX once code.py is running
+HEAP_SIZE = 20 * 1024
+
+def mem_free():
+    """ Stand-in for CircuitPython's gc.mem_free(). CPython's heap is nothing
+    like the CPX's, so this is HEAP_SIZE less whatever tracemalloc has seen
+    allocated, or just HEAP_SIZE when it isn't tracing.
+    """
+    return max(HEAP_SIZE - tracemalloc.get_traced_memory()[0], 0)
+
+def install():
+    """ Make the stand-in modules and the animations importable, route
+    time.monotonic()/time.sleep() through the virtual clock and give gc the
+    mem_free() CircuitPython has.
+    """
+    for path in (REPO_DIR, HOST_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+    time.monotonic = clock.monotonic
+    time.monotonic_ns = clock.monotonic_ns
+    time.sleep = clock.sleep
+    if not hasattr(gc, "mem_free"):
+        gc.mem_free = mem_free
+
+def reset():
+    """ Forget all claimed pins, scripted input and audio; restart the clock """
+    global last_capture
+    clock.reset()
+    _claimed.clear()
+    _pin_script.clear()
+    set_audio_source(None)
+    last_capture = None
+
+def power_on():
+    """ Run code.py the way the CPX does once it is switched on, with the
+    main program imported afresh. Only returns by an exception, such as one
+    raised from a patched time.sleep() to switch the board off again.
+    """
+    sys.modules.pop("ravetie", None)
+    path = os.path.join(REPO_DIR, "code.py")
+    with open(path) as f:
+        source = compile(f.read(), path, "exec")
+    exec(source, {"__name__": "__main__"})
+
+def program():
+    """ Globals of the main program code.py runs, such as the animation
+    playing, while power_on() runs it or after it has stopped
+    """
+    return vars(sys.modules["ravetie"])
+
+def claim(pin):
+    if pin.name in _claimed:
+        raise ValueError(pin.name + " in use")
+    _claimed.add(pin.name)
+
+def release(pin):
+    _claimed.discard(pin.name)
+
+def press(pin, at_ms, duration_ms):
+    """ Script the pin to read high for duration_ms starting at at_ms """
+    start = at_ms * 1000000
+    _pin_script.setdefault(pin.name, []).append(
+        (start, start + duration_ms * 1000000))
+
+def pin_value(pin):
+    return pin_value_at(pin, clock.ns)
+
+def pin_value_at(pin, now):
+    """ Whether the pin is scripted high at now, in nanoseconds """
+    # Indexed rather than iterated so that reading a pin doesn't allocate and
+    # show up in the animations' heap measurements.
+    intervals = _pin_script.get(pin.name)
+    if intervals is None:
+        return False
+    i = 0
+    while i < len(intervals):
+        interval = intervals[i]
+        if interval[0] <= now < interval[1]:
+            return True
+        i += 1
+    return False
+
+def next_value(pin, value, after):
+    """ First time at or after the given nanoseconds that the pin reads
+    value, or None if it never does
+    """
+    if pin_value_at(pin, after) == value:
+        return after
+    intervals = sorted(_pin_script.get(pin.name, []))
+    if value:
+        starts = [start for start, end in intervals if start >= after]
+        return min(starts) if starts else None
+    # Reads high now, so low again when its interval ends
+    return min(end for start, end in intervals if start <= after < end)
+
+def audio_captured(start, end):
+    """ Note when the microphone last recorded, for measuring latency """
+    global last_capture
+    last_capture = (start, end)
+
+def set_audio_source(source):
+    global _audio_source
+    _audio_source = source if source is not None else Silence()
+
+def audio_source():
+    return _audio_source
+
+class _Loop:
+    """ Microphone input played from a loop of samples rendered up front. The
+    samples are kept as a list of ints so copying them into the recording
+    buffer doesn't allocate and skew the animations' heap measurements.
+    """
+
+    def __init__(self):
+        self.samples = None
+        self.sample_rate = None
+        self.pos = 0
+
+    def render(self, sample_rate):
+        """ Return one loop of unsigned 16 bit samples """
+        raise NotImplementedError
+
+    def read(self, buf, n, sample_rate):
+        if self.sample_rate != sample_rate:
+            self.samples = self.render(sample_rate)
+            self.sample_rate = sample_rate
+            self.pos = 0
+        samples = self.samples
+        length = len(samples)
+        pos = self.pos
+        i = 0
+        while i < n:
+            buf[i] = samples[pos]
+            pos += 1
+            if pos == length:
+                pos = 0
+            i += 1
+        self.pos = pos
+
+class Silence(_Loop):
+    """ Microphone input with no sound: a flat DC level """
+
+    def render(self, sample_rate):
+        return [32768]
+
+class Tone(_Loop):
+    """ Sine wave microphone input """
+
+    def __init__(self, frequency, amplitude=8000):
+        super().__init__()
+        self.frequency = frequency
+        self.amplitude = amplitude
+
+    def render(self, sample_rate):
+        step = 2 * math.pi * self.frequency / sample_rate
+        return [32768 + int(self.amplitude * math.sin(step * i))
+                for i in range(sample_rate)]
+
+class Noise(_Loop):
+    """ White noise microphone input, reproducible through the seed """
+
+    def __init__(self, amplitude=8000, seed=0):
+        super().__init__()
+        self.amplitude = amplitude
+        self.seed = seed
+
+    def render(self, sample_rate):
+        rand = random.Random(self.seed)
+        return [32768 + rand.randint(-self.amplitude, self.amplitude)
+                for i in range(sample_rate)]
+
+class Clicks(_Loop):
+    """ Microphone input of a click track: a burst of noise dying away on
+    every beat, over quiet noise, reproducible through the seed. Unlike the
+    other loops it is played against the virtual clock, so the beats stay in
+    time however little of the sound is recorded.
+    """
+
+    def __init__(self, bpm=120, amplitude=12000, seed=0):
+        super().__init__()
+        self.bpm = bpm
+        self.amplitude = amplitude
+        self.seed = seed
+
+    def render(self, sample_rate):
+        rand = random.Random(self.seed)
+        click = sample_rate // 50
+        samples = []
+        for i in range(sample_rate * 60 // self.bpm):
+            amplitude = self.amplitude * (click - i) // click \
+                if i < click else 0
+            samples.append(32768 + rand.randint(-amplitude - 200,
+                                                amplitude + 200))
+        return samples
+
+    def read(self, buf, n, sample_rate):
+        if self.sample_rate != sample_rate:
+            self.samples = self.render(sample_rate)
+            self.sample_rate = sample_rate
+        self.pos = clock.ns * sample_rate // 1000000000 % len(self.samples)
+        super().read(buf, n, sample_rate)
+
+class WavSource(_Loop):
+    """ Microphone input played from a 16 bit WAV file. Only the first
+    channel is used and the file loops when it runs out. The WAV sample rate
+    is assumed to match the one the microphone records at.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("only 16 bit WAV files are supported")
+            channels = wav.getnchannels()
+            frames = array('h', wav.readframes(wav.getnframes()))
+        if sys.byteorder == 'big':
+            frames.byteswap()
+        if len(frames) == 0:
+            raise ValueError("WAV file has no samples")
+        self.wav_samples = [sample + 32768 for sample in frames[::channels]]
+
+    def render(self, sample_rate):
+        return self.wav_samples
+
+set_audio_source(None)
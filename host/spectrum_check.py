@@ -0,0 +1,120 @@
+""" Checks the fixed point Goertzel bank in spectrum.Spectrum against a
+floating point DFT computed with NumPy.
+
+Both are run on the same recording windows: tones centered on every band,
+tones between bands, noise, silence and, optionally, a WAV file. Band levels
+are compared after constraining them to the Spectrum's floor and ceiling,
+since nothing outside that range changes what the pixels show.
+
+Needs NumPy, which only has to be installed on the host.
+
+Usage:
+    python3 host/spectrum_check.py [--pixels 6] [--tolerance 10] [--wav FILE]
+"""
+
+import argparse
+import os
+import sys
+from array import array
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+from neopixel import NeoPixel
+from framebuffer import FrameBuffer
+from spectrum import Spectrum
+
+def reference_magnitudes(windows, frequencies):
+    """ Band levels of every window at once, in the Spectrum's units: the RMS
+    of a sine wave centered in the band.
+
+    Args:
+        windows (ndarray): Raw unsigned 16 bit samples, one window per row
+        frequencies (list): Center of each band in radians per sample
+    """
+
+    x = windows.astype(np.float64)
+    x -= x.mean(axis=1, keepdims=True)
+    n = windows.shape[1]
+    twiddles = np.exp(-1j * np.outer(np.arange(n), frequencies))
+    return np.abs(x @ twiddles) * np.sqrt(2) / n
+
+def test_windows(spectrum, wav):
+    """ Recording windows to compare on, one per row """
+
+    n = spectrum.num_samples
+    t = np.arange(n) / spectrum.sample_rate
+    rng = np.random.default_rng(0)
+    windows = []
+    levels = np.linspace(spectrum.input_floor, spectrum.input_ceiling, 5)
+    bin_width = spectrum.sample_rate / n
+    for k in spectrum.bins:
+        # Centered on the band, then halfway to the next bin
+        for offset in (0.0, 0.5):
+            frequency = (k + offset) * bin_width
+            for rms in levels:
+                phase = rng.uniform(0, 2 * np.pi)
+                windows.append(32768 + np.round(
+                    rms * np.sqrt(2) * np.sin(2 * np.pi * frequency * t
+                                              + phase)))
+    for amplitude in (100, 300, 600, 3000, 30000):
+        for i in range(10):
+            windows.append(32768 + rng.integers(
+                -amplitude, amplitude, n, endpoint=True))
+    windows.append(np.full(n, 32768))
+
+    if wav:
+        samples = np.array(sim.WavSource(wav).wav_samples)
+        count = len(samples) // n
+        windows.extend(samples[:count * n].reshape(count, n))
+
+    return np.clip(np.array(windows), 0, 65535).astype(np.uint16)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--pixels", type=int, default=6,
+                        help="number of pixels, and so of bands")
+    parser.add_argument("--floor", type=int, default=100)
+    parser.add_argument("--ceiling", type=int, default=400)
+    parser.add_argument("--tolerance", type=float, default=10,
+                        help="largest error allowed in a band's level")
+    parser.add_argument("--wav", help="also compare on windows of a WAV file")
+    args = parser.parse_args()
+
+    pixels = NeoPixel(board.A3, args.pixels, auto_write=False)
+    spectrum = Spectrum(FrameBuffer(pixels), args.floor, args.ceiling)
+    spectrum.begin()
+
+    windows = test_windows(spectrum, args.wav)
+    bins = list(spectrum.bins)
+    frequencies = [spectrum._band_frequency(band) for band in range(len(bins))]
+    floor = spectrum.input_floor
+    ceiling = spectrum.input_ceiling
+    expected = np.clip(
+        reference_magnitudes(windows, frequencies), floor, ceiling)
+
+    actual = np.empty_like(expected)
+    for i, window in enumerate(windows):
+        actual[i] = spectrum._band_magnitudes(array('H', window.tolist()))
+    actual = np.clip(actual, floor, ceiling)
+    spectrum.end()
+
+    error = np.abs(actual - expected)
+    print("{:<5} {:>5} {:>10} {:>10}".format("band", "bin", "max error",
+                                            "mean error"))
+    for band, k in enumerate(bins):
+        print("{:<5} {:>5} {:>10.1f} {:>10.2f}".format(
+            band, k, error[:, band].max(), error[:, band].mean()))
+    print("{} windows, tolerance {}".format(len(windows), args.tolerance))
+
+    if error.max() > args.tolerance:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
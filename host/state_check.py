@@ -0,0 +1,131 @@
+""" Checks that the tie comes back the way it was left after being switched
+off: code.py is booted on the simulated board, the buttons and pads are
+pressed, and code.py is booted again on the same nvm, like the CPX after a
+power cycle.
+
+Checks that the animation, the brightness and the animation's colors come
+back, that a record made from scratch keeps the brightness the tie booted
+with, that a run of changes costs one write and changes that end up back
+where they were cost none, and that a damaged record is ignored.
+
+Usage:
+    python3 host/state_check.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+import microcontroller
+
+from checks import Check, quietly
+
+# Milliseconds for a change to be written, a little over State's save_delay
+SAVED = 6000
+
+class PowerOff(Exception):
+    """ Raised once the board has run for as long as asked """
+
+# Virtual ns at which the board is switched off. Sleeping is patched once,
+# since the scheduler keeps the sleep it imported across boots.
+power_off_ns = 0
+
+def sleep_until_off(seconds):
+    sim.clock.sleep(seconds)
+    if sim.clock.ns >= power_off_ns:
+        raise PowerOff()
+
+time.sleep = sleep_until_off
+
+def boot(seconds, script=()):
+    """ Run code.py from power on for seconds of virtual time, pressing the
+    pins in script, a list of (pin, ms) pairs. Returns the globals of the
+    program code.py runs.
+    """
+
+    global power_off_ns
+    sim.reset()
+    for pin, at_ms in script:
+        sim.press(pin, at_ms, 100 if pin in (board.A1, board.A6) else 50)
+    power_off_ns = seconds * 1000000000
+
+    try:
+        with quietly():
+            sim.power_on()
+    except PowerOff:
+        pass
+    return sim.program()
+
+def erase():
+    """ Erased flash reads as 0xff """
+    microcontroller.nvm[:] = b"\xff" * len(microcontroller.nvm)
+    microcontroller.nvm.writes = 0
+
+class StateCheck(Check):
+
+    def fresh(self):
+        # The first record written keeps the brightness booted with
+        erase()
+        first = boot(10, [(board.D4, 1000)])
+        again = boot(2)
+        self.expect("a new record keeps the brightness",
+                    first["brightness_level"] == 2
+                    and again["brightness_level"] == 2
+                    and again["transition"].brightness == 0.5
+                    and again["active_led_animation"] == 1)
+
+    def restored(self):
+        erase()
+        # Three presses to stairs, two taps for its third palette, and the
+        # brightness up a level
+        script = [(board.D4, 1000 + i * 1000) for i in range(3)]
+        script += [(board.A1, 4500), (board.A1, 5000), (board.D5, 6000)]
+        first = boot(6 + SAVED // 1000, script)
+        self.expect("a run of changes is written once",
+                    microcontroller.nvm.writes == 1)
+        again = boot(2)
+        self.expect("the animation comes back",
+                    again["active_led_animation"]
+                    == first["active_led_animation"] == 3)
+        self.expect("the brightness comes back",
+                    again["brightness_level"] == 3
+                    and again["transition"].brightness == 1.0)
+        self.expect("the animation's colors come back",
+                    again["led_animation"].active_palette
+                    == first["led_animation"].active_palette == 2)
+        self.expect("nothing written when nothing changed",
+                    microcontroller.nvm.writes == 1)
+
+    def unchanged(self):
+        # Round the four brightness levels back to where they started
+        erase()
+        boot(2 + SAVED // 1000, [(board.D4, 1000)])
+        boot(2 + SAVED // 1000, [(board.D5, 1000 + i * 300) for i in range(4)])
+        self.expect("changes undone aren't written",
+                    microcontroller.nvm.writes == 1)
+
+    def damaged(self):
+        erase()
+        boot(2 + SAVED // 1000, [(board.D4, 1000), (board.D5, 1500)])
+        # Flip a bit of the animation index, which the checksum catches
+        microcontroller.nvm[3] ^= 1
+        again = boot(2)
+        self.expect("a damaged record is ignored",
+                    again["active_led_animation"] == 0
+                    and again["brightness_level"] == 2)
+
+def main():
+    check = StateCheck()
+    check.fresh()
+    check.restored()
+    check.unchanged()
+    check.damaged()
+    check.finish()
+
+if __name__ == "__main__":
+    main()
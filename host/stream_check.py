@@ -0,0 +1,160 @@
+""" Checks the whole streaming pipeline on the host: host/stream_send.py
+writes frames into one end of a pseudo-terminal and stream.Stream reads them
+from the other, through the usb_cdc stand-in.
+
+Checks that frames arrive whole, that only the newest of a backlog is shown,
+that frames out of order are dropped, that the Stream finds its way back to
+the next frame after noise or a frame for another strip, that an animation
+streamed end to end comes out the same, and that reading frames doesn't
+allocate.
+
+Usage:
+    python3 host/stream_check.py [--pixels 6] [--frames 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+import usb_cdc
+from neopixel import NeoPixel
+from framebuffer import FrameBuffer
+from stream import Stream
+
+import alloc_check
+from checks import Check, quietly
+import stream_send
+import twinkle
+
+class StreamCheck(Check):
+
+    def __init__(self, num_pixels):
+        super().__init__()
+        self.num_pixels = num_pixels
+        # On A2, so that animation_frames() can render on A3 like bake.py
+        self.pixels = NeoPixel(board.A2, num_pixels, auto_write=False)
+        self.pixels.frames = None
+        self.frame = FrameBuffer(self.pixels)
+        self.stream = Stream(self.frame)
+        self.sender = stream_send.Sender(usb_cdc.data.name, num_pixels)
+
+    def begin(self):
+        with quietly():
+            self.stream.begin()
+
+    def update(self):
+        self.stream.update(0)
+        return bytes(self.frame.buf)
+
+    def colors(self):
+        return bytes(random.randrange(256) for _ in range(self.num_pixels * 3))
+
+    def whole_frames(self, count):
+        intact = True
+        for _ in range(count):
+            colors = self.colors()
+            self.sender.send(colors)
+            intact = intact and self.update() == colors
+        self.expect("frames arrive whole", intact
+                    and self.stream.shown == count)
+
+    def backlog(self):
+        shown = self.stream.shown
+        dropped = self.stream.dropped
+        frames = [self.colors() for _ in range(5)]
+        for colors in frames:
+            self.sender.send(colors)
+        self.expect("only the newest of a backlog is shown",
+                    self.update() == frames[-1]
+                    and self.stream.shown == shown + 1
+                    and self.stream.dropped == dropped + 4)
+
+    def out_of_order(self):
+        current = self.update()
+        self.sender.sequence = (self.sender.sequence - 10) & 0xffff
+        self.sender.send(self.colors())
+        self.expect("frames out of order are dropped",
+                    self.update() == current)
+        self.sender.sequence = (self.sender.sequence + 20) & 0xffff
+
+    def resync(self):
+        os.write(self.sender.fd, bytes([0xa5, 0x00, 0x5a, 0xa5, 0x12, 0x34]))
+        colors = self.colors()
+        self.sender.send(colors)
+        found = self.update() == colors
+
+        # Noise that ends in the first byte of the sync
+        os.write(self.sender.fd, bytes([0x12, 0xa5]))
+        colors = self.colors()
+        self.sender.send(colors)
+        found = found and self.update() == colors
+
+        # A frame for a longer strip is skipped as a whole
+        bad = self.stream.bad
+        other = stream_send.Sender(usb_cdc.data.name, self.num_pixels + 1)
+        other.send(bytes((self.num_pixels + 1) * 3))
+        other.close()
+        colors = self.colors()
+        self.sender.send(colors)
+        self.expect("finds the next frame after noise",
+                    found and self.update() == colors
+                    and self.stream.bad > bad)
+
+    def end_to_end(self, count):
+        sent = []
+        shown = []
+        frames = stream_send.animation_frames(twinkle.Twinkle,
+                                              self.num_pixels, 60)
+        with quietly():
+            for _, colors in zip(range(count), frames):
+                sent.append(colors)
+                self.sender.send(colors)
+                shown.append(self.update())
+            frames.close()
+        self.expect("an animation streams through unchanged", sent == shown)
+
+    def allocations(self, count):
+        tracer = alloc_check.AllocationTracer()
+        for _ in range(count):
+            self.sender.send(self.colors())
+            if random.random() < 0.3:
+                self.sender.send(self.colors())
+            tracer.start()
+            self.stream.update(0)
+            tracer.stop()
+        self.expect_no_allocations("reading frames doesn't allocate", tracer)
+
+    def end(self):
+        with quietly():
+            self.stream.end()
+        self.sender.close()
+        self.pixels.deinit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--pixels", type=int, default=6,
+                        help="number of pixels on the strip")
+    parser.add_argument("--frames", type=int, default=200,
+                        help="frames to send in each check")
+    args = parser.parse_args()
+
+    random.seed(0)
+    check = StreamCheck(args.pixels)
+    check.begin()
+    check.whole_frames(args.frames)
+    check.backlog()
+    check.out_of_order()
+    check.resync()
+    check.end_to_end(args.frames)
+    check.allocations(args.frames)
+    check.end()
+    check.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+""" Sends frames to the stream.Stream animation over the CPX's second USB
+serial port (usb_cdc.data, turned on in boot.py).
+
+Frames can come from any of the animation classes, run on the virtual clock
+one frame period at a time, or from effects rendered with NumPy on the
+computer. They are sent at a steady rate; the Stream animation drops any
+that fall behind, so the rate can be higher than the strip can show.
+
+The port is the CPX's data port, like /dev/ttyACM1, or the path in
+usb_cdc.data.name when the host stand-ins are used.
+
+Animations take their arguments like in host/bake.py, such as
+effect.Effect:comets.
+
+Usage:
+    python3 host/stream_send.py PORT twinkle.Twinkle [--fps 60]
+        [--seconds 10] [--pixels 6]
+    python3 host/stream_send.py PORT effect.Effect:comets
+    python3 host/stream_send.py PORT plasma
+"""
+
+import argparse
+import os
+import struct
+import sys
+import termios
+import time
+import tty
+
+# Wall clock time, before sim.install() routes time through the virtual clock
+_wall_clock = time.perf_counter
+_wall_sleep = time.sleep
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+from neopixel import NeoPixel
+from framebuffer import FrameBuffer
+from stream import SYNC
+
+import bake
+
+class Sender:
+    """ Writes frames to the Stream animation's port in its format """
+
+    def __init__(self, port, num_pixels):
+        """
+        Args:
+            port (str): Path of the serial port
+            num_pixels (int): Length of the strip; every frame must have
+            r, g, b for each pixel
+        """
+
+        self.fd = os.open(port, os.O_WRONLY | os.O_NOCTTY)
+        if os.isatty(self.fd):
+            # Send the bytes as they are, without translating line endings
+            attributes = termios.tcgetattr(self.fd)
+            tty.setraw(self.fd)
+            self.attributes = attributes
+        else:
+            self.attributes = None
+        self.num_pixels = num_pixels
+        self.sequence = 0
+
+    def send(self, colors):
+        """ Send one frame.
+
+        Args:
+            colors (bytes): r, g, b for every pixel; anything bytes() takes,
+            such as a NumPy array of uint8
+        """
+
+        colors = bytes(colors)
+        if len(colors) != self.num_pixels * 3:
+            raise ValueError("expected {} bytes, got {}".format(
+                self.num_pixels * 3, len(colors)))
+        frame = SYNC + struct.pack("<HH", self.sequence, len(colors)) \
+            + colors
+        self.sequence = (self.sequence + 1) & 0xffff
+        view = memoryview(frame)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def close(self):
+        if self.attributes:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.attributes)
+        os.close(self.fd)
+
+def animation_frames(factory, num_pixels, fps):
+    """ Frames of an animation class, one every 1/fps seconds of the virtual
+    clock, forever.
+
+    Args:
+        factory (def): Called with the frame buffer to create the animation
+        num_pixels (int): Length of the strip
+        fps (int): Frames per second
+    """
+
+    from ticks import ticks_ms, ticks_add, ticks_diff
+
+    pixels = NeoPixel(board.A3, num_pixels, auto_write=False)
+    pixels.frames = None
+    frame = FrameBuffer(pixels)
+    animation = factory(frame)
+    animation.begin()
+    try:
+        period_ns = 1000000000 // fps
+        due = ticks_ms()
+        while True:
+            now = ticks_ms()
+            if ticks_diff(now, due) >= 0:
+                due = ticks_add(now, animation.update(now))
+            yield bytes(frame.buf)
+            sim.clock.ns += period_ns
+    finally:
+        animation.end()
+        pixels.deinit()
+
+def plasma_frames(num_pixels, fps):
+    """ Colors flowing along the strip, worked out with NumPy """
+
+    import numpy as np
+
+    position = np.arange(num_pixels) / max(num_pixels - 1, 1)
+    t = 0.0
+    while True:
+        phase = np.sin(position * 6.0 + t) + np.sin(position * 3.0 - t * 1.7)
+        colors = np.stack([
+            np.sin(phase * np.pi),
+            np.sin(phase * np.pi + 2 * np.pi / 3),
+            np.sin(phase * np.pi + 4 * np.pi / 3)], axis=1)
+        yield ((colors + 1.0) * 127.5).astype(np.uint8).tobytes()
+        t += 1.0 / fps
+
+# NumPy effects, by name
+EFFECTS = {
+    "plasma": plasma_frames,
+}
+
+def stream(sender, frames, fps, seconds=0):
+    """ Send frames at fps until they run out or, if seconds isn't 0, for
+    that many seconds of wall clock time. Returns the number of frames sent.
+    """
+
+    period = 1.0 / fps
+    start = _wall_clock()
+    sent = 0
+    for colors in frames:
+        due = start + sent * period
+        if seconds and due - start >= seconds:
+            break
+        wait = due - _wall_clock()
+        if wait > 0:
+            _wall_sleep(wait)
+        sender.send(colors)
+        sent += 1
+    return sent
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("port", help="the CPX's data port, like /dev/ttyACM1")
+    parser.add_argument("source",
+                        help="animation class and any arguments, like "
+                        "twinkle.Twinkle or effect.Effect:comets, or one of: "
+                        + ", ".join(EFFECTS))
+    parser.add_argument("--fps", type=int, default=60,
+                        help="frames sent per second")
+    parser.add_argument("--seconds", type=int, default=0,
+                        help="stop after this many seconds, 0 for never")
+    parser.add_argument("--pixels", type=int, default=6,
+                        help="number of pixels on the strip")
+    args = parser.parse_args()
+
+    if args.source in EFFECTS:
+        frames = EFFECTS[args.source](args.pixels, args.fps)
+    else:
+        factory = bake.animation_factory(args.source)
+        frames = animation_frames(factory, args.pixels, args.fps)
+
+    sender = Sender(args.port, args.pixels)
+    try:
+        sent = stream(sender, frames, args.fps, args.seconds)
+    except KeyboardInterrupt:
+        sent = sender.sequence
+    finally:
+        sender.close()
+    print("{} frames sent".format(sent))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+""" Host stand-in for CircuitPython's supervisor module. Ticks follow the
+virtual clock.
+"""
+
+import sim
+
+_TICKS_PERIOD = 1 << 29
+
+# Like the board, start the ticks about a minute before they wrap so that code
+# which doesn't handle the wrap goes wrong straight away
+_TICKS_START = _TICKS_PERIOD - 65536
+
+def ticks_ms():
+    return (sim.clock.ns // 1000000 + _TICKS_START) % _TICKS_PERIOD
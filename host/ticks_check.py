@@ -0,0 +1,117 @@
+""" Checks the tick helpers against plain integer arithmetic, on either side
+of the ticks wrapping around and as far apart as ticks can be compared, that
+the simulated board's ticks wrap when the board's would, and that the
+scheduler keeps reading the inputs and updating an animation at a steady
+rate while the ticks wrap.
+
+Usage:
+    python3 host/ticks_check.py [--samples 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+from framebuffer import Canvas
+from scheduler import Scheduler
+from ticks import ticks_ms, ticks_add, ticks_diff, ticks_less
+
+from checks import Check, Solid
+
+TICKS_PERIOD = 1 << 29
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+# Virtual milliseconds after which the ticks wrap around
+WRAP_MS = 65536
+
+# Same as ravetie.py
+INPUT_PERIOD = 10
+
+class TicksCheck(Check):
+
+    def helpers(self, samples):
+        """ Check the helpers with ticks and deltas at random and at the
+        edges: the wrap and the furthest apart two ticks can be
+        """
+
+        rand = random.Random(0)
+        edges = (0, 1, TICKS_PERIOD - 1, TICKS_HALFPERIOD - 1,
+                 TICKS_HALFPERIOD)
+        deltas = (0, 1, -1, TICKS_HALFPERIOD - 1, 1 - TICKS_HALFPERIOD)
+        pairs = [(ticks, delta) for ticks in edges for delta in deltas]
+        pairs += [(rand.randrange(TICKS_PERIOD),
+                   rand.randrange(1 - TICKS_HALFPERIOD, TICKS_HALFPERIOD))
+                  for i in range(samples)]
+
+        added = diffs = less = True
+        for ticks, delta in pairs:
+            later = ticks_add(ticks, delta)
+            added &= later == (ticks + delta) % TICKS_PERIOD
+            diffs &= ticks_diff(later, ticks) == delta
+            less &= ticks_less(ticks, later) == (delta > 0)
+        self.expect("ticks_add() wraps", added)
+        self.expect("ticks_diff() across the wrap", diffs)
+        self.expect("ticks_less() across the wrap", less)
+
+    def board_ticks(self):
+        """ Check the simulated board's ticks wrap a minute or so in """
+        sim.reset()
+        sim.clock.advance_ms(WRAP_MS - 1)
+        before = ticks_ms()
+        sim.clock.advance_ms(1)
+        self.expect("board ticks wrap", before == TICKS_PERIOD - 1
+                    and ticks_ms() == 0)
+
+    def scheduler(self, period):
+        """ Check the scheduler's input reads and updates of an animation
+        updated every period milliseconds keep their rate across the wrap
+        """
+
+        sim.reset()
+        sim.clock.advance_ms(WRAP_MS - 1000)
+        reads = []
+        scheduler = Scheduler(INPUT_PERIOD, reads.append)
+        animation = Solid(Canvas(1), 0xff0000, period)
+        updates = []
+        update = animation.update
+        animation.update = lambda now: updates.append(now) or update(now)
+        scheduler.set_animation(animation)
+        # A scheduler that goes wrong at the wrap may stop sleeping, which
+        # would stop the virtual clock, so the passes are limited too
+        passes = 0
+        while sim.clock.ns // 1000000 < WRAP_MS + 1000 and passes < 10000:
+            scheduler.run_due()
+            scheduler.sleep()
+            passes += 1
+
+        def steady(times, period):
+            return len(times) == -(-2000 // period) \
+                and all(ticks_diff(later, earlier) == period
+                        for earlier, later in zip(times, times[1:]))
+
+        self.expect("{} ms: inputs read across the wrap".format(period),
+                    steady(reads, INPUT_PERIOD))
+        self.expect("{} ms: updates across the wrap".format(period),
+                    steady(updates, period))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--samples", type=int, default=100000,
+                        help="Random ticks and deltas to check the helpers "
+                        "with")
+    args = parser.parse_args()
+
+    check = TicksCheck()
+    check.helpers(args.samples)
+    check.board_ticks()
+    for period in (20, 30, 1000):
+        check.scheduler(period)
+    check.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+""" Host stand-in for CircuitPython's touchio module. A pad reads as touched
+while the pin is scripted high with sim.press().
+"""
+
+import sim
+
+# Time taken by the calibration read done on construction
+_CALIBRATION_NS = 2000000
+
+class TouchIn:
+
+    # Number of TouchIn objects constructed, to spot repeated calibration
+    constructed = 0
+
+    def __init__(self, pin):
+        sim.claim(pin)
+        self.pin = pin
+        self.threshold = 0
+        TouchIn.constructed += 1
+        sim.clock.ns += _CALIBRATION_NS
+
+    def deinit(self):
+        if self.pin is not None:
+            sim.release(self.pin)
+            self.pin = None
+
+    @property
+    def value(self):
+        if self.pin is None:
+            raise ValueError("Object has been deinitialized")
+        return sim.pin_value(self.pin)
+
+    @property
+    def raw_value(self):
+        return 2000 if self.value else 1000
@@ -0,0 +1,57 @@
+""" Saves the trace tracing.py sends from the CPX over its second USB serial
+port (usb_cdc.data, turned on in boot.py), for host/replay.py to play back.
+
+Start this before resetting the board with TRACE = True in code.py, so the
+trace is caught from its header on. Stops on Ctrl-C or after --seconds.
+
+Usage:
+    python3 host/trace_capture.py PORT OUT [--seconds 60]
+"""
+
+import argparse
+import os
+import termios
+import time
+import tty
+
+def capture(port, path, seconds=0):
+    """ Copy everything that arrives on the port to the file at path. Returns
+    the number of bytes saved.
+    """
+
+    fd = os.open(port, os.O_RDONLY | os.O_NOCTTY)
+    attributes = None
+    if os.isatty(fd):
+        # Take the bytes as they are, without translating line endings
+        attributes = termios.tcgetattr(fd)
+        tty.setraw(fd)
+    end = time.monotonic() + seconds
+    saved = 0
+    try:
+        with open(path, "wb") as f:
+            while not seconds or time.monotonic() < end:
+                data = os.read(fd, 4096)
+                if not data:
+                    break
+                f.write(data)
+                saved += len(data)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if attributes:
+            termios.tcsetattr(fd, termios.TCSADRAIN, attributes)
+        os.close(fd)
+    return saved
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("port", help="the CPX's data port, like /dev/ttyACM1")
+    parser.add_argument("trace", help="file to save the trace to")
+    parser.add_argument("--seconds", type=int, default=0,
+                        help="stop after this many seconds, 0 for never")
+    args = parser.parse_args()
+    print("{} bytes saved".format(capture(args.port, args.trace,
+                                          args.seconds)))
+
+if __name__ == "__main__":
+    main()
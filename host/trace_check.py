@@ -0,0 +1,56 @@
+""" Checks that a trace recorded by host/trace_record.py plays back through
+host/replay.py to exactly the frames that were shown while it was recorded,
+and that recording the same run twice gives the same trace.
+
+Recording and replaying each run in a process of their own, since each puts
+its own modules in place of the hardware ones.
+
+Usage:
+    python3 host/trace_check.py [--seconds 40]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HOST_DIR)
+from checks import Check
+
+def run(script, *args):
+    """ Run one of the host scripts, returning whether it succeeded """
+    result = subprocess.run(
+        [sys.executable, os.path.join(HOST_DIR, script)] + list(args),
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        universal_newlines=True)
+    if result.returncode:
+        print(result.stdout)
+    return result.returncode == 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--seconds", type=int, default=40,
+                        help="virtual seconds to record for")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        trace = os.path.join(directory, "run.trace")
+        frames = os.path.join(directory, "run.frames")
+        again = os.path.join(directory, "again.trace")
+        seconds = str(args.seconds)
+
+        check = Check()
+        check.expect("record", run("trace_record.py", trace, "--frames",
+                                   frames, "--seconds", seconds))
+        check.expect("replay gives the same frames",
+                     run("replay.py", trace, "--expect", frames))
+        recorded = run("trace_record.py", again, "--seconds", seconds)
+        with open(trace, "rb") as f, open(again, "rb") as g:
+            same = recorded and f.read() == g.read()
+        check.expect("recording again gives the same trace", same)
+    check.finish()
+
+if __name__ == "__main__":
+    main()
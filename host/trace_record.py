@@ -0,0 +1,93 @@
+""" Records a trace of code.py running on the simulated board, the way
+tracing.py records one on the CPX, and saves the frames it made alongside.
+
+Button A is pressed every few seconds so every animation gets its turn, button
+B steps the brightness now and then and the pads are tapped, all on the
+virtual clock, with the microphone hearing noise or a WAV file. Replaying the
+trace with host/replay.py --expect must give the same frames back.
+
+Usage:
+    python3 host/trace_record.py OUT [--frames FRAMES] [--seconds 60]
+        [--audio noise]
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+import tracing
+import replay
+
+def script_inputs(seconds):
+    """ Button A every 3 seconds, button B every 7, and taps on A1 and A6 """
+    for at_ms in range(2500, seconds * 1000, 3000):
+        sim.press(board.D4, at_ms, 50)
+    for at_ms in range(5000, seconds * 1000, 7000):
+        sim.press(board.D5, at_ms, 50)
+    for at_ms in range(1000, seconds * 1000, 2000):
+        sim.press(board.A1, at_ms, 100)
+    for at_ms in range(1700, seconds * 1000, 5000):
+        sim.press(board.A6, at_ms, 100)
+
+def record(path, seconds, audio):
+    """ Run code.py for seconds of virtual time, recording its inputs to a
+    trace at path. Returns the FrameLog.
+    """
+
+    sim.reset()
+    sim.set_audio_source(audio)
+    script_inputs(seconds)
+    # Sleeping isn't recorded, so the board stays awake like it does on the
+    # CPX, whose firmware can't sleep
+    sys.modules["alarm"] = None
+
+    sleep = time.sleep
+    end_ns = sim.clock.ns + seconds * 1000000000
+
+    def sleep_until_end(seconds):
+        sleep(seconds)
+        if sim.clock.ns >= end_ns:
+            raise replay.EndOfTrace()
+
+    time.sleep = sleep_until_end
+
+    with open(path, "wb") as f:
+        tracing.install(f)
+        log = replay.FrameLog(lambda: tracing._recorder.last_ticks)
+        log.install()
+        log.run()
+    return log
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("trace", help="file to record the trace to")
+    parser.add_argument("--frames", help="save the frames to this file")
+    parser.add_argument("--seconds", type=int, default=60,
+                        help="virtual seconds to record for")
+    parser.add_argument("--audio", default="noise",
+                        help="noise or the path to a WAV file")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the animations' random choices")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    audio = sim.Noise() if args.audio == "noise" \
+        else sim.WavSource(args.audio)
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            log = record(args.trace, args.seconds, audio)
+    print("{} frames, {} bytes of trace".format(
+        len(log.frames), os.path.getsize(args.trace)))
+    if args.frames:
+        replay.save_frames(args.frames, log.frames)
+
+if __name__ == "__main__":
+    main()
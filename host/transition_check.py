@@ -0,0 +1,132 @@
+""" Checks the crossfade between animations: that it never goes black in
+between, steps through every level of the fade in the time it is given and
+ends on the incoming animation's own frame, that both animations keep being
+updated at their own rates while it fades, that an animation that has
+already ended fades out from its last frame, and that fading doesn't
+allocate.
+
+Usage:
+    python3 host/transition_check.py [--pixels 6]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+from neopixel import NeoPixel
+from framebuffer import FrameBuffer
+from scheduler import Scheduler
+from transition import Transition
+from ticks import ticks_ms
+
+import alloc_check
+from checks import Check, Solid
+
+DURATION = 500
+
+class TransitionCheck(Check):
+
+    def __init__(self, num_pixels):
+        super().__init__()
+        self.num_pixels = num_pixels
+
+    def fade(self, outgoing_ends=False, tracer=None, duration=DURATION):
+        """ Fade from red updated every 20 ms to blue updated every 30 ms.
+        Returns the frames shown, the transition and both animations.
+        """
+
+        sim.reset()
+        pixels = NeoPixel(board.A3, self.num_pixels, auto_write=False)
+        frames = tuple(FrameBuffer(pixels, gamma=2.2) for i in range(2))
+        transition = Transition(frames, duration)
+        scheduler = Scheduler(10, lambda now: None)
+
+        red = Solid(transition.frame, 0xff0000, 20)
+        red.begin()
+        scheduler.set_animation(red)
+        while sim.clock.ns < 200000000:
+            if scheduler.run_due():
+                transition.show()
+            scheduler.sleep()
+
+        blue = Solid(transition.spare, 0x0000ff, 30)
+        blue.begin()
+        if outgoing_ends:
+            red.end()
+            transition.begin(None, blue, ticks_ms())
+        else:
+            transition.begin(red, blue, ticks_ms())
+        scheduler.set_animation(transition)
+        red.updates = 0
+        started = sim.clock.ns
+        shown = []
+        while transition.fading:
+            if tracer:
+                tracer.start()
+            if scheduler.run_due():
+                if transition.show():
+                    shown.append(pixels.frame())
+            if tracer:
+                tracer.stop()
+            if transition.finished:
+                scheduler.set_animation(blue, transition.finish(ticks_ms()))
+            scheduler.sleep()
+        fade_ms = (sim.clock.ns - started) // 1000000
+        if transition.show():
+            shown.append(pixels.frame())
+        pixels.deinit()
+        return shown, fade_ms, transition, red, blue
+
+    def run(self):
+        shown, fade_ms, transition, red, blue = self.fade()
+        self.expect("never black while fading",
+                    all(any(frame) for frame in shown))
+        reds = [frame[0] for frame in shown]
+        blues = [frame[2] for frame in shown]
+        self.expect("red fades out and blue fades in",
+                    reds == sorted(reds, reverse=True)
+                    and blues == sorted(blues))
+        self.expect("every step of the fade is shown",
+                    len(set(blues)) == 9)
+        self.expect("takes the time it is given",
+                    DURATION <= fade_ms < DURATION + 40)
+        self.expect("ends on the incoming frame",
+                    shown[-1] == bytes(transition.frame.out))
+        self.expect("outgoing ended once faded", red.ended)
+        # Both are updated as often as they would be by themselves
+        self.expect("both keep their frame rates",
+                    red.updates >= DURATION // 20
+                    and blue.updates >= DURATION // 30)
+
+        shown, fade_ms, transition, red, blue = self.fade(outgoing_ends=True)
+        reds = [frame[0] for frame in shown]
+        self.expect("an ended animation fades out",
+                    red.updates == 0 and reds[0] > 0 and reds[-1] == 0
+                    and reds == sorted(reds, reverse=True))
+
+        shown, fade_ms, transition, red, blue = self.fade(duration=0)
+        self.expect("no fade cuts straight to the next",
+                    shown == [bytes(transition.frame.out)]
+                    and shown[0][2] and not shown[0][0])
+
+        tracer = alloc_check.AllocationTracer()
+        self.fade(tracer=tracer)
+        self.expect_no_allocations("fading doesn't allocate", tracer)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--pixels", type=int, default=6,
+                        help="number of pixels on the strip")
+    args = parser.parse_args()
+
+    check = TransitionCheck(args.pixels)
+    check.run()
+    check.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+""" Checks Twinkle's pool of off pixels and heap of lit pixels: that between
+them they hold every pixel once, that the heap stays ordered by the time each
+pixel goes off, that exactly the lit pixels are drawn, that each pixel goes
+off at its time and that pixels twinkle as many at a time and as often as
+they should. Twinkle is played on a short strip and on one long enough to
+run out of off pixels, through both sets of durations, a change of colors
+and the beat, and again while the ticks wrap around.
+
+Twinkle is updated exactly when it asks to be, so a pixel that goes off late
+shows that the wait it returned was too long.
+
+Usage:
+    python3 host/twinkle_check.py [--seconds 30]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+sim.install()
+
+import board
+from framebuffer import Canvas
+from ticks import ticks_ms, ticks_diff
+from twinkle import Twinkle
+
+from checks import Check, quietly
+
+# Virtual milliseconds after which the ticks wrap around
+WRAP_MS = 65536
+
+# Milliseconds between beats once Twinkle follows the beat
+BEAT_PERIOD = 400
+
+class TwinkleCheck(Check):
+
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+
+    def play(self, num_pixels, pixels_per_twinkle=0, start_ms=0):
+        """ Play Twinkle for the given seconds, changing its durations a
+        quarter of the way through, its colors halfway and following the
+        beat for the last quarter. Returns the names of the invariants that
+        held every frame.
+        """
+
+        sim.reset()
+        random.seed(num_pixels)
+        sim.clock.advance_ms(start_ms)
+        pixels = Canvas(num_pixels)
+        twinkle = Twinkle(pixels, pixels_per_twinkle)
+        with quietly():
+            twinkle.begin()
+
+        held = {"pool", "heap", "drawn", "off on time", "lit for duration",
+                "twinkle count", "twinkle wait", "colors"}
+        end_ms = self.seconds * 1000
+        changes = [(end_ms // 4, "delays"), (end_ms // 2, "colors"),
+                   (3 * end_ms // 4, "beat")]
+        lit = set()
+        ran_out = False
+        while sim.clock.ns // 1000000 - start_ms < end_ms:
+            now = ticks_ms()
+            elapsed = sim.clock.ns // 1000000 - start_ms
+            if changes and elapsed >= changes[0][0]:
+                change = changes.pop(0)[1]
+                if change == "delays":
+                    twinkle.tapped(board.A6)
+                elif change == "colors":
+                    twinkle.tapped(board.A1)
+                    palette = twinkle.twinkle_colors[twinkle.active_colors]
+                    if not all(self.color(pixels[pixel]) in palette
+                               for pixel in lit):
+                        held.discard("colors")
+                else:
+                    twinkle.beat(now, BEAT_PERIOD)
+
+            # What the update is expected to do
+            due = twinkle.last_active_twinkle_time is None \
+                or ticks_diff(now, twinkle.last_active_twinkle_time) \
+                >= twinkle.active_next_twinkle_duration
+            on_time = twinkle.last_active_twinkle_time is None \
+                or ticks_diff(now, twinkle.last_active_twinkle_time) \
+                == twinkle.active_next_twinkle_duration
+            if twinkle.beat_period:
+                durations = (BEAT_PERIOD, 2 * BEAT_PERIOD)
+            else:
+                durations = twinkle.twinkle_durations[
+                    twinkle.active_twinkle_durations][0]
+            off_times = {pixel: twinkle.off_times[pixel] for pixel in lit}
+
+            wait = twinkle.update(now)
+
+            now_lit = set(twinkle.lit_pixels[:twinkle.lit_count])
+            # A pixel can go off and twinkle again in the same update
+            again = {pixel for pixel in lit & now_lit
+                     if twinkle.off_times[pixel] != off_times[pixel]}
+            turned_off = (lit - now_lit) | again
+            twinkled = (now_lit - lit) | again
+            if not self.pool_holds_the_rest(twinkle):
+                held.discard("pool")
+            if not self.heap_ordered(twinkle):
+                held.discard("heap")
+            if any((pixels[pixel] != (0, 0, 0)) != (pixel in now_lit)
+                   for pixel in range(num_pixels)):
+                held.discard("drawn")
+            if any(off_times[pixel] != now for pixel in turned_off) \
+               or any(ticks_diff(twinkle.off_times[pixel], now) <= 0
+                      for pixel in now_lit):
+                held.discard("off on time")
+            if any(not durations[0] + 1
+                   <= ticks_diff(twinkle.off_times[pixel], now)
+                   <= durations[1] + 1 for pixel in twinkled):
+                held.discard("lit for duration")
+            # Only as many as were off, should the pool run out
+            expected = min(twinkle.pixels_per_twinkle,
+                           num_pixels - len(lit) + len(turned_off)) \
+                if due else 0
+            if len(twinkled) != expected:
+                held.discard("twinkle count")
+            if due and not on_time:
+                held.discard("twinkle wait")
+            ran_out |= twinkle.free_count == 0
+
+            lit = now_lit
+            sim.clock.advance_ms(max(wait, 1))
+
+        with quietly():
+            twinkle.end()
+        if ran_out:
+            held.add("ran out")
+        return held
+
+    def color(self, rgb):
+        return (rgb[0] << 16) | (rgb[1] << 8) | rgb[2]
+
+    def pool_holds_the_rest(self, twinkle):
+        """ Whether the off pixels and the lit pixels are every pixel once """
+        pool = list(twinkle.free_pixels[:twinkle.free_count])
+        heap = list(twinkle.lit_pixels[:twinkle.lit_count])
+        return sorted(pool + heap) == list(range(twinkle.num_pixels))
+
+    def heap_ordered(self, twinkle):
+        """ Whether no lit pixel goes off before its parent in the heap """
+        heap = twinkle.lit_pixels
+        off_times = twinkle.off_times
+        return all(ticks_diff(off_times[heap[i]],
+                              off_times[heap[(i - 1) >> 1]]) >= 0
+                   for i in range(1, twinkle.lit_count))
+
+    def run(self, name, num_pixels, pixels_per_twinkle=0, start_ms=0,
+            runs_out=False):
+        held = self.play(num_pixels, pixels_per_twinkle, start_ms)
+        self.expect(name + " pool and heap hold all", "pool" in held)
+        self.expect(name + " heap in off time order", "heap" in held)
+        self.expect(name + " lit pixels drawn", "drawn" in held)
+        self.expect(name + " pixels go off on time", "off on time" in held)
+        self.expect(name + " lit for a duration", "lit for duration" in held)
+        self.expect(name + " pixels per twinkle", "twinkle count" in held)
+        self.expect(name + " twinkles on time", "twinkle wait" in held)
+        self.expect(name + " recolors lit pixels", "colors" in held)
+        if runs_out:
+            self.expect(name + " runs out of off pixels", "ran out" in held)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=int, default=30,
+                        help="Virtual seconds to play each strip for")
+    args = parser.parse_args()
+
+    check = TwinkleCheck(args.seconds)
+    check.run("10:", 10)
+    check.run("300:", 300, pixels_per_twinkle=60, runs_out=True)
+    # The ticks wrap a quarter of the way through
+    check.run("10 (wrap):", 10, start_ms=WRAP_MS - args.seconds * 250)
+    check.run("300 (wrap):", 300, pixels_per_twinkle=60,
+              start_ms=WRAP_MS - args.seconds * 250, runs_out=True)
+    check.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+""" Host stand-in for CircuitPython's usb_cdc module. data is one end of a
+pseudo-terminal, as if boot.py had turned it on; whatever is written to the
+other end, at the path in data.name, arrives on it the way bytes from the
+computer arrive over USB. host/stream_send.py can send to that path.
+"""
+
+import array
+import fcntl
+import os
+import pty
+import termios
+import tty
+
+class Serial:
+
+    def __init__(self):
+        self._fd, self._other_fd = pty.openpty()
+        # Bytes go through untouched, with no line editing or echo
+        tty.setraw(self._other_fd)
+        self.name = os.ttyname(self._other_fd)
+        self.timeout = 1.0
+        self.write_timeout = None
+
+    @property
+    def in_waiting(self):
+        count = array.array("i", [0])
+        fcntl.ioctl(self._fd, termios.FIONREAD, count)
+        return count[0]
+
+    def readinto(self, buf):
+        """ Read what has arrived into buf, up to its length. Doesn't wait
+        for more, as on the board with timeout=0.
+        """
+        data = os.read(self._fd, min(len(buf), self.in_waiting)) \
+            if self.in_waiting else b""
+        buf[:len(data)] = data
+        return len(data)
+
+    def read(self, size=1):
+        return os.read(self._fd, min(size, self.in_waiting)) \
+            if self.in_waiting else b""
+
+    def write(self, data):
+        return os.write(self._fd, data)
+
+    def reset_input_buffer(self):
+        while self.in_waiting:
+            os.read(self._fd, self.in_waiting)
+
+    def reset_output_buffer(self):
+        pass
+
+    def deinit(self):
+        os.close(self._fd)
+        os.close(self._other_fd)
+
+console = None
+data = Serial()
+
+def enable(console=True, data=False):
+    pass
@@ -0,0 +1,95 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from time import sleep
+from digitalio import DigitalInOut, Pull
+
+try:
+    import alarm
+    from alarm.pin import PinAlarm
+except ImportError:
+    # Not every board's firmware can sleep
+    alarm = None
+
+class Idle:
+    """ Puts the board to sleep until a button is pressed, so that it draws
+    next to no current while the pixels are off. Light sleep returns where it
+    left off; deep sleep saves the animation to resume in sleep memory and
+    restarts code.py on wake.
+
+    The firmware needs the alarm module for either. Without it, available is
+    False and sleep() returns straight away.
+    """
+
+    def __init__(self, wake_pin, deep=False):
+        """
+        Args:
+            wake_pin (Board.Pin): Pin of the button that wakes the board.
+            Reads high when pressed, like buttons A and B.
+            deep (bool): Deep sleep rather than light sleep
+        """
+
+        self.wake_pin = wake_pin
+        self.deep = deep
+        self.available = alarm is not None
+
+    def sleep(self, resume_animation):
+        """ Sleep until the wake button is pressed and then released. Nothing
+        else may be using the wake pin.
+
+        Args:
+            resume_animation (int): Animation to resume after a deep sleep,
+            returned by resume_animation() once code.py restarts.
+        """
+
+        if not self.available:
+            return
+
+        print("idle: sleep")
+        wake = PinAlarm(self.wake_pin, value=True, pull=True)
+        if self.deep:
+            alarm.sleep_memory[0] = resume_animation + 1
+            alarm.exit_and_deep_sleep_until_alarms(wake)
+        alarm.light_sleep_until_alarms(wake)
+        print("idle: awake")
+        wake = None
+        self.wait_for_release()
+
+    def resume_animation(self):
+        """ Animation to resume if the board was woken from deep sleep by the
+        wake button, otherwise -1
+        """
+
+        if not self.available or not isinstance(alarm.wake_alarm, PinAlarm):
+            return -1
+        return alarm.sleep_memory[0] - 1
+
+    def wait_for_release(self):
+        """ Wait for the button that woke the board to be let go, so that the
+        press doesn't also count as a button press
+        """
+
+        button = DigitalInOut(self.wake_pin)
+        button.switch_to_input(pull=Pull.DOWN)
+        while button.value:
+            sleep(0.02)
+        button.deinit()
@@ -0,0 +1,203 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from micropython import const
+
+from framebuffer import Canvas
+from ticks import ticks_add, ticks_diff
+
+# How a layer goes over the layers below it, in the order of MODES
+MODES = ("add", "max", "alpha", "mask")
+_ADD = const(0)
+_MAX = const(1)
+_ALPHA = const(2)
+_MASK = const(3)
+
+class Layers:
+    """ Plays several animations at once, one over the other, such as the VU
+    meter over Twinkle. Each animation draws into a layer of its own and is
+    updated when it is due, so a slow layer doesn't hold back a fast one.
+    The layers are put together in the frame buffer with a blend mode each:
+
+        add: the colors are added, up to full
+        max: the brighter of the two for each color
+        alpha: the layer's lit pixels cover the layers below at its opacity;
+        its black pixels let them through
+        mask: the layers below only show through as much as the layer is lit
+
+    What the layers below each layer make together is kept, so a frame
+    starts from the lowest layer that changed and layers that haven't are
+    skipped. A frame where none changed costs nothing more than the updates.
+
+    The layers don't keep time with the music: the beat tracker and a layer
+    such as the VU meter can't share the microphone.
+    """
+
+    def __init__(self, pixels, layers):
+        """
+        Args:
+            pixels (FrameBuffer): Frame buffer to draw into
+            layers (tuple): For each layer from the bottom up, a tuple of
+            module name, class name and any constructor arguments after the
+            pixels, like an entry of the animations in ravetie.py, then the
+            blend mode, one of MODES, and for alpha the opacity from 0 to 255
+        """
+
+        self.pixels = pixels
+        num_pixels = len(pixels)
+        self.animations = []
+        self.canvases = []
+        self.modes = bytearray(len(layers))
+        # Ticks each layer is next due to be updated at
+        self.due = [0] * len(layers)
+        self.starting = True
+        # For each layer, what it and the layers below it make together
+        self.composites = []
+        # For alpha layers, each level scaled by the opacity and by what
+        # is left of it, 256 of each
+        self.tables = []
+        for i, layer in enumerate(layers):
+            module_name, class_name, args, mode = layer[:4]
+            canvas = Canvas(num_pixels)
+            module = __import__(module_name)
+            self.animations.append(getattr(module, class_name)(canvas, *args))
+            self.canvases.append(canvas)
+            self.modes[i] = MODES.index(mode)
+            self.composites.append(bytearray(num_pixels * 3))
+            tables = None
+            if self.modes[i] == _ALPHA:
+                opacity = layer[4] if len(layer) > 4 else 255
+                tables = bytearray(512)
+                for level in range(256):
+                    tables[level] = level * opacity // 255
+                    tables[256 + level] = level * (255 - opacity) // 255
+            self.tables.append(tables)
+        # What the lowest layer goes over
+        self.black = bytearray(num_pixels * 3)
+
+        # The bottom layer with colors and speeds to save, if any
+        self.keeper = None
+        for animation in self.animations:
+            if hasattr(animation, "settings"):
+                self.keeper = animation
+                break
+
+    def begin(self):
+        print("layers: begin")
+        begun = []
+        try:
+            for animation in self.animations:
+                animation.begin()
+                begun.append(animation)
+        except ValueError:
+            # Such as the pins being in use; none are left claimed so
+            # begin() can be tried again
+            for animation in begun:
+                animation.end()
+            raise
+        # Every layer is updated and goes into the first frame
+        self.starting = True
+        for canvas in self.canvases:
+            canvas.dirty = True
+        self.pixels.fill(0)
+
+    def tapped(self, pin):
+        for animation in self.animations:
+            animation.tapped(pin)
+
+    def settings(self):
+        if self.keeper is None:
+            return 0
+        return self.keeper.settings()
+
+    def restore(self, settings):
+        if self.keeper is not None:
+            self.keeper.restore(settings)
+
+    def update(self, now):
+        """ Update the layers that are due and put together the frame from
+        the lowest layer that changed. Returns the milliseconds until a layer
+        is next due.
+        """
+
+        animations = self.animations
+        due = self.due
+        if self.starting:
+            for i in range(len(due)):
+                due[i] = now
+            self.starting = False
+        wait = None
+        for i in range(len(animations)):
+            if ticks_diff(now, due[i]) >= 0:
+                due[i] = ticks_add(now, animations[i].update(now))
+            left = ticks_diff(due[i], now)
+            if wait is None or left < wait:
+                wait = left
+
+        canvases = self.canvases
+        for lowest in range(len(canvases)):
+            if canvases[lowest].dirty:
+                break
+        else:
+            return max(wait, 0)
+
+        composites = self.composites
+        below = composites[lowest - 1] if lowest > 0 else self.black
+        for i in range(lowest, len(canvases)):
+            canvas = canvases[i]
+            self._blend(i, below, canvas.buf, composites[i])
+            canvas.dirty = False
+            below = composites[i]
+        self.pixels.blit(below)
+        return max(wait, 0)
+
+    def _blend(self, index, below, colors, out):
+        """ Put layer index's colors over below, into out """
+        out[self.pixels.all_bytes] = below
+        mode = self.modes[index]
+        if mode == _ADD:
+            for i in range(len(out)):
+                level = out[i] + colors[i]
+                out[i] = level if level < 255 else 255
+        elif mode == _MAX:
+            for i in range(len(out)):
+                if colors[i] > out[i]:
+                    out[i] = colors[i]
+        elif mode == _ALPHA:
+            tables = self.tables[index]
+            for i in range(0, len(out), 3):
+                r = colors[i]
+                g = colors[i + 1]
+                b = colors[i + 2]
+                if r or g or b:
+                    out[i] = tables[r] + tables[256 + out[i]]
+                    out[i + 1] = tables[g] + tables[256 + out[i + 1]]
+                    out[i + 2] = tables[b] + tables[256 + out[i + 2]]
+        else:
+            for i in range(len(out)):
+                out[i] = out[i] * (colors[i] + 1) >> 8
+
+    def end(self):
+        print("layers: end")
+        for animation in self.animations:
+            animation.end()
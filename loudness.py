@@ -0,0 +1,100 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+def isqrt(value, guess=0):
+    """ Integer square root, rounded down. Newton's method converges from
+    any guess at or above the root, so a root worked out before, such as the
+    last frame's, makes it quicker.
+    """
+
+    if value == 0:
+        return 0
+    x = guess if guess * guess >= value else value
+    y = (x + value // x) // 2
+    while y < x:
+        x = y
+        y = (x + value // x) // 2
+    return x
+
+class Loudness:
+    """ Works out how loud microphone recordings are, for the VU meter and
+    the beat tracker alike. The DC bias the microphone adds follows the
+    recordings' means slowly, since a short recording's own mean would take
+    the bass out along with the bias. All in integers, so nothing is
+    allocated.
+    """
+
+    def __init__(self, num_samples, decimation):
+        """
+        Args:
+            num_samples (int): Samples in each recording
+            decimation (int): Only every this many samples are used, which
+            makes working out the loudness that much quicker
+        """
+
+        self.decimation = decimation
+        # Largest deviation from the mean a sample may have so that the sum
+        # of the squares stays a small int. Louder samples are clipped.
+        count = (num_samples + decimation - 1) // decimation
+        self.max_deviation = isqrt(0x3fffffff // count)
+        self.bias = -1
+
+    def reset(self):
+        """ Forget the bias, such as when the microphone is started again """
+        self.bias = -1
+
+    def mean_square(self, values):
+        """ Mean square of every decimation'th sample in values, once the DC
+        bias is taken out
+        """
+
+        step = self.decimation
+        n = len(values)
+        total = 0
+        count = 0
+        i = 0
+        while i < n:
+            total += values[i]
+            count += 1
+            i += step
+        mean = total // count
+
+        # The bias is kept in 16ths
+        if self.bias < 0:
+            self.bias = mean << 4
+        else:
+            self.bias += ((mean << 4) - self.bias) >> 3
+        mean = self.bias >> 4
+
+        limit = self.max_deviation
+        total = 0
+        i = 0
+        while i < n:
+            deviation = values[i] - mean
+            if deviation > limit:
+                deviation = limit
+            elif deviation < -limit:
+                deviation = -limit
+            total += deviation * deviation
+            i += step
+        return total // count
@@ -0,0 +1,112 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from micropython import const
+
+# Colors are packed as 0xRRGGBB, the way the frame buffer takes them, so
+# handing one to an animation or setting a pixel to it allocates nothing.
+RED = const(0xff0000)
+PURPLE = const(0x800080)
+GREEN = const(0x00ff00)
+BLUE = const(0x0000ff)
+GOLD = const(0xffd700)
+WHITE = const(0xffffff)
+
+# Named palettes shared by the animations
+PALETTES = {
+    "red": (RED,),
+    "purple": (PURPLE,),
+    "green": (GREEN,),
+    "blue": (BLUE,),
+    "gold": (GOLD,),
+    "rave": (RED, PURPLE, GREEN, BLUE, GOLD),
+    "warm": (0xff9329, 0xff5000, 0xffc878),
+    "cool": (0x0050ff, 0x00ffc8, 0x7800ff),
+}
+
+# The named palettes by number, for effect programs to refer to in a byte
+NAMES = ("red", "purple", "green", "blue", "gold", "rave", "warm", "cool")
+
+# Stops of the named gradients: position 0-255, color
+GRADIENT_STOPS = {
+    # Red through green and blue back to red
+    "rainbow": ((0, RED), (85, GREEN), (170, BLUE), (255, RED)),
+    # Red rising to yellow, for the VU meter
+    "vu": ((0, 0xc80000), (255, 0xc8ff00)),
+}
+
+# Gradients worked out so far, by name
+_gradients = {}
+
+def scale(color, level):
+    """ The color at level 0-256 of its brightness """
+    return ((((color >> 16) & 0xff) * level >> 8) << 16) \
+        | ((((color >> 8) & 0xff) * level >> 8) << 8) \
+        | ((color & 0xff) * level >> 8)
+
+def gradient(name):
+    """ The named gradient, worked out the first time it is asked for and
+    shared from then on
+    """
+
+    table = _gradients.get(name)
+    if table is None:
+        table = Gradient(GRADIENT_STOPS[name])
+        _gradients[name] = table
+    return table
+
+class Gradient:
+    """ 256 colors blended between stops, kept as a bytearray of r, g, b so
+    looking one up is a few byte reads however many stops there are.
+    """
+
+    def __init__(self, stops):
+        """
+        Args:
+            stops (list): (position, color) pairs, positions rising from 0
+            to 255
+        """
+
+        self.table = bytearray(256 * 3)
+        table = self.table
+        for s in range(len(stops) - 1):
+            start, start_color = stops[s]
+            stop, stop_color = stops[s + 1]
+            span = max(stop - start, 1)
+            for shift in (16, 8, 0):
+                a = (start_color >> shift) & 0xff
+                b = (stop_color >> shift) & 0xff
+                channel = 2 - shift // 8
+                for position in range(start, stop + 1):
+                    table[position * 3 + channel] \
+                        = a + (b - a) * (position - start) // span
+
+    def __len__(self):
+        return 256
+
+    def __getitem__(self, position):
+        """ Packed color at position 0-255 """
+        offset = (position & 0xff) * 3
+        table = self.table
+        return (table[offset] << 16) | (table[offset + 1] << 8) \
+            | table[offset + 2]
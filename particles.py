@@ -0,0 +1,188 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from array import array
+from micropython import const
+
+# Positions are in 65536ths of a pixel and velocities in 65536ths of a pixel
+# per millisecond, so slow comets still move smoothly and everything stays a
+# small int on the CPX
+_ONE = const(1 << 16)
+
+class Particles:
+    """ Comets bouncing up and down the strip. Everything about them is kept
+    in arrays with one entry per comet rather than in an object each, so a
+    long strip can have many of them, and they are all moved and drawn in one
+    pass a frame. Comets that overlap add up.
+    """
+
+    def __init__(self, num_pixels, count, trail=1, fade=26, both_ways=False):
+        """
+        Args:
+            num_pixels (int): Length of the strip
+            count (int): Number of comets
+            trail (int): Pixels of trail behind each comet's head
+            fade (int): Brightness of each trail pixel, out of 256, relative
+            to the one before it
+            both_ways (bool): Draw the trail ahead of the head as well as
+            behind it
+        """
+
+        self.num_pixels = num_pixels
+        self.count = count
+        self.fade = fade
+        self.both_ways = both_ways
+        # Milliseconds a comet rests at either end before turning round
+        self.turn = 0
+        self.end = (num_pixels - 1) << 16
+
+        self.position = array('l', [0] * count)
+        self.velocity = array('l', [0] * count)
+        # Index of each comet's color in the palette
+        self.color = bytearray(count)
+        self.trail = bytearray(count)
+        # Milliseconds left resting at an end
+        self.resting = array('l', [0] * count)
+        # Each pixel's r, g, b added up over the comets
+        self.sums = array('H', [0] * (num_pixels * 3))
+
+        # Spread out, alternately heading up and down, each one a palette
+        # color further along
+        for i in range(count):
+            self.position[i] = (i * num_pixels // count) << 16
+            self.color[i] = i
+            self.trail[i] = trail
+
+    def set_speed(self, step, turn):
+        """ Move a pixel every step milliseconds, a little faster for every
+        other comet, and rest turn milliseconds at the ends
+        """
+
+        self.turn = turn
+        base = _ONE // max(step, 1)
+        for i in range(self.count):
+            speed = base * (4 + i % 3) >> 2
+            if self.velocity[i] < 0 or (self.velocity[i] == 0 and i & 1):
+                speed = -speed
+            self.velocity[i] = speed
+
+    def move(self, elapsed):
+        """ Move every comet on by elapsed milliseconds. Returns the
+        milliseconds until one of them next reaches another pixel.
+        """
+
+        position = self.position
+        velocity = self.velocity
+        resting = self.resting
+        end = self.end
+        wait = 1000
+        for i in range(self.count):
+            t = elapsed
+            rest = resting[i]
+            if rest:
+                if rest > t:
+                    resting[i] = rest - t
+                    if rest - t < wait:
+                        wait = rest - t
+                    continue
+                t -= rest
+                resting[i] = 0
+
+            v = velocity[i]
+            p = position[i] + v * t
+            # Stop at the end, rest there, then head back
+            if p >= end and v > 0:
+                p = end
+                velocity[i] = -v
+                resting[i] = self.turn
+            elif p <= 0 and v < 0:
+                p = 0
+                velocity[i] = -v
+                resting[i] = self.turn
+            position[i] = p
+
+            # Distance to the next pixel the head shows on; see render()
+            v = velocity[i]
+            if resting[i]:
+                left = resting[i]
+            elif v > 0:
+                left = (_ONE - (p & 0xffff) + v - 1) // v
+            else:
+                left = ((p & 0xffff or _ONE) - v - 1) // -v
+            if left < wait:
+                wait = left
+        return max(wait, 1)
+
+    def render(self, pixels, colors):
+        """ Draw every comet into the frame buffer.
+
+        Args:
+            pixels (FrameBuffer): Frame buffer to draw into
+            colors (def): Called with a comet's color index for its color
+        """
+
+        sums = self.sums
+        for i in range(len(sums)):
+            sums[i] = 0
+
+        last = self.num_pixels - 1
+        fade = self.fade
+        both_ways = self.both_ways
+        for i in range(self.count):
+            color = colors(self.color[i])
+            r = (color >> 16) & 0xff
+            g = (color >> 8) & 0xff
+            b = color & 0xff
+            # The head is on the last pixel it reached, so it moves on a
+            # whole pixel at a time either way
+            if self.velocity[i] > 0:
+                head = self.position[i] >> 16
+                behind = -1
+            else:
+                head = (self.position[i] + _ONE - 1) >> 16
+                behind = 1
+
+            # The head, then the trail fading away from it
+            level = 256
+            k = 0
+            while k <= self.trail[i]:
+                pixel = head + behind * k
+                if 0 <= pixel <= last:
+                    offset = pixel * 3
+                    sums[offset] += r * level >> 8
+                    sums[offset + 1] += g * level >> 8
+                    sums[offset + 2] += b * level >> 8
+                pixel = head - behind * k
+                if k and both_ways and 0 <= pixel <= last:
+                    offset = pixel * 3
+                    sums[offset] += r * level >> 8
+                    sums[offset + 1] += g * level >> 8
+                    sums[offset + 2] += b * level >> 8
+                level = level * fade >> 8
+                k += 1
+
+        for pixel in range(self.num_pixels):
+            offset = pixel * 3
+            pixels[pixel] = (min(sums[offset], 255) << 16) \
+                | (min(sums[offset + 1], 255) << 8) \
+                | min(sums[offset + 2], 255)
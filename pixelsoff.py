@@ -20,18 +20,46 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+from ticks import ticks_diff
+
 class PixelsOff:
 
-    def __init__(self, pixels):
+    def __init__(self, pixels, idle_timeout=0, idle_callback=None):
+        """
+        Args:
+            pixels (FrameBuffer): Frame buffer to draw into
+            idle_timeout (int): Milliseconds of being off before calling
+            idle_callback
+            idle_callback (def): Callback function to be called once the
+            pixels have been off for idle_timeout, like to put the board to
+            sleep.
+        """
         self.pixels = pixels
+        self.idle_timeout = idle_timeout
+        self.idle_callback = idle_callback
 
     def begin(self):
         self.pixels.fill(0)
-        self.pixels.show()
+        self.off_since = -1
 
-    def update(self):
+    def tapped(self, pin):
         pass
 
+    def update(self, now):
+        if not self.idle_callback:
+            # Nothing changes, so there is no need to be woken up often
+            return 1000
+
+        if self.off_since < 0:
+            self.off_since = now
+        wait = self.idle_timeout - ticks_diff(now, self.off_since)
+        if wait > 0:
+            return wait
+
+        # Start the timeout over for when the board is back awake
+        self.off_since = now
+        self.idle_callback()
+        return self.idle_timeout
+
     def end(self):
         pass
-        
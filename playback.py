@@ -0,0 +1,140 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from micropython import const
+
+# Light show file format, all numbers little endian:
+#
+#   header: b"RTLS", number of pixels (2 bytes)
+#   frames: delay in milliseconds (2 bytes), count (2 bytes), then either
+#       count changed pixels, each an index (2 bytes) and r, g, b, or, when
+#       count is KEYFRAME, r, g, b for every pixel
+#
+# The first frame is a keyframe so the show can loop back to it.
+MAGIC = b"RTLS"
+HEADER_SIZE = const(6)
+KEYFRAME = const(0xffff)
+
+class Playback:
+    """ Plays a light show baked on the host by host/bake.py. The file is
+    streamed from flash a block at a time into one buffer, so a frame costs no
+    more than copying its changed pixels, and the RAM used is the same however
+    long the show is.
+    """
+
+    def __init__(self, pixels, path, block_size=256):
+        """
+        Args:
+            pixels (FrameBuffer): Frame buffer to draw into
+            path (str): Light show file to play
+            block_size (int): Bytes read from the file at a time
+        """
+
+        self.pixels = pixels
+        self.num_pixels = len(pixels)
+        self.path = path
+        self.block_size = block_size
+        self.file = None
+
+    def begin(self):
+        print("playback: begin " + self.path)
+        self.pixels.fill(0)
+        self.buf = bytearray(self.block_size)
+        self.pos = 0
+        self.end_pos = 0
+
+        try:
+            self.file = open(self.path, "rb")
+        except OSError:
+            print("playback: no " + self.path)
+            return
+
+        self._fill()
+        if self.end_pos < HEADER_SIZE or self.buf[0:4] != MAGIC:
+            print("playback: not a light show")
+            self._close()
+            return
+        self.pos = 4
+        self.show_pixels = self._u16()
+
+    def update(self, now):
+        if not self.file:
+            return 1000
+
+        if self.pos == self.end_pos and not self._fill():
+            # Loop back around to the first frame
+            self.file.seek(HEADER_SIZE)
+            self._fill()
+
+        delay = self._u16()
+        count = self._u16()
+        pixels = self.pixels
+        if count == KEYFRAME:
+            for i in range(self.show_pixels):
+                color = self._rgb()
+                if i < self.num_pixels:
+                    pixels[i] = color
+        else:
+            for i in range(count):
+                index = self._u16()
+                color = self._rgb()
+                if index < self.num_pixels:
+                    pixels[index] = color
+        return delay
+
+    def tapped(self, pin):
+        pass
+
+    def end(self):
+        print("playback: end")
+        self._close()
+        self.buf = None
+
+    def _close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _fill(self):
+        """ Read the next block of the file. Returns False at the end. """
+        self.end_pos = self.file.readinto(self.buf) or 0
+        self.pos = 0
+        return self.end_pos > 0
+
+    def _byte(self):
+        if self.pos == self.end_pos:
+            self._fill()
+        value = self.buf[self.pos]
+        self.pos += 1
+        return value
+
+    def _u16(self):
+        return self._byte() | (self._byte() << 8)
+
+    def _rgb(self):
+        # Straight from the buffer unless the color spans two blocks
+        pos = self.pos
+        if pos + 3 <= self.end_pos:
+            buf = self.buf
+            self.pos = pos + 3
+            return (buf[pos] << 16) | (buf[pos + 1] << 8) | buf[pos + 2]
+        return (self._byte() << 16) | (self._byte() << 8) | self._byte()
@@ -0,0 +1,178 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import gc
+from array import array
+from micropython import const
+
+from ticks import ticks_ms, ticks_diff
+
+# Stages of a frame, in the order they happen
+INPUT = const(0)
+UPDATE = const(1)
+SHOW = const(2)
+GC = const(3)
+_STAGES = const(4)
+
+# Each frame in the ring: ticks it was updated at (low 16 bits), milliseconds
+# in each stage, then gc.mem_free() at the end. The inputs are read more often
+# than most animations are updated, so a frame's input time adds up every read
+# since the frame before.
+_FIELDS = const(6)
+
+# Frame times counted per animation, a millisecond apart; the last one counts
+# everything longer
+_BUCKETS = const(32)
+
+class Profiler:
+    """ Times each stage of the main loop on the board itself: reading the
+    inputs, updating the animation, showing the frame and collecting garbage.
+    The last frames are kept in a ring buffer along with how much memory was
+    free, and each animation's frame times are counted so their min, average,
+    99th percentile and max can be printed over the serial console.
+
+    Nothing is allocated or timed until it is enabled; until then it costs
+    the main loop one attribute check per frame. ravetie.py only makes one,
+    and imports this module, once profiling is switched on.
+    """
+
+    # The stages, so the scheduler and the main loop can mark them without
+    # importing this module
+    INPUT = INPUT
+    UPDATE = UPDATE
+    SHOW = SHOW
+    GC = GC
+
+    def __init__(self, num_animations, size=64):
+        """
+        Args:
+            num_animations (int): Number of animations to keep times for
+            size (int): Number of frames kept in the ring buffer
+        """
+
+        self.num_animations = num_animations
+        self.size = size
+        self.enabled = False
+
+    def enable(self):
+        print("profiler: on")
+        self.ring = array('H', [0] * (self.size * _FIELDS))
+        # Next frame's place in the ring, and how many frames it holds
+        self.head = 0
+        self.count = 0
+        self.histograms = array('H', [0] * (self.num_animations * _BUCKETS))
+        self.frames = array('l', [0] * self.num_animations)
+        self.totals = array('l', [0] * self.num_animations)
+        self.longest = array('H', [0] * self.num_animations)
+        self.last = 0
+        # Whether the frame at head has had its stages cleared
+        self.started = False
+        self.enabled = True
+
+    def disable(self):
+        print("profiler: off")
+        self.enabled = False
+        self.ring = None
+        self.histograms = None
+        self.frames = None
+        self.totals = None
+        self.longest = None
+
+    def start(self, now):
+        """ A pass of the main loop starts at now. Passes add to the same
+        frame until it is ended.
+        """
+        offset = self.head * _FIELDS
+        ring = self.ring
+        ring[offset] = now & 0xffff
+        if not self.started:
+            for stage in range(_STAGES):
+                ring[offset + 1 + stage] = 0
+            self.started = True
+        self.last = now
+
+    def mark(self, stage):
+        """ The stage has just finished """
+        now = ticks_ms()
+        index = self.head * _FIELDS + 1 + stage
+        self.ring[index] = min(self.ring[index] + ticks_diff(now, self.last),
+                               0xffff)
+        self.last = now
+
+    def end(self, animation):
+        """ The frame drawn by the animation, counted by its index, is done """
+        offset = self.head * _FIELDS
+        ring = self.ring
+        ring[offset + 1 + _STAGES] = min(gc.mem_free(), 0xffff)
+        self.head = (self.head + 1) % self.size
+        self.started = False
+        if self.count < self.size:
+            self.count += 1
+
+        # What the frame cost: the animation's update and showing it
+        ms = ring[offset + 1 + UPDATE] + ring[offset + 1 + SHOW]
+        self.histograms[animation * _BUCKETS + min(ms, _BUCKETS - 1)] += 1
+        if ms > self.longest[animation]:
+            self.longest[animation] = ms
+        self.frames[animation] += 1
+        self.totals[animation] += ms
+        # Halve the counts long before they would overflow
+        if self.frames[animation] >= 0xfff0:
+            self.frames[animation] >>= 1
+            self.totals[animation] >>= 1
+            for i in range(animation * _BUCKETS, (animation + 1) * _BUCKETS):
+                self.histograms[i] >>= 1
+
+    def dump(self, names=None):
+        """ Print the frame times of each animation and the last frames """
+
+        print("profiler: frame ms (update + show)")
+        print("animation         frames  min  avg  p99  max")
+        for animation in range(self.num_animations):
+            frames = self.frames[animation]
+            if not frames:
+                continue
+            name = names(animation) if names else str(animation)
+            base = animation * _BUCKETS
+            print("{:<3} {:<13} {:>6} {:>4} {:>4} {:>4} {:>4}".format(
+                animation, name, frames, self._percentile(base, frames, 0),
+                self.totals[animation] // frames,
+                self._percentile(base, frames, 99),
+                self.longest[animation]))
+
+        print("profiler: last {} frames".format(self.count))
+        print("ticks  input update show gc mem_free")
+        for i in range(self.count):
+            offset = ((self.head - self.count + i) % self.size) * _FIELDS
+            print("{:>5} {:>6} {:>6} {:>4} {:>2} {:>8}".format(
+                *self.ring[offset:offset + _FIELDS]))
+
+    def _percentile(self, base, frames, percent):
+        """ Frame time in ms that percent of the frames are within """
+        wanted = frames * percent // 100
+        seen = 0
+        for bucket in range(_BUCKETS):
+            seen += self.histograms[base + bucket]
+            if seen > wanted:
+                return bucket
+        return _BUCKETS - 1
@@ -0,0 +1,349 @@
+# Rave-Tie main program, run by code.py
+# (c) 2022 Garrett Miller
+# Heavily based on work that is copyright (c) 2019 Gary Fong
+# 
+# The MIT License (MIT)
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import gc
+import sys
+from micropython import const
+
+from neopixel import NeoPixel
+from board import D4, D5, A1, A2, A3, A4, A5, A6, A7
+
+from button import Button
+from tap import Tap
+from framebuffer import FrameBuffer
+from transition import Transition
+from scheduler import Scheduler
+from ticks import ticks_ms
+from microcontroller import nvm
+from state import State
+
+from registry import Registry
+# Imported at boot so the palettes and gradients are shared by every
+# animation rather than unloaded along with one
+import palette
+
+print("gc: " + str(gc.isenabled()))
+
+active_led_animation = 0
+led_animation = None
+
+# Animation to go back to when woken up from sleep
+resume_led_animation = 1
+
+def next_led_animation(jump_to_animation = -1, now = None):
+    global led_animation, active_led_animation, resume_led_animation
+
+    # Called back from the input read, which has read the ticks already
+    if now is None:
+        now = scheduler.now
+    if active_led_animation != 0:
+        resume_led_animation = active_led_animation
+    # A fade that is still going is cut short, so no more than two
+    # animations ever play at once
+    if transition.fading:
+        finish_transition(now)
+    # The old animation plays on while the new one fades in
+    outgoing = led_animation
+    led_animation = None
+    if beat_tracker is not None:
+        beat_tracker.end()
+
+    # Determine the next animation
+    if jump_to_animation == -1:
+        active_led_animation = (active_led_animation + 1) % len(led_animations)
+    else:
+        active_led_animation = jump_to_animation
+
+    # Begin the new animation
+    start_led_animation(now, outgoing)
+
+def start_led_animation(now, outgoing=None):
+    global led_animation
+    fade = outgoing is not None
+    led_animation = led_animations.load(
+        active_led_animation, transition.spare if fade else transition.frame)
+    print("active led animation ", led_animations.name(active_led_animation))
+    outgoing = begin_beside(led_animation.begin, outgoing)
+    # Back to the colors and speeds it had last time
+    if hasattr(led_animation, "restore"):
+        led_animation.restore(state.settings(active_led_animation))
+    state.set_animation(active_led_animation, now)
+    # Animations that can keep time with the music listen for the beat. The
+    # others may need the microphone themselves.
+    if hasattr(led_animation, "beat"):
+        outgoing = begin_beside(new_beat_tracker().begin, outgoing)
+    else:
+        drop_beat_tracker()
+    if fade:
+        transition.begin(outgoing, led_animation, now)
+        scheduler.set_animation(transition)
+    else:
+        scheduler.set_animation(led_animation)
+
+def begin_beside(begin, outgoing):
+    """ Call begin while the outgoing animation is still playing. If it has
+    pins that begin needs, like the microphone, it is ended first and its
+    last frame fades out instead. Returns the outgoing animation, or None
+    once it has ended.
+    """
+    try:
+        begin()
+    except ValueError:
+        if outgoing is None:
+            raise
+        outgoing.end()
+        begin()
+        return None
+    return outgoing
+
+def finish_transition(now):
+    # The old animation has faded out: end it, drop its module and carry on
+    # with the new one by itself
+    wait = transition.finish(now)
+    led_animations.release()
+    scheduler.set_animation(led_animation, wait)
+
+def button_a_pressed():
+    next_led_animation()
+
+def button_a_double_pressed():
+    # Back to the previous animation
+    next_led_animation((active_led_animation - 1) % len(led_animations))
+
+def button_a_long_pressed():
+    # Lights out
+    next_led_animation(0)
+
+brightness_levels = [0.1, 0.25, 0.5, 1.0]
+brightness_level = 2
+def button_b_pressed():
+    global brightness_level
+    brightness_level = (brightness_level + 1) % len(brightness_levels)
+    transition.brightness = brightness_levels[brightness_level]
+    state.set_brightness(brightness_level, scheduler.now)
+
+# Profile the main loop until button B is held again, then print what it
+# found. Switched between frames so no frame is half timed.
+profile_requested = False
+def button_b_long_pressed():
+    global profile_requested
+    profile_requested = True
+
+# Made, and its module imported, only while profiling, so it takes no heap
+# the rest of the time
+profiler = None
+def toggle_profiler():
+    global profiler
+    if profiler is None:
+        from profiler import Profiler
+        profiler = Profiler(len(animations))
+        profiler.enable()
+        scheduler.profiler = profiler
+    else:
+        profiler.dump(led_animations.name)
+        profiler.disable()
+        scheduler.profiler = None
+        profiler = None
+        del sys.modules["profiler"]
+        gc.collect()
+
+# After the pixels have been off for a while, sleep until button A is pressed
+IDLE_TIMEOUT = const(60000)
+sleep_requested = False
+def idle_timed_out():
+    global sleep_requested
+    sleep_requested = True
+
+def sleep_until_button_a():
+    global buttonA
+    # The alarm that wakes the board needs button A's pin to itself
+    buttonA.deinit()
+    # Whatever happens while asleep, wake up looking the same
+    state.save()
+    idle.sleep(resume_led_animation)
+    buttonA = new_button_a()
+    # The ticks have moved on while asleep
+    next_led_animation(resume_led_animation, ticks_ms())
+
+def new_button_a():
+    return Button(D4, button_a_pressed,
+                  long_press_callback=button_a_long_pressed,
+                  double_press_callback=button_a_double_pressed)
+
+def pad_tapped(pin):
+    led_animation.tapped(pin)
+    if hasattr(led_animation, "settings"):
+        state.set_settings(active_led_animation, led_animation.settings(),
+                           scheduler.now)
+
+# Listens for the beat while the animation playing can follow it. Made, and
+# its modules imported, only once such an animation plays, and dropped once
+# one that can't does.
+beat_tracker = None
+beat_tracker_modules = []
+
+def new_beat_tracker():
+    global beat_tracker, beat_tracker_modules
+    if beat_tracker is None:
+        before = set(sys.modules)
+        from beattracker import BeatTracker
+        beat_tracker = BeatTracker(beat_found)
+        beat_tracker_modules \
+            = [name for name in sys.modules if name not in before]
+    return beat_tracker
+
+def drop_beat_tracker():
+    global beat_tracker, beat_tracker_modules
+    if beat_tracker is None:
+        return
+    beat_tracker = None
+    for name in beat_tracker_modules:
+        if name in sys.modules:
+            del sys.modules[name]
+    beat_tracker_modules = []
+    gc.collect()
+
+def beat_found(now, period):
+    # Passed on straight away so the animation moves on the beat
+    led_animation.beat(now, period)
+    scheduler.wake(now)
+
+def read_inputs(now):
+    buttonA.read(now)
+    buttonB.read(now)
+    pads.read()
+    if beat_tracker is not None and beat_tracker.listening:
+        beat_tracker.read(now)
+    state.save_if_due(now)
+
+#Arguments are data port, number of LEDs, brightness, auto-write
+pixels = NeoPixel(A3, 6, brightness=1.0, auto_write=False)
+
+# Only the animation that is playing is imported. Each entry is the module,
+# the class and its arguments after the frame buffer.
+animations = [
+    ("pixelsoff", "PixelsOff", (IDLE_TIMEOUT, idle_timed_out)),
+    ("vumeter", "VuMeter", (100, 400)),
+    ("spectrum", "Spectrum", (100, 400)),
+    # Effects described by a few bytes of data in effects.py
+    ("effect", "Effect", ("stairs",)),
+    ("effect", "Effect", ("comets",)),
+    ("effect", "Effect", ("sparkle",)),
+    ("effect", "Effect", ("chase",)),
+    ("effect", "Effect", ("breathe",)),
+    ("twinkle", "Twinkle", ()),
+    # Twinkle with the VU meter over it, each at its own rate
+    ("layers", "Layers", ((
+        ("twinkle", "Twinkle", (), "add"),
+        ("vumeter", "VuMeter", (100, 400), "alpha", 192)),)),
+    # Baked by compile.sh with host/bake.py
+    ("playback", "Playback", ("shows/twinkle.bin",)),
+    # Frames sent from a computer by host/stream_send.py
+    ("stream", "Stream", ())
+]
+
+# Pick up where it was left before being switched off, before the first
+# frame goes out
+state = State(nvm, len(animations), animation=active_led_animation,
+              brightness=brightness_level)
+if state.valid:
+    active_led_animation = state.animation
+    if state.brightness < len(brightness_levels):
+        brightness_level = state.brightness
+
+# The animations draw into a frame buffer, which pushes changes out to the
+# pixels once per frame. It takes care of the brightness, so the pixels stay
+# at full brightness. There are two so that the next animation can fade in
+# over the last, each drawing into its own.
+frames = tuple(
+    FrameBuffer(pixels, brightness=brightness_levels[brightness_level],
+                gamma=2.2)
+    for i in range(2))
+transition = Transition(frames, duration=500)
+
+led_animations = Registry(frames[0], animations)
+
+# Light sleep; pass deep=True for deep sleep, which restarts code.py on wake.
+# Only where the firmware has the alarm module to sleep with: the CPX's
+# doesn't, so it doesn't spend heap on it.
+try:
+    import alarm
+except ImportError:
+    alarm = None
+idle = None
+if alarm is not None:
+    from idle import Idle
+    idle = Idle(D4)
+    # Woken from deep sleep: carry on with the animation that was playing
+    if idle.resume_animation() >= 0:
+        active_led_animation = idle.resume_animation()
+        idle.wait_for_release()
+
+# Button A: press for the next animation, double press for the previous one,
+# hold to turn the lights off. Button B: press to step the brightness, hold
+# to start or stop profiling.
+buttonA = new_button_a()
+buttonB = Button(D5, button_b_pressed,
+                 long_press_callback=button_b_long_pressed)
+
+# Every touch pad except A3, which drives the pixels. The pads are calibrated
+# once here and taps are passed on to whichever animation is active.
+pads = Tap([A1, A2, A4, A5, A6, A7], pad_tapped)
+
+# Read the button and pads every 10 milliseconds
+scheduler = Scheduler(10, read_inputs)
+
+# Nothing in the loop allocates (see host/alloc_check.py), so a collection is
+# only needed when the heap runs low, such as after switching animations. It
+# happens after the frame has gone out, in time the loop would otherwise sleep.
+GC_THRESHOLD = const(4096)
+
+def main():
+    """ Start the animation and run the main loop, for ever """
+    global profile_requested, sleep_requested
+
+    pixels.fill(0)
+    pixels.show()
+
+    start_led_animation(scheduler.now)
+
+    while True:
+        if scheduler.run_due():
+            transition.show()
+            if profiler is not None:
+                profiler.mark(profiler.SHOW)
+            if gc.mem_free() < GC_THRESHOLD:
+                gc.collect()
+            if profiler is not None:
+                profiler.mark(profiler.GC)
+                profiler.end(active_led_animation)
+        if transition.finished:
+            finish_transition(scheduler.now)
+        if profile_requested:
+            profile_requested = False
+            toggle_profiler()
+        if sleep_requested:
+            sleep_requested = False
+            if idle is not None:
+                sleep_until_button_a()
+        scheduler.sleep()
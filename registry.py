@@ -0,0 +1,101 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import gc
+import sys
+
+class Registry:
+    """ The animations by module name. Only the playing animation's module is
+    imported and only its object exists, along with the one before it while
+    it fades out; once it has, its module is dropped and collected. This
+    keeps boot quick and leaves the heap to one or two animations at a time,
+    however many there are to choose from.
+    """
+
+    def __init__(self, pixels, animations):
+        """
+        Args:
+            pixels (FrameBuffer): Frame buffer the animations draw into
+            animations (list): For each animation, a tuple of module name,
+            class name and any constructor arguments after the pixels
+        """
+
+        self.pixels = pixels
+        self.animations = animations
+        # Modules imported by the animation loaded last, and by the one
+        # before it
+        self.modules = []
+        self.previous = []
+
+    def __len__(self):
+        return len(self.animations)
+
+    def name(self, index):
+        """ Class name, and its first argument if that names what it plays,
+        like the effect's program
+        """
+        _, class_name, args = self.animations[index]
+        if args and isinstance(args[0], str):
+            return class_name + " " + args[0]
+        return class_name
+
+    def load(self, index, pixels=None):
+        """ Import the animation's module and return a new instance of it.
+        The animation loaded last stays loaded until release(), so that it
+        can fade out; any loaded before that is unloaded first, so nothing
+        else may still refer to it.
+
+        Args:
+            index (int): Index of the animation
+            pixels (FrameBuffer): Frame buffer for it to draw into, if not
+            the registry's
+        """
+
+        self.release()
+        self.previous = self.modules
+        module_name, class_name, args = self.animations[index]
+
+        # Note everything imported along with it, like the module a class
+        # inherits from or the animations of its layers, so all of it can be
+        # dropped again
+        before = set(sys.modules)
+        module = __import__(module_name)
+        if pixels is None:
+            pixels = self.pixels
+        animation = getattr(module, class_name)(pixels, *args)
+        self.modules = [name for name in sys.modules if name not in before]
+        return animation
+
+    def release(self):
+        """ Drop the modules of the animation loaded before the last one """
+        for name in self.previous:
+            if name in sys.modules:
+                del sys.modules[name]
+        self.previous = []
+        gc.collect()
+
+    def unload(self):
+        """ Drop the modules of every animation loaded """
+        self.release()
+        self.previous = self.modules
+        self.modules = []
+        self.release()
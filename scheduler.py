@@ -0,0 +1,119 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from time import sleep
+from ticks import ticks_ms, ticks_add, ticks_diff
+
+class Scheduler:
+    """ Paces the main loop. Inputs are read at a fixed rate and the active
+    animation is updated when its deadline comes up. In between, the board
+    sleeps rather than spinning.
+
+    The ticks are read once each time round and passed on: read_input(now)
+    and the animation's update(now) both get the same millisecond ticks from
+    the ticks module. An animation's update() returns the number of
+    milliseconds until it next needs to be updated. Inputs are read no matter
+    how slowly the animation is running. The ticks run_due() read last are
+    kept in now, so that whatever the inputs set off goes by them too.
+    """
+
+    def __init__(self, input_period, read_input):
+        """
+        Args:
+            input_period (int): Milliseconds between input reads.
+            read_input (def): Callback function to be called with the ticks to
+            read the inputs.
+        """
+
+        self.input_period = input_period
+        self.read_input = read_input
+        self.animation = None
+        self.frames = 0
+        # Profiler timing the input reads and updates, if there is one
+        self.profiler = None
+
+        now = ticks_ms()
+        self.now = now
+        self.next_input = now
+        self.next_frame = now
+
+    def set_animation(self, animation, wait=0):
+        """ Switch to the animation and update it after wait milliseconds,
+        right away by default
+        """
+        self.animation = animation
+        self.next_frame = ticks_add(ticks_ms(), wait)
+
+    def wake(self, now):
+        """ Update the animation right away, such as when an input has
+        changed what it shows
+        """
+        self.next_frame = now
+
+    def run_due(self):
+        """
+        Reads the inputs and updates the animation if they are due. Returns
+        True if the animation was updated.
+        """
+
+        now = ticks_ms()
+        self.now = now
+        profiler = self.profiler
+        if profiler is not None and profiler.enabled:
+            profiler.start(now)
+        else:
+            profiler = None
+
+        if ticks_diff(now, self.next_input) >= 0:
+            self.read_input(now)
+            self.next_input = self._next_deadline(
+                self.next_input, self.input_period, now)
+            if profiler is not None:
+                profiler.mark(profiler.INPUT)
+
+        # The input may have switched the animation, which makes it due now
+        if ticks_diff(now, self.next_frame) < 0:
+            return False
+
+        wait = self.animation.update(now)
+        self.frames += 1
+        if profiler is not None:
+            profiler.mark(profiler.UPDATE)
+        self.next_frame = self._next_deadline(self.next_frame, wait, now)
+        return True
+
+    def sleep(self):
+        """ Sleep until the next input read or animation update is due """
+        now = ticks_ms()
+        delay = min(ticks_diff(self.next_input, now),
+                    ticks_diff(self.next_frame, now))
+        if delay > 0:
+            sleep(delay / 1000)
+
+    def _next_deadline(self, deadline, period, now):
+        """ Keep a steady rate by stepping from the last deadline rather than
+        from now, unless that has fallen behind.
+        """
+        deadline = ticks_add(deadline, period)
+        if ticks_diff(deadline, now) <= 0:
+            deadline = ticks_add(now, period)
+        return deadline
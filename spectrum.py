@@ -0,0 +1,195 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from array import array
+from math import acos, cos, pi, sin, sqrt
+from micropython import const
+
+from vumeter import VuMeter
+from palette import gradient, scale
+from loudness import isqrt
+
+# Fraction bits of the fixed point Goertzel coefficients
+_Q = const(10)
+
+class Spectrum(VuMeter):
+    """ Spectrum analyzer version of the VU meter. Each pixel shows the level
+    of one frequency band, bass on the first pixel and treble on the last.
+    The bands are picked out of each microphone recording by a bank of
+    Goertzel filters running in fixed point, one per pixel, so a frame costs
+    the same every time and needs no floats.
+    """
+
+    def __init__(self, pixels, input_floor, input_ceiling,
+                 low_frequency=150, high_frequency=4000):
+        """
+        Args:
+            pixels (FrameBuffer): Frame buffer to draw into
+            input_floor (int): Band level at which a pixel starts to light
+            input_ceiling (int): Band level above the floor at which a pixel
+            is fully lit
+            low_frequency (int): Center frequency, in Hz, of the first band
+            high_frequency (int): Center frequency, in Hz, of the last band
+        """
+
+        self.low_frequency = low_frequency
+        self.high_frequency = high_frequency
+        # The bands need all of a 10 millisecond window to tell them apart
+        super().__init__(pixels, input_floor, input_ceiling,
+                         latency_budget=10, decimation=1)
+
+    def _build_tables(self):
+        # Indexed by the constrained band level less the floor, giving the
+        # brightness of the band's pixel.
+        self.band_brightness \
+            = bytearray(self.input_ceiling - self.input_floor + 1)
+        for i in range(len(self.band_brightness)):
+            self.band_brightness[i] = int(self._log_scale(
+                self.input_floor + i, self.input_floor, self.input_ceiling,
+                0, 255))
+
+        # Red for the bass through to violet for the treble
+        colors = gradient("rainbow")
+        self.band_colors = array('l', [
+            colors[i * 200 // max(self.num_pixels - 1, 1)]
+            for i in range(self.num_pixels)])
+
+    def begin(self):
+        super().begin()
+
+        num_bands = self.num_pixels
+        n = self.num_samples
+
+        # DFT bin of each band, spaced evenly on a log scale
+        self.bins = array('H', [0] * num_bands)
+        ratio = self.high_frequency / self.low_frequency
+        for band in range(num_bands):
+            frequency = self.low_frequency \
+                * pow(ratio, band / max(num_bands - 1, 1))
+            k = max(int(frequency * n / self.sample_rate + 0.5), 1)
+            if band > 0 and k <= self.bins[band - 1]:
+                k = self.bins[band - 1] + 1
+            self.bins[band] = min(k, n // 2)
+
+        # Twiddle factors: 2cos(w) drives the filter, sin(w) finishes it. The
+        # rounded coefficient moves the band slightly off its bin, so the sine
+        # is taken at the frequency the filter actually picks out.
+        self.coefficients = array('h', [0] * num_bands)
+        self.sines = array('h', [0] * num_bands)
+        largest_gain = 0
+        for band in range(num_bands):
+            w = 2 * pi * self.bins[band] / n
+            self.coefficients[band] = int(round(2 * cos(w) * (1 << _Q)))
+            w = self._band_frequency(band)
+            self.sines[band] = int(round(sin(w) * (1 << _Q)))
+
+            # How far a filter's state can swing for a sample of 1
+            gain = 0
+            for i in range(n):
+                gain += abs(sin((i + 1) * w))
+            largest_gain = max(largest_gain, gain / max(abs(sin(w)), 1e-6))
+
+        # Largest scaled sample that keeps coefficient * state a small int,
+        # with a margin for the rounding of the coefficients. Louder
+        # recordings are scaled down to fit.
+        self.max_scaled_sample \
+            = int((0x3fffffff >> (_Q + 1)) / (largest_gain * 1.25 + 1))
+
+        # Converts a band's magnitude back to the RMS of the raw samples, in
+        # 16 bit fixed point
+        self.band_scale = int(round(2 * sqrt(2) / n * 65536))
+
+        self.scaled_samples = array('h', [0] * n)
+        self.magnitudes = array('H', [0] * num_bands)
+
+    def _band_frequency(self, band):
+        """ Frequency, in radians per sample, the band's filter picks out """
+        return acos(self.coefficients[band] / (2 << _Q))
+
+    def _band_magnitudes(self, values):
+        """ Level of each band in the same units as the VU meter's RMS: a sine
+        wave in the middle of a band gives its RMS. Written to and returned
+        as self.magnitudes.
+        """
+
+        # Remove the DC bias, finding how far the samples swing while at it
+        total = 0
+        lowest = 65535
+        highest = 0
+        for sample in values:
+            total += sample
+            if sample < lowest:
+                lowest = sample
+            if sample > highest:
+                highest = sample
+        mean = total // len(values)
+
+        # Scale loud recordings down just enough to keep the filters in small
+        # ints. Quiet ones keep all of their precision.
+        swing = max(highest - mean, mean - lowest)
+        shift = 0
+        while (swing >> shift) > self.max_scaled_sample:
+            shift += 1
+        scaled = self.scaled_samples
+        for i in range(len(values)):
+            scaled[i] = (values[i] - mean) >> shift
+
+        for band in range(len(self.magnitudes)):
+            coefficient = self.coefficients[band]
+            s1 = 0
+            s2 = 0
+            for x in scaled:
+                s0 = x + ((coefficient * s1) >> _Q) - s2
+                s2 = s1
+                s1 = s0
+
+            # Real and imaginary parts of the band's DFT bin, halved so the
+            # sum of their squares stays a small int
+            re = (s1 - ((coefficient * s2) >> (_Q + 1))) >> 1
+            im = ((self.sines[band] * s2) >> _Q) >> 1
+            magnitude = isqrt(
+                re * re + im * im, abs(re) + abs(im) + 1)
+            self.magnitudes[band] \
+                = min((magnitude * self.band_scale) >> (16 - shift), 0xffff)
+
+        return self.magnitudes
+
+    def update(self, now):
+        self.mic.record(self.samples, len(self.samples))
+        magnitudes = self._band_magnitudes(self.samples)
+
+        for band in range(len(magnitudes)):
+            level = self._constrain(
+                magnitudes[band], self.input_floor, self.input_ceiling) \
+                - self.input_floor
+            brightness = self.band_brightness[level]
+            self.pixels[band] = scale(self.band_colors[band], brightness)
+
+        return self.frame_period
+
+    def end(self):
+        super().end()
+        self.bins = None
+        self.coefficients = None
+        self.sines = None
+        self.scaled_samples = None
+        self.magnitudes = None
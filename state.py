@@ -0,0 +1,157 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from micropython import const
+
+from ticks import ticks_diff
+
+# State record, kept at the start of nvm:
+#
+#   b"RT", version, animation index, brightness level, animation count,
+#   then a settings byte per animation, then a checksum of everything before
+#
+# Settings bytes belong to the animations: see settings() and restore() in
+# Twinkle and Effect.
+MAGIC = b"RT"
+VERSION = const(1)
+_HEADER_SIZE = const(6)
+
+class State:
+    """ What the tie was showing, kept in nvm so it comes back the same after
+    being switched off or browning out.
+
+    Flash wears out after enough writes, and a write holds up the main loop,
+    so changes are only noted as they happen. The record is written once
+    nothing has changed for save_delay milliseconds, so tapping or pressing
+    through a run of settings costs a single write, and not at all if it ends
+    up back where it was.
+    """
+
+    def __init__(self, nvm, num_animations, save_delay=5000, animation=0,
+                 brightness=0):
+        """
+        Args:
+            nvm (ByteArray): microcontroller.nvm, or anything like it
+            num_animations (int): Number of animations to keep settings for
+            save_delay (int): Milliseconds without a change before the
+            record is written
+            animation (int): Animation index to start from if there is no
+            record in nvm, so the first one written has it
+            brightness (int): Brightness level to start from if there is no
+            record in nvm
+        """
+
+        self.nvm = nvm
+        self.save_delay = save_delay
+        self.record = bytearray(_HEADER_SIZE + num_animations + 1)
+        self.record[0:2] = MAGIC
+        self.record[2] = VERSION
+        self.record[3] = animation
+        self.record[4] = brightness
+        self.record[5] = num_animations
+        # Made once so a write doesn't allocate a slice
+        self.span = slice(0, len(self.record))
+        # Ticks of the last change not yet written, -1 if there is none
+        self.changed_at = -1
+        self.writes = 0
+        self.valid = self._read()
+
+    @property
+    def animation(self):
+        return self.record[3]
+
+    @property
+    def brightness(self):
+        return self.record[4]
+
+    def settings(self, animation):
+        return self.record[_HEADER_SIZE + animation]
+
+    def set_animation(self, animation, now):
+        self._set(3, animation, now)
+
+    def set_brightness(self, brightness, now):
+        self._set(4, brightness, now)
+
+    def set_settings(self, animation, settings, now):
+        self._set(_HEADER_SIZE + animation, settings, now)
+
+    def save_if_due(self, now):
+        """ Write the record if it changed and has stayed the same for long
+        enough. Returns True if it was written.
+        """
+
+        if self.changed_at < 0 \
+           or ticks_diff(now, self.changed_at) < self.save_delay:
+            return False
+        return self.save()
+
+    def save(self):
+        """ Write the record now if it differs from what is in nvm """
+        self.changed_at = -1
+        record = self.record
+        record[-1] = self._checksum()
+        nvm = self.nvm
+        for i in range(len(record)):
+            if nvm[i] != record[i]:
+                break
+        else:
+            return False
+        nvm[self.span] = record
+        self.writes += 1
+        return True
+
+    def _set(self, index, value, now):
+        if self.record[index] != value:
+            self.record[index] = value
+            # Ticks are never negative, so this can't be taken for -1
+            self.changed_at = now
+
+    def _checksum(self):
+        record = self.record
+        total = 0
+        for i in range(len(record) - 1):
+            total += record[i]
+        return total & 0xff
+
+    def _read(self):
+        """ Load the record from nvm. Returns False, keeping the defaults, if
+        there isn't a whole one there from this version and this many
+        animations.
+        """
+
+        nvm = self.nvm
+        record = self.record
+        if len(nvm) < len(record):
+            return False
+        for i in range(_HEADER_SIZE):
+            if i != 3 and i != 4 and nvm[i] != record[i]:
+                return False
+        saved = nvm[self.span]
+        total = 0
+        for i in range(len(saved) - 1):
+            total += saved[i]
+        if total & 0xff != saved[-1]:
+            return False
+        record[:] = saved
+        return True
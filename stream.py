@@ -0,0 +1,170 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from micropython import const
+
+try:
+    from usb_cdc import data as serial
+except ImportError:
+    serial = None
+
+# Stream frame format, numbers little endian:
+#
+#   b"\xa5\x5a", sequence number (2 bytes), length (2 bytes), then length
+#   bytes of r, g, b for every pixel
+#
+# The sequence number goes up by one for each frame sent and wraps round.
+# Frames are only accepted when their length matches the strip.
+SYNC = b"\xa5\x5a"
+HEADER_SIZE = const(6)
+
+class Stream:
+    """ Shows frames rendered on a computer and sent over the USB data port,
+    for effects too much for the CPX to work out itself. Each frame is read
+    whole into a buffer made at the start and copied into the frame buffer in
+    one go.
+
+    Only the newest frame is worth showing. A frame is dropped when a whole
+    newer frame is already waiting behind it, or when its sequence number is
+    not newer than the last one shown. The data port has to be turned on in
+    boot.py; host/stream_send.py sends the frames.
+    """
+
+    def __init__(self, pixels, poll_period=5):
+        """
+        Args:
+            pixels (FrameBuffer): Frame buffer to draw into
+            poll_period (int): Milliseconds between looks at the data port
+        """
+
+        self.pixels = pixels
+        self.num_pixels = len(pixels)
+        self.poll_period = poll_period
+
+    def begin(self):
+        print("stream: begin")
+        self.pixels.fill(0)
+        self.serial = serial
+        if serial is None:
+            print("stream: no usb_cdc.data, see boot.py")
+            return
+        # Never wait for bytes that haven't arrived
+        serial.timeout = 0
+        serial.reset_input_buffer()
+
+        self.byte = bytearray(1)
+        self.header = bytearray(HEADER_SIZE - len(SYNC))
+        self.frame = bytearray(self.num_pixels * 3)
+        # Header of the frame being received, if it is waiting on the rest
+        self.have_header = False
+        # How many bytes of SYNC have been read while looking for a header
+        self.synced = 0
+        self.sequence = 0
+        # Sequence number of the last frame received in order
+        self.last_sequence = -1
+        self.shown = 0
+        self.dropped = 0
+        self.lost = 0
+        self.bad = 0
+
+    def update(self, now):
+        serial = self.serial
+        if serial is None:
+            return 1000
+
+        size = len(self.frame)
+        while self.have_header or self._read_header():
+            waiting = serial.in_waiting
+            if waiting < size:
+                break
+            serial.readinto(self.frame)
+            self.have_header = False
+
+            # Skip it if it came out of order, or if there is a whole newer
+            # frame behind it already
+            sequence = self.sequence
+            if not self._newer(sequence):
+                self.dropped += 1
+                continue
+            if self.last_sequence >= 0:
+                self.lost += ((sequence - self.last_sequence) & 0xffff) - 1
+            self.last_sequence = sequence
+            if waiting >= size + HEADER_SIZE + size:
+                self.dropped += 1
+                continue
+
+            self.pixels.blit(self.frame)
+            self.shown += 1
+        return self.poll_period
+
+    def tapped(self, pin):
+        pass
+
+    def end(self):
+        print("stream: end")
+        if self.serial is not None:
+            print("stream: {} shown, {} dropped, {} lost, {} bad".format(
+                self.shown, self.dropped, self.lost, self.bad))
+        self.serial = None
+        self.byte = None
+        self.header = None
+        self.frame = None
+
+    def _newer(self, sequence):
+        """ Whether sequence comes after the last frame received, allowing
+        for it wrapping round
+        """
+
+        if self.last_sequence < 0:
+            return True
+        return 0 < ((sequence - self.last_sequence) & 0xffff) < 0x8000
+
+    def _read_header(self):
+        """ Find the next frame's header in what has arrived. Returns True
+        once one is read.
+        """
+
+        serial = self.serial
+        byte = self.byte
+        header = self.header
+        while serial.in_waiting >= HEADER_SIZE - self.synced:
+            serial.readinto(byte)
+            if not self.synced:
+                if byte[0] == SYNC[0]:
+                    self.synced = 1
+                continue
+            if byte[0] != SYNC[1]:
+                # It may be the start of the sync itself
+                self.synced = 1 if byte[0] == SYNC[0] else 0
+                continue
+            self.synced = 0
+            serial.readinto(header)
+            if header[2] | (header[3] << 8) != len(self.frame):
+                # Not for this strip, or not really a header; look for the
+                # next one
+                self.bad += 1
+                continue
+            self.sequence = header[0] | (header[1] << 8)
+            self.have_header = True
+            return True
+        return False
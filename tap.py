@@ -20,6 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+from array import array
 from touchio import TouchIn
 
 class Tap:
@@ -35,12 +36,16 @@ class Tap:
         """
 
         self.tap_event_callback = tap_event_callback
-        self.pads = [(id(pin), pin, TouchIn(pin)) for pin in pins]
-        self.activeTaps = {} # key=pinId, value=[pin, counter]
+        self.pins = pins
+        self.pads = [TouchIn(pin) for pin in pins]
+        # How many reads each pad has been continually touched for. Kept
+        # from the start so that reading the pads doesn't allocate.
+        self.touch_counts = array('H', [0] * len(pins))
+        self.anythingTouched = False
 
     def deinit(self):
         for pad in self.pads:
-            pad[2].deinit()
+            pad.deinit()
         self.pads = None
 
     def read(self):
@@ -49,39 +54,38 @@ class Tap:
         """
 
         anythingTapped = False
+        counts = self.touch_counts
 
         # Loop through the pads to find any touches
-        for pinId, pin, touchIn in self.pads:
+        for i in range(len(self.pads)):
 
             # If something was touched, start recording how many
             # times a pad has been continually being touched.
             # We'll want the one pad that has the greatest value.
-            if touchIn.value:
+            if self.pads[i].value:
                 #print("touched")
                 anythingTapped = True
 
-                # Add the pin, counter if the pin doesn't yet exist
-                if pinId not in self.activeTaps:
-                    self.activeTaps[pinId] = [pin, 0]
-
                 # Increment the counter
-                self.activeTaps[pinId][1] += 1
+                if counts[i] < 0xffff:
+                    counts[i] += 1
 
         # If nothing was touched, check if something had been
         # touched. If so, then return the pin of the pad that
         # had the greatest amount of touches.
-        if not anythingTapped:
-            if len(self.activeTaps) > 0:
-                candidateTap = None # [pin, counter]
-                for pinId, pinAndCounter in self.activeTaps.items():
-                    if candidateTap is None:
-                        candidateTap = pinAndCounter
-                    elif candidateTap[1] < pinAndCounter[1]:
-                        candidateTap = pinAndCounter
+        if anythingTapped:
+            self.anythingTouched = True
+        elif self.anythingTouched:
+            candidateTap = 0
+            for i in range(1, len(counts)):
+                if counts[candidateTap] < counts[i]:
+                    candidateTap = i
 
-                # Reset active taps to nothing
-                self.activeTaps = {}
+            # Reset active taps to nothing
+            for i in range(len(counts)):
+                counts[i] = 0
 
-                # Notify the listener that a tap has occurred
-                #print("tapped")
-                self.tap_event_callback(candidateTap[0])
+            # Notify the listener that a tap has occurred
+            #print("tapped")
+            self.anythingTouched = False
+            self.tap_event_callback(self.pins[candidateTap])
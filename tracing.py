@@ -0,0 +1,305 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import sys
+from micropython import const
+
+# Trace format, numbers little endian:
+#
+#   header: b"RTTR", version, nvm length (2 bytes), then nvm as it was when
+#       recording started, so the saved state is restored the same way
+#   records: a tag, then what the tag says:
+#       TICKS_DELTA: milliseconds since the last ticks (1 byte)
+#       TICKS: ticks (4 bytes)
+#       TOUCH | value: pad number (1 byte)
+#       PIN | value: pin number (1 byte)
+#       KEY_NONE: key scanner number (1 byte)
+#       KEY | pressed: key scanner number (1 byte), key number (1 byte),
+#           timestamp (4 bytes)
+#       AUDIO: sample count (2 bytes), then the samples (2 bytes each)
+#       RANDOM: the number picked (4 bytes)
+#
+# Pads, pins, key scanners are numbered in the order they were made.
+MAGIC = b"RTTR"
+VERSION = const(1)
+TICKS_DELTA = const(0x01)
+TICKS = const(0x02)
+TOUCH = const(0x10)
+PIN = const(0x20)
+KEY_NONE = const(0x30)
+KEY = const(0x32)
+AUDIO = const(0x40)
+RANDOM = const(0x50)
+
+# Modules this one stands in for while recording
+MODULES = ("supervisor", "touchio", "audiobusio", "keypad", "digitalio",
+           "random")
+
+_recorder = None
+
+class Recorder:
+    """ Writes the records of a trace to a stream. The buffers are made once,
+    so recording doesn't allocate in the main loop.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buf = bytearray(8)
+        view = memoryview(self.buf)
+        # A view of the first n bytes of buf for each n
+        self.views = [view[0:n] for n in range(len(self.buf) + 1)]
+        self.last_ticks = -1
+        self.counts = {}
+
+    def number(self, kind):
+        """ Next number for a pad, pin or key scanner """
+        number = self.counts.get(kind, 0)
+        self.counts[kind] = number + 1
+        return number
+
+    def header(self, nvm):
+        stream = self.stream
+        stream.write(MAGIC)
+        size = len(nvm) if nvm is not None else 0
+        buf = self.buf
+        buf[0] = VERSION
+        buf[1] = size & 0xff
+        buf[2] = size >> 8
+        stream.write(self.views[3])
+        if size:
+            stream.write(nvm[0:size])
+
+    def ticks(self, ticks):
+        buf = self.buf
+        delta = ticks - self.last_ticks
+        if self.last_ticks >= 0 and 0 <= delta <= 0xff:
+            buf[0] = TICKS_DELTA
+            buf[1] = delta
+            self.stream.write(self.views[2])
+        else:
+            buf[0] = TICKS
+            self._put32(1, ticks)
+            self.stream.write(self.views[5])
+        self.last_ticks = ticks
+
+    def flag(self, tag, number, value):
+        buf = self.buf
+        buf[0] = tag | (1 if value else 0)
+        buf[1] = number
+        self.stream.write(self.views[2])
+
+    def key(self, number, event):
+        buf = self.buf
+        buf[0] = KEY | (1 if event.pressed else 0)
+        buf[1] = number
+        buf[2] = event.key_number
+        self._put32(3, event.timestamp)
+        self.stream.write(self.views[7])
+
+    def audio(self, samples, count):
+        buf = self.buf
+        buf[0] = AUDIO
+        buf[1] = count & 0xff
+        buf[2] = count >> 8
+        self.stream.write(self.views[3])
+        if count == len(samples):
+            self.stream.write(samples)
+        else:
+            self.stream.write(memoryview(samples)[0:count])
+
+    def random(self, value):
+        self.buf[0] = RANDOM
+        self._put32(1, value)
+        self.stream.write(self.views[5])
+
+    def _put32(self, offset, value):
+        buf = self.buf
+        buf[offset] = value & 0xff
+        buf[offset + 1] = (value >> 8) & 0xff
+        buf[offset + 2] = (value >> 16) & 0xff
+        buf[offset + 3] = (value >> 24) & 0xff
+
+def install(stream=None):
+    """ Record every input the animations see from now on. Must be called
+    before anything else imports the modules in MODULES, so that they get
+    this module in their place; the NeoPixel driver alone keeps the real
+    digitalio.
+
+    Args:
+        stream (stream): Where the trace is written. Defaults to the USB data
+        port, turned on in boot.py.
+    """
+
+    global _recorder, _supervisor, _touchio, _audiobusio, _keypad, \
+        _digitalio, _random
+    global Event, Direction, Pull
+
+    if stream is None:
+        from usb_cdc import data as stream
+
+    # The NeoPixel driver drives its data pin through digitalio, and
+    # neopixel_write only takes the real DigitalInOut, so the driver is
+    # imported first to keep the real module. Its pin isn't an input, so
+    # leaving it out also keeps the pins numbered as on the host.
+    import board
+    import neopixel
+
+    import supervisor as _supervisor
+    import touchio as _touchio
+    import audiobusio as _audiobusio
+    import digitalio as _digitalio
+    import random as _random
+    try:
+        import keypad as _keypad
+        Event = _keypad.Event
+    except ImportError:
+        _keypad = None
+    Direction = _digitalio.Direction
+    Pull = _digitalio.Pull
+
+    try:
+        from microcontroller import nvm
+    except ImportError:
+        nvm = None
+
+    _recorder = Recorder(stream)
+    _recorder.header(nvm)
+
+    this = sys.modules[__name__]
+    for name in MODULES:
+        if name != "keypad" or _keypad:
+            sys.modules[name] = this
+
+# The supervisor module
+
+def ticks_ms():
+    ticks = _supervisor.ticks_ms()
+    _recorder.ticks(ticks)
+    return ticks
+
+# The touchio module
+
+class TouchIn:
+
+    def __init__(self, pin):
+        self.pad = _touchio.TouchIn(pin)
+        self.number = _recorder.number(TOUCH)
+
+    def deinit(self):
+        self.pad.deinit()
+
+    @property
+    def value(self):
+        value = self.pad.value
+        _recorder.flag(TOUCH, self.number, value)
+        return value
+
+# The audiobusio module
+
+class PDMIn:
+
+    def __init__(self, clock_pin, data_pin, **kwargs):
+        self.mic = _audiobusio.PDMIn(clock_pin, data_pin, **kwargs)
+
+    def deinit(self):
+        self.mic.deinit()
+
+    def record(self, destination, destination_length):
+        count = self.mic.record(destination, destination_length)
+        _recorder.audio(destination, count)
+        return count
+
+# The keypad module; Event is the real one
+
+class _EventQueue:
+
+    def __init__(self, events, number):
+        self.events = events
+        self.number = number
+
+    def get_into(self, event):
+        if self.events.get_into(event):
+            _recorder.key(self.number, event)
+            return True
+        _recorder.flag(KEY_NONE, self.number, False)
+        return False
+
+    def clear(self):
+        self.events.clear()
+
+class Keys:
+
+    def __init__(self, pins, **kwargs):
+        self.keys = _keypad.Keys(pins, **kwargs)
+        self.events = _EventQueue(self.keys.events, _recorder.number(KEY))
+
+    def deinit(self):
+        self.keys.deinit()
+
+# The digitalio module; Direction and Pull are the real ones
+
+class DigitalInOut:
+
+    def __init__(self, pin):
+        self.io = _digitalio.DigitalInOut(pin)
+        self.number = _recorder.number(PIN)
+
+    def deinit(self):
+        self.io.deinit()
+
+    def switch_to_input(self, pull=None):
+        self.io.switch_to_input(pull=pull)
+
+    @property
+    def direction(self):
+        return self.io.direction
+
+    @direction.setter
+    def direction(self, direction):
+        self.io.direction = direction
+
+    @property
+    def pull(self):
+        return self.io.pull
+
+    @pull.setter
+    def pull(self, pull):
+        self.io.pull = pull
+
+    @property
+    def value(self):
+        value = self.io.value
+        _recorder.flag(PIN, self.number, value)
+        return value
+
+# The random module
+
+def randint(a, b):
+    value = _random.randint(a, b)
+    _recorder.random(value)
+    return value
+
+def choice(sequence):
+    index = _random.randint(0, len(sequence) - 1)
+    _recorder.random(index)
+    return sequence[index]
@@ -0,0 +1,199 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2022 Garrett Miller
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from micropython import const
+
+from ticks import ticks_add, ticks_diff
+
+# Levels of the fade, from all outgoing to all incoming
+_STEPS = const(8)
+
+class Transition:
+    """ Crossfades from one animation to the next rather than cutting to
+    black in between. Both animations keep playing while it fades, each
+    drawing into a frame buffer of its own; the two buffers are made once
+    and take turns, the incoming animation getting the one the last outgoing
+    animation used. Once the fade is over the incoming animation's buffer
+    goes out to the pixels by itself again, so the second buffer costs
+    nothing between transitions.
+
+    The buffers are mixed after their brightness and gamma correction, which
+    is what the LEDs put out, through tables of each level scaled by each
+    step of the fade, so mixing a frame is two lookups and an add per color
+    and doesn't allocate. The main loop shows the frame through show() and
+    calls finish() once finished is set.
+    """
+
+    def __init__(self, frames, duration=500):
+        """
+        Args:
+            frames (tuple): Two FrameBuffers of the same NeoPixels
+            duration (int): Milliseconds a fade takes, 0 to cut straight to
+            the next animation
+        """
+
+        self.frames = frames
+        self.pixels = frames[0].pixels
+        self.duration = duration
+        # Index of the frame buffer the animation playing draws into
+        self.active = 0
+        self.mixed = bytearray(len(frames[0].out))
+        self.dirty = False
+        # For each step from 1 to _STEPS - 1, every level scaled by
+        # step / _STEPS. Mixing the levels scaled by complementary steps
+        # never adds up to more than 255.
+        self.tables = bytearray((_STEPS - 1) * 256)
+        for step in range(1, _STEPS):
+            offset = (step - 1) << 8
+            for level in range(256):
+                self.tables[offset + level] = level * step // _STEPS
+        self.outgoing = None
+        self.incoming = None
+        self.started = 0
+        self.outgoing_due = 0
+        self.incoming_due = 0
+        self.step = -1
+        self.fading = False
+        self.finished = False
+
+    @property
+    def frame(self):
+        """ Frame buffer of the animation playing, or fading in """
+        return self.frames[self.active]
+
+    @property
+    def spare(self):
+        """ Frame buffer for the next animation to draw into """
+        return self.frames[1 - self.active]
+
+    @property
+    def brightness(self):
+        return self.frames[0].brightness
+
+    @brightness.setter
+    def brightness(self, brightness):
+        for frame in self.frames:
+            frame.brightness = brightness
+
+    def begin(self, outgoing, incoming, now):
+        """ Start fading from the animation playing to the next, which must
+        draw into spare and have begun.
+
+        Args:
+            outgoing (animation): Animation fading out, which is updated
+            until it is ended by finish(). None if it has already ended; its
+            last frame fades out.
+            incoming (animation): Animation fading in
+            now (int): Ticks from ticks.ticks_ms()
+        """
+
+        self.active = 1 - self.active
+        self.outgoing = outgoing
+        self.incoming = incoming
+        self.started = now
+        self.outgoing_due = now
+        self.incoming_due = now
+        self.step = -1
+        self.fading = True
+        self.finished = False
+
+    def finish(self, now):
+        """ End the fade and the outgoing animation. Returns the milliseconds
+        until the incoming animation is next due to be updated.
+        """
+
+        if self.outgoing is not None:
+            self.outgoing.end()
+        self.outgoing = None
+        self.incoming = None
+        self.fading = False
+        self.finished = False
+        return max(ticks_diff(self.incoming_due, now), 0)
+
+    def tapped(self, pin):
+        self.incoming.tapped(pin)
+
+    def update(self, now):
+        """ Update whichever of the two animations is due and mix them at the
+        fade's step. Returns the milliseconds until either of them is due or
+        the fade steps.
+        """
+
+        if ticks_diff(now, self.incoming_due) >= 0:
+            self.incoming_due = ticks_add(now, self.incoming.update(now))
+        wait = ticks_diff(self.incoming_due, now)
+        if self.outgoing is not None:
+            if ticks_diff(now, self.outgoing_due) >= 0:
+                self.outgoing_due = ticks_add(now, self.outgoing.update(now))
+            wait = min(wait, ticks_diff(self.outgoing_due, now))
+
+        duration = self.duration
+        elapsed = ticks_diff(now, self.started)
+        if elapsed >= duration:
+            # The incoming animation's buffer goes out as it is from now on,
+            # straight away when there is no fade at all
+            if not self.finished:
+                # What is on the pixels is the mix, not this buffer
+                self.frame.invalidate()
+                self.finished = True
+            return max(wait, 0)
+
+        step = elapsed * _STEPS // duration
+        incoming = self.frame
+        outgoing = self.spare
+        if step != self.step or incoming.dirty or outgoing.dirty:
+            self._mix(step, incoming.out, outgoing.out)
+            self.step = step
+            incoming.dirty = False
+            outgoing.dirty = False
+        # Milliseconds until the next step, rounded up
+        next_step = ((step + 1) * duration + _STEPS - 1) // _STEPS - elapsed
+        return max(min(wait, next_step), 0)
+
+    def show(self):
+        """ Push the mix out to the strip while fading, otherwise the frame
+        buffer of the animation playing, or fading in once the fade is over.
+        Returns True if the pixels were pushed.
+        """
+
+        if not self.fading or self.finished:
+            return self.frame.show()
+        if not self.dirty:
+            return False
+        self.pixels[self.frame.all_pixels] = self.mixed
+        self.pixels.show()
+        self.dirty = False
+        return True
+
+    def _mix(self, step, incoming, outgoing):
+        mixed = self.mixed
+        if step == 0:
+            mixed[self.frame.all_bytes] = outgoing
+        else:
+            tables = self.tables
+            incoming_offset = (step - 1) << 8
+            outgoing_offset = (_STEPS - step - 1) << 8
+            for i in range(len(mixed)):
+                mixed[i] = tables[incoming_offset + incoming[i]] \
+                    + tables[outgoing_offset + outgoing[i]]
+        self.dirty = True
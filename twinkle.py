@@ -20,26 +20,37 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+from array import array
 from random import randint, choice
 from board import A1, A6
-from time import monotonic
-import tap
+from ticks import ticks_add, ticks_diff
+from palette import PALETTES
 
 class Twinkle:
-    """ Represents randomly lit pixels """
+    """ Represents randomly lit pixels
 
-    def __init__(self, pixels):
+    The state is kept in arrays so that a frame only touches the pixels whose
+    time is up, however long the strip is. Off pixels are kept in a pool to
+    pick from at random, and lit pixels in a min-heap ordered by the time they
+    go off.
+    """
+
+    def __init__(self, pixels, pixels_per_twinkle=0):
         """
         Args:
-            pixels (NeoPixel): NeoPixel object
+            pixels (FrameBuffer): Frame buffer to draw into
+            pixels_per_twinkle (int): Number of pixels lit each time it
+            twinkles. Defaults to one for every 6 pixels, so a long strip has
+            as many twinkling as a short one.
         """
         self.pixels = pixels
+        self.num_pixels = len(pixels)
+        self.pixels_per_twinkle = pixels_per_twinkle \
+            or max(self.num_pixels // 6, 1)
 
     def begin(self):
         print("twinkle: begin")
 
-        self.pixel_states = []
-
         self.twinkle_durations = [
             [(1000, 2000), # min, max twinkle duration
              (200, 1000)], # min, max next twinkle duration
@@ -47,140 +58,214 @@ class Twinkle:
              (50, 500)]
         ]
 
+        # The shared palettes, so no colors are made here
         self.twinkle_colors = [
-            [(255, 0, 0)], # red
-            [(128, 0, 128)], # purple
-            [(0, 255, 0)], # green
-            [(0, 0, 255)], # blue
-            [(255, 215, 0)], # gold
-            [(255, 0, 0), # All colors
-             (128, 0, 128),
-             (0, 255, 0),
-             (0, 0, 255),
-             (255, 215, 0)]]
+            PALETTES["red"],
+            PALETTES["purple"],
+            PALETTES["green"],
+            PALETTES["blue"],
+            PALETTES["gold"],
+            PALETTES["rave"]] # All colors
 
+        # key: pinId, value: method
         self.tap_effects = {
-            id(A1): (A1, self._change_color),
-            id(A6): (A6, self._change_delays)}
-
-        # Create tap object
-        # TODO may need to clean this up post animation
-        self.tap = tap.Tap(
-            [v[0] for k, v in self.tap_effects.items()],
-            self._tap_event_callback)
+            id(A1): self._change_color,
+            id(A6): self._change_delays}
 
         self.pixels.fill(0)
-        self.pixels.show()
         self.active_colors = 0
         self.active_twinkle_durations = 0
 
-        # Each pixel has a current state represented by a tuple
-        #   (pixel_index, twinkle_start_time, twinkle_duration)
-        # If the start time is 0, then it is off.
-        self.pixel_states = [(i, 0, 0) for i in range(0, len(self.pixels))]
+        # Pool of the pixels that are off. The first free_count entries are
+        # the off pixels, in no particular order.
+        self.free_pixels = array('H', range(self.num_pixels))
+        self.free_count = self.num_pixels
+
+        # Min-heap of the lit pixels, ordered by the time each one goes off.
+        self.off_times = array('l', [0] * self.num_pixels)
+        self.lit_pixels = array('H', [0] * self.num_pixels)
+        self.lit_count = 0
+
+        # Start time of last pixel twinkled, None to twinkle right away
+        self.last_active_twinkle_time = None
 
-        # Start time of last pixel twinkled
-        self.last_active_twinkle_time = 0
+        # Milliseconds between beats while following the music, otherwise 0
+        self.beat_period = 0
 
         # How to to wait before twinkling the next pixel
         self.active_next_twinkle_duration \
             = self._get_next_twinkle_duration()
 
-    def update(self):
+    def update(self, now):
 
-        # Read any taps
-        self.tap.read();
+        # Turn off the pixels whose time is up
+        while self.lit_count \
+              and ticks_diff(self.off_times[self.lit_pixels[0]], now) <= 0:
+            self._turn_off(self._pop_lit())
 
-        now = int(round(monotonic() * 1000))
+        # Determine if enough time has gone by before twinking more pixels
+        if self.last_active_twinkle_time is None \
+           or ticks_diff(now, self.last_active_twinkle_time) \
+           >= self.active_next_twinkle_duration:
 
-        # Determine which pixels to turn off
-        turn_off = self._determine_which_pixels_to_turn_off(now)
-        self._turn_off(turn_off)
+            for i in range(self.pixels_per_twinkle):
+                self._twinkle_a_pixel(now)
 
-        # Determine if enough time has gone by before twinking another pixel
-        if (now - self.last_active_twinkle_time) \
-           < self.active_next_twinkle_duration:
-            return
-
-        self._twinkle_a_pixel(now)
+            # Record when they were twinkled and change the wait for when the
+            # next ones can twinkle
+            self.last_active_twinkle_time = now
+            self.active_next_twinkle_duration \
+                = self._get_next_twinkle_duration()
 
-        # Record when one was twinkled and change the wait for when the next
-        # one can twinkle
-        self.last_active_twinkle_time = now
-        self.active_next_twinkle_duration \
-            = self._get_next_twinkle_duration()
+        return self._time_until_next_change(now)
         
     def end(self):
         print("twinkle: end")
-        self.pixel_states = []
+        self.free_pixels = None
+        self.off_times = None
+        self.lit_pixels = None
         self.twinkle_durations = None
         self.twinkle_colors = None
         self.tap_effects = None
         
 
-    def _tap_event_callback(self, pin):
+    def tapped(self, pin):
         """
         Depending on the pin tapped, invoke the associated action function
         """
 
         #print("tapped")
-        self.tap_effects[id(pin)][1]()
+        effect = self.tap_effects.get(id(pin))
+        if effect:
+            effect()
+
+    def beat(self, now, period):
+        """ Twinkle on every beat of the music, each pixel lit for one to two
+        beats. Called on every beat with the milliseconds between beats, and
+        with 0 once the beat is lost, which goes back to the durations.
+        """
+        self.beat_period = period
+        if period:
+            self.last_active_twinkle_time = None
+
+    def settings(self):
+        """ Active colors and durations packed in a byte, to be saved """
+        return (self.active_colors << 4) | self.active_twinkle_durations
+
+    def restore(self, settings):
+        """ Go back to the colors and durations from settings() """
+        self.active_colors = (settings >> 4) % len(self.twinkle_colors)
+        self.active_twinkle_durations \
+            = (settings & 0xf) % len(self.twinkle_durations)
 
     def _change_color(self):
         """ Change active color """
         self.active_colors \
             = (self.active_colors + 1) % len(self.twinkle_colors)
-        print("active colors: " + str(self.active_colors))
+        #print("active colors: " + str(self.active_colors))
         # Change any existing twinkles to the new set of colors
-        for ps in self.pixel_states:
-            if ps[1] > 0:
-                self.pixels[ps[0]] = self._get_twinkle_color()
+        for i in range(self.lit_count):
+            self.pixels[self.lit_pixels[i]] = self._get_twinkle_color()
 
     def _change_delays(self):
         """ Change active delays """
         self.active_twinkle_durations \
             = (self.active_twinkle_durations + 1) % len(self.twinkle_durations)
-        print("active durations: " + str(self.active_twinkle_durations))
+        #print("active durations: " + str(self.active_twinkle_durations))
+
+    def _time_until_next_change(self, now):
+        """ Milliseconds until either a pixel needs to be turned off or the
+        next pixel can twinkle
+        """
 
-    def _determine_which_pixels_to_turn_off(self, now):
-        return list(filter(
-            lambda ps: ps[1] > 0 and (now - ps[1]) > ps[2], self.pixel_states))
+        wait = ticks_diff(self.last_active_twinkle_time, now) \
+            + self.active_next_twinkle_duration
+        # The first lit pixel is the next to go off
+        if self.lit_count:
+            off_wait = ticks_diff(self.off_times[self.lit_pixels[0]], now)
+            if off_wait < wait:
+                wait = off_wait
+        return max(wait, 0)
 
-    def _turn_off(self, turn_off):
-        if len(turn_off) > 0:
-            for ps in turn_off:
-                self.pixels[ps[0]] = (0, 0, 0)
-                self.pixel_states[ps[0]] = (ps[0], 0, 0)
-            self.pixels.show()
+    def _turn_off(self, pixel):
+        self.pixels[pixel] = 0
+        self.free_pixels[self.free_count] = pixel
+        self.free_count += 1
 
     def _twinkle_a_pixel(self, now):
-        pixel = self._get_pixel_to_turn_on()
-        if pixel == -1:
+        if self.free_count == 0:
             return
-        self.pixel_states[pixel] \
-            = (pixel, now, self._get_twinkle_duration())
+
+        # Take a random pixel out of the pool by moving the last one into
+        # its place
+        i = randint(0, self.free_count - 1)
+        pixel = self.free_pixels[i]
+        self.free_count -= 1
+        self.free_pixels[i] = self.free_pixels[self.free_count]
+
+        # A pixel is turned off once its duration has been exceeded
+        self.off_times[pixel] \
+            = ticks_add(now, self._get_twinkle_duration() + 1)
+        self._push_lit(pixel)
         self.pixels[pixel] = self._get_twinkle_color()
-        self.pixels.show()
+
+    def _push_lit(self, pixel):
+        """ Add a pixel to the heap of lit pixels """
+        heap = self.lit_pixels
+        off_times = self.off_times
+        off_time = off_times[pixel]
+        i = self.lit_count
+        self.lit_count += 1
+        # Move parents down until the pixel's place is found
+        while i > 0:
+            parent = (i - 1) >> 1
+            if ticks_diff(off_times[heap[parent]], off_time) <= 0:
+                break
+            heap[i] = heap[parent]
+            i = parent
+        heap[i] = pixel
+
+    def _pop_lit(self):
+        """ Remove and return the lit pixel that goes off first """
+        heap = self.lit_pixels
+        off_times = self.off_times
+        first = heap[0]
+        self.lit_count -= 1
+        count = self.lit_count
+        if count == 0:
+            return first
+        # Move the last pixel to the top and sift it down
+        pixel = heap[count]
+        off_time = off_times[pixel]
+        i = 0
+        while True:
+            child = 2 * i + 1
+            if child >= count:
+                break
+            if child + 1 < count and ticks_diff(
+                    off_times[heap[child + 1]], off_times[heap[child]]) < 0:
+                child += 1
+            if ticks_diff(off_time, off_times[heap[child]]) <= 0:
+                break
+            heap[i] = heap[child]
+            i = child
+        heap[i] = pixel
+        return first
 
     def _get_next_twinkle_duration(self):
+        if self.beat_period:
+            # Until the beat after next, should the next beat go missing
+            return 2 * self.beat_period
         return randint(
             self.twinkle_durations[self.active_twinkle_durations][1][0],
             self.twinkle_durations[self.active_twinkle_durations][1][1])
 
     def _get_twinkle_duration(self):
+        if self.beat_period:
+            return randint(self.beat_period, 2 * self.beat_period)
         return randint(
             self.twinkle_durations[self.active_twinkle_durations][0][0],
             self.twinkle_durations[self.active_twinkle_durations][0][1])
-    
-    def _get_pixel_to_turn_on(self):
-        """ Return an available pixel to turn on """
-
-        off_pixel_states = list(filter(
-            lambda ps: ps[1] == 0, self.pixel_states))
-        if len(off_pixel_states) == 0:
-            return -1
-        else:
-            return choice(off_pixel_states)[0]
 
     def _get_twinkle_color(self):
         return choice(self.twinkle_colors[self.active_colors])
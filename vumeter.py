@@ -25,19 +25,47 @@
 # Copyright (c) 2019 Gary Fong
 
 from array import array
-from math import pow, sqrt
+from math import pow
 from micropython import const
 
 from audiobusio import PDMIn
 from board import MICROPHONE_CLOCK, MICROPHONE_DATA
 
+from palette import gradient
+from loudness import Loudness, isqrt
+
 class VuMeter:
 
-    def __init__(self, pixels, input_floor, input_ceiling):
+    def __init__(self, pixels, input_floor, input_ceiling,
+                 latency_budget=4, decimation=2, integration_time=80):
+        """
+        Args:
+            pixels (FrameBuffer): Frame buffer to draw into
+            input_floor (int): Level at which the first pixel lights
+            input_ceiling (int): Level above the floor at which every pixel
+            is lit
+            latency_budget (int): Milliseconds of sound recorded each frame.
+            Recording holds up the main loop, buttons and pads included.
+            decimation (int): Only every this many samples are used, which
+            makes working out the level of a frame that much quicker
+            integration_time (int): Milliseconds of sound the level is
+            averaged over, across frames, so that it is steadier than one
+            short recording would give
+        """
+
         self.curve = const(2)
         self.scale_exponent = pow(10, self.curve * -0.1)
-        self.peak_color = (100, 0, 255)
-        self.num_samples = const(160)
+        self.peak_color = const(0x6400ff)
+        self.sample_rate = const(16000)
+        self.num_samples = self.sample_rate * latency_budget // 1000
+        # Milliseconds between frames
+        self.frame_period = const(20)
+        # Each frame's mean square counts for 1 / 2**integration_shift of
+        # the level
+        self.integration_shift = 0
+        while self.frame_period << (self.integration_shift + 1) \
+              <= integration_time:
+            self.integration_shift += 1
         self.pixels = pixels
         self.num_pixels = len(pixels)
         self.input_floor = input_floor
@@ -45,8 +73,40 @@ class VuMeter:
         # lower sound. Adjust this as you see fit.
         self.input_ceiling = input_floor + input_ceiling
 
+        # Clipping loud samples doesn't matter since the magnitude is
+        # constrained to the ceiling
+        self.loudness = Loudness(self.num_samples, decimation)
+
+        self._build_tables()
+
         self.peak = 0
 
+    def _build_tables(self):
+        # Everything that used to be computed in floating point each frame is
+        # looked up instead. Indexed by the constrained magnitude less the
+        # floor, giving the number of pixels to light and the peak position.
+        # Halfwords, since a long strip has more pixels than a byte counts.
+        levels = self.input_ceiling - self.input_floor + 1
+        self.lit_pixels = array('H', [0] * levels)
+        self.peak_pixels = array('H', [0] * levels)
+        for i in range(len(self.lit_pixels)):
+            # Scaled logarithmic reading in the range 0 to NUM_PIXELS
+            c = self._log_scale(
+                self.input_floor + i, self.input_floor, self.input_ceiling,
+                0, self.num_pixels)
+            # Pixels that are below the scaled and interpolated magnitude
+            lit = int(c)
+            if lit < c:
+                lit += 1
+            self.lit_pixels[i] = lit
+            self.peak_pixels[i] = min(int(c), self.num_pixels - 1)
+
+        # Red at the bottom rising to yellow, from the shared gradient
+        colors = gradient("vu")
+        self.volume_colors = array('l', [
+            colors[i * 255 // self.num_pixels]
+            for i in range(self.num_pixels)])
+
     # Restrict value to be between floor and ceiling.
     def _constrain(self, value, floor, ceiling):
         return max(floor, min(value, ceiling))
@@ -62,56 +122,60 @@ class VuMeter:
             + pow(normalized_input_value, self.scale_exponent) \
             * (output_max - output_min)
 
-    # Remove DC bias before computing RMS.
-    def _normalized_rms(self, values):
-        minbuf = int(self._mean(values))
-        samples_sum = sum(
-            float(sample - minbuf) * (sample - minbuf)
-            for sample in values
-        )
-        return sqrt(samples_sum / len(values))
-
-    def _mean(self, values):
-        return sum(values) / len(values)
-
-    def _volume_color(self, volume):
-        return 200, volume * (255 // self.num_pixels), 0
-
     def begin(self):
         print("vu meter: begin")
 
-        self.samples = array('H', [0] * self.num_pixels)
+        self.samples = array('H', [0] * self.num_samples)
         self.mic \
             = PDMIn(MICROPHONE_CLOCK,
                     MICROPHONE_DATA,
-                    sample_rate=16000, bit_depth=16)
+                    sample_rate=self.sample_rate, bit_depth=16)
+        self.loudness.reset()
+        self.energy = 0
         
         self.pixels.fill(0)
-        self.pixels.show()
 
-    def update(self):
+    def tapped(self, pin):
+        pass
+
+    def update(self, now):
+        # Only a short recording, so the main loop isn't held up for long
         self.mic.record(self.samples, len(self.samples))
-        magnitude = self._normalized_rms(self.samples)
+
+        # Running average of the mean square over the last few frames
+        self.energy += (self.loudness.mean_square(self.samples)
+                        - self.energy) >> self.integration_shift
+
+        # Constrain before taking the root; the ceiling is a good first guess
+        mean_square = self._constrain(
+            self.energy,
+            self.input_floor * self.input_floor,
+            self.input_ceiling * self.input_ceiling)
+        magnitude = isqrt(mean_square, self.input_ceiling)
         #print(magnitude)
-        
-        # Compute scaled logarithmic reading in the range 0 to NUM_PIXELS
-        c = self._log_scale(
-            self._constrain(magnitude, self.input_floor, self.input_ceiling),
-            self.input_floor, self.input_ceiling, 0, self.num_pixels)
-        
-        # Light up pixels that are below the scaled and interpolated magnitude.
-        self.pixels.fill(0)
+
+        level = magnitude - self.input_floor
+        lit = self.lit_pixels[level]
+
+        # Light up the peak pixel and animate it slowly dropping.
+        if self.peak_pixels[level] >= self.peak:
+            self.peak = self.peak_pixels[level]
+        elif self.peak > 0:
+            self.peak -= 1
+
+        # Each pixel is set once, so a frame that looks the same as the last
+        # doesn't count as changed
+        peak = self.peak
         for i in range(self.num_pixels):
-            if i < c:
-                self.pixels[i] = self._volume_color(i)
-                # Light up the peak pixel and animate it slowly dropping.
-                if c >= self.peak:
-                    self.peak = min(c, self.num_pixels - 1)
-                elif self.peak > 0:
-                    self.peak = self.peak - 1
-                    if self.peak > 0:
-                        self.pixels[int(self.peak)] = self.peak_color
-                        self.pixels.show()
+            if i == peak and peak > 0:
+                color = self.peak_color
+            elif i < lit:
+                color = self.volume_colors[i]
+            else:
+                color = 0
+            self.pixels[i] = color
+
+        return self.frame_period
 
     def end(self):
         print("vu meter: end")